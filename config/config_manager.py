@@ -55,7 +55,8 @@ class ConfigManager:
                 'default_friction': 0.5,
                 'default_time_scale': 5.0,
                 'max_simulation_frames': 10000,
-                'collision_margin': 0.0001
+                'collision_margin': 0.0001,
+                'result_cache_max_mb': 256
             },
             'export': {
                 'default_rule': 'UNREAL',
@@ -201,6 +202,14 @@ class ConfigManager:
             print(f"导入配置失败: {str(e)}")
             return False
     
+    def get_config_dir(self, subdir: Optional[str] = None) -> str:
+        """获取插件配置目录（可指定子目录，不存在时创建）"""
+        config_dir = os.path.dirname(self._config_file)
+        if subdir:
+            config_dir = os.path.join(config_dir, subdir)
+            os.makedirs(config_dir, exist_ok=True)
+        return config_dir
+    
     def get_config_info(self) -> Dict[str, Any]:
         """获取配置信息"""
         return {
@@ -226,6 +235,10 @@ def save_config() -> bool:
     """保存配置的便捷函数"""
     return _config_manager.save_config()
 
+def get_config_dir(subdir: Optional[str] = None) -> str:
+    """获取插件配置目录的便捷函数"""
+    return _config_manager.get_config_dir(subdir)
+
 def reset_config(section: Optional[str] = None) -> bool:
     """重置配置的便捷函数"""
     return _config_manager.reset_to_default(section) 
\ No newline at end of file
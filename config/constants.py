@@ -11,11 +11,50 @@ class PhysicsSettings:
     DEFAULT_FRICTION = 0.85
     DEFAULT_TIME_SCALE = 1.0
     MAX_SIMULATION_FRAMES = 10000
+    DEFAULT_SETTLE_FRAMES = 500
     DEFAULT_FPS = 24
     COLLISION_MARGIN = 0.0001
+    SAFETY_MARGIN = 0.001
     DEFAULT_SOLVER_ITERATIONS = 10
     DEFAULT_RESTITUTION = 0.0
     DEFAULT_SPLIT_IMPULSE = True
+    DEFAULT_REST_LINEAR_THRESHOLD = 0.0005
+    DEFAULT_REST_ANGULAR_THRESHOLD = 0.001
+    DEFAULT_REST_CHECK_INTERVAL = 10
+    REST_REQUIRED_CHECKS = 3
+    BULK_MATRIX_READ_RATIO = 4
+    DEFAULT_CULL_PADDING = 1.0
+    MIN_GRID_CELL_SIZE = 0.01
+    MAX_GRID_CELLS_PER_OBJECT = 256
+    DEFAULT_PROXY_MIN_VERTICES = 5000
+    DEFAULT_PROXY_RESOLUTION = 32
+    PROXY_CACHE_KEEP = 16
+    WORKER_TIMEOUT = 600
+    WORKER_POLL_INTERVAL = 0.1
+    PLACEMENT_MAX_ITERATIONS = 50
+    PLACEMENT_MIN_STEP = 0.001
+    PLACEMENT_STEP_FACTOR = 0.1
+    TUNE_STABILITY_FRACTION = 0.25
+    TUNE_SETTLE_SECONDS = 1.5
+    TUNE_FRAME_OVERHEAD = 20
+    TUNE_MAX_SUBSTEPS = 100
+    TUNE_MIN_ITERATIONS = 10
+    TUNE_MAX_ITERATIONS = 100
+    TUNE_TIME_SCALES = (0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0)
+
+
+# 爆炸图常量
+class ExplodeSettings:
+    MIN_SCALE = 0.1
+    MAX_SCALE = 3.0
+    MIN_DIRECTION_LENGTH = 0.001
+    MIN_DISTANCE_RANGE = 0.001
+    MAX_UPDATES_PER_SECOND = 60
+    UNDO_DEBOUNCE_SECONDS = 0.5
+    DEFAULT_LEVEL_FALLOFF = 0.5
+    SEPARATION_ITERATIONS = 8
+    SEPARATION_CACHE_STEP = 0.01
+    SEPARATION_CACHE_SIZE = 64
 
 
 # UI 常量
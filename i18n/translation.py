@@ -56,6 +56,50 @@ class TranslationManager:
             "切换映射方式": {"en_US": "Toggle Mapping", "zh": "切换映射方式"},
             "开启曲面细分": {"en_US": "Enable Subdivision", "zh": "开启曲面细分"},
             "开始模拟": {"en_US": "Start Simulation", "zh": "开始模拟"},
+            "Cull Colliders": {"en_US": "Cull Colliders", "zh": "剔除碰撞体"},
+            "Padding": {"en_US": "Padding", "zh": "扩展距离"},
+            "Batch Setup": {"en_US": "Batch Setup", "zh": "批量设置刚体"},
+            "Pre-bake Margin": {"en_US": "Pre-bake Margin", "zh": "预烘焙碰撞边距"},
+            "Bake Motion": {"en_US": "Bake Motion", "zh": "烘焙下落动画"},
+            "Shape Tolerance": {"en_US": "Shape Tolerance", "zh": "形状容差"},
+            "Fix Overlaps": {"en_US": "Fix Overlaps", "zh": "修正初始穿插"},
+            "Result Cache": {"en_US": "Result Cache", "zh": "模拟结果缓存"},
+            "Auto Tune": {"en_US": "Auto Tune", "zh": "自动调参"},
+            "Estimate": {"en_US": "Estimate", "zh": "估算"},
+            "Substeps": {"en_US": "Substeps", "zh": "子步"},
+            "Cost": {"en_US": "Cost", "zh": "计算量"},
+            "Takes": {"en_US": "Takes", "zh": "尝试次数"},
+            "Seed": {"en_US": "Seed", "zh": "种子"},
+            "Location Jitter": {"en_US": "Location Jitter", "zh": "位置扰动"},
+            "Rotation Jitter": {"en_US": "Rotation Jitter", "zh": "旋转扰动"},
+            "Run Takes": {"en_US": "Run Takes", "zh": "多次模拟"},
+            "Original": {"en_US": "Original", "zh": "原始"},
+            "Reduce Keys": {"en_US": "Reduce Keys", "zh": "精简关键帧"},
+            "Tolerance": {"en_US": "Tolerance", "zh": "容差"},
+            "Angle Tolerance": {"en_US": "Angle Tolerance", "zh": "角度容差"},
+            "Interrupted simulation found": {"en_US": "Interrupted simulation found", "zh": "检测到中断的物理模拟"},
+            "Recover Session": {"en_US": "Recover Session", "zh": "恢复会话"},
+            "Workers": {"en_US": "Workers", "zh": "进程数"},
+            "Parallel Settle": {"en_US": "Parallel Settle", "zh": "并行沉降"},
+            "Frame": {"en_US": "Frame", "zh": "帧"},
+            "frame": {"en_US": "frame", "zh": "帧"},
+            "frames": {"en_US": "frames", "zh": "帧"},
+            "Awake": {"en_US": "Awake", "zh": "活动"},
+            "Sleeping": {"en_US": "Sleeping", "zh": "静止"},
+            "Colliders": {"en_US": "Colliders", "zh": "碰撞体"},
+            "Objects": {"en_US": "Objects", "zh": "对象"},
+            "Last Run": {"en_US": "Last Run", "zh": "上次运行"},
+            "Setup": {"en_US": "Setup", "zh": "搭建"},
+            "Collision Proxies": {"en_US": "Collision Proxies", "zh": "碰撞代理"},
+            "Proxy Type": {"en_US": "Proxy Type", "zh": "代理类型"},
+            "Min Vertices": {"en_US": "Min Vertices", "zh": "最少顶点数"},
+            "Resolution": {"en_US": "Resolution", "zh": "分辨率"},
+            "Stop At Rest": {"en_US": "Stop At Rest", "zh": "静止后停止"},
+            "Linear Threshold": {"en_US": "Linear Threshold", "zh": "位移阈值"},
+            "Angular Threshold": {"en_US": "Angular Threshold", "zh": "旋转阈值"},
+            "Check Interval": {"en_US": "Check Interval", "zh": "检测间隔"},
+            "Fast Settle": {"en_US": "Fast Settle", "zh": "快速沉降"},
+            "Settle Frames": {"en_US": "Settle Frames", "zh": "沉降帧数"},
             "Cancel Calculation": {"en_US": "Cancel Calculation", "zh": "取消计算"},
             
             # 属性标签
@@ -76,10 +120,20 @@ class TranslationManager:
             "Reset Positions": {"en_US": "Reset Positions", "zh": "重置位置"},
             "✓ Recorded Initial Positions": {"en_US": "✓ Recorded Initial Positions", "zh": "✓ 已记录初始位置"},
             "⚠ Please Record Initial Positions": {"en_US": "⚠ Please Record Initial Positions", "zh": "⚠ 请先记录初始位置"},
+            "Store In File": {"en_US": "Store In File", "zh": "保存到文件"},
+            "Bake Explode Animation": {"en_US": "Bake Explode Animation", "zh": "烘焙爆炸动画"},
+            "Separate Overlaps": {"en_US": "Separate Overlaps", "zh": "分离重叠部件"},
+            "Smooth Dragging": {"en_US": "Smooth Dragging", "zh": "平滑拖动"},
+            "Backend": {"en_US": "Backend", "zh": "后端"},
+            "Method": {"en_US": "Method", "zh": "展开方式"},
+            "Level Falloff": {"en_US": "Level Falloff", "zh": "层级衰减"},
+            "Output": {"en_US": "Output", "zh": "输出方式"},
+            "Pivot": {"en_US": "Pivot", "zh": "重心"},
             "Offset Value": {"en_US": "Offset Value", "zh": "偏移值"},
             "Recorded {0} objects' initial positions": {"en_US": "Recorded {0} objects' initial positions", "zh": "已记录 {0} 个对象的初始位置"},
             "Failed to record initial positions: please select target collection first": {"en_US": "Failed to record initial positions: please select target collection first", "zh": "记录初始位置失败：请先选择目标集合"},
             "Reset all objects to initial positions": {"en_US": "Reset all objects to initial positions", "zh": "已重置所有对象到初始位置"},
+            "Update Time: {0:.2f} ms ({1} objects)": {"en_US": "Update Time: {0:.2f} ms ({1} objects)", "zh": "更新耗时: {0:.2f} 毫秒 ({1} 个对象)"},
             
             # 错误和警告信息（ATex翻译已移除，迁移到ATexLink插件）
         }
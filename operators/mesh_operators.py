@@ -1,7 +1,8 @@
 import os
+import time
 import bpy
+import numpy as np
 import bmesh
-import mathutils
 from bpy.utils import register_class, unregister_class
 from ..config.constants import PreferenceSettings, MaterialNodes
 from ..utils.common_utils import ATOperationError, validate_object_selection, get_active_material_nodes
@@ -340,11 +341,6 @@ class CollectionEnumOperator(bpy.types.Operator):
         return items
 
 
-# 已废弃：全局缓存已移动到 property_groups.py
-# 保留此导入以便向后兼容
-from ..properties.property_groups import _initial_positions_cache
-
-
 class RecordInitialPositionsOperator(bpy.types.Operator):
     """记录集合中所有对象的初始位置"""
     bl_idname = "explode.record_initial_positions"
@@ -354,19 +350,32 @@ class RecordInitialPositionsOperator(bpy.types.Operator):
     
     def execute(self, context):
         from ..i18n.translation import get_text
-        from ..properties.property_groups import _initial_positions_cache
+        from ..properties.property_groups import get_explode_scheduler
         
         wm = context.window_manager
         explode_props = wm.atprops.explode_props
         
-        # 记录初始位置
-        initial_positions = explode_props.record_initial_positions()
+        # 先应用尚未完成的滑条更新，确保记录的是对象的实际位置
+        get_explode_scheduler().flush()
         
-        if initial_positions:
-            # 将初始位置保存到全局缓存
-            wm_id = context.window_manager.as_pointer()
-            _initial_positions_cache[wm_id] = initial_positions
-            count = len(initial_positions)
+        # 几何节点后端：为网格添加修改器即可，不需要记录对象位置
+        if explode_props.explode_backend == 'GEOMETRY_NODES':
+            try:
+                count = explode_props.attach_node_backend()
+            except Exception as e:
+                self.report({'ERROR'}, f"创建几何节点失败: {str(e)}")
+                return {'CANCELLED'}
+            if count == 0:
+                self.report({'ERROR'}, get_text("Failed to record initial positions: please select target collection first", context))
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"已为 {count} 个网格添加几何节点爆炸图")
+            return {'FINISHED'}
+        
+        # 记录初始位置（同时保存到全局状态存储）
+        state = explode_props.record_initial_positions()
+        
+        if state is not None:
+            count = len(state)
             
             # 构建消息
             is_chinese = context.preferences.view.language not in ["en_US"]
@@ -381,6 +390,95 @@ class RecordInitialPositionsOperator(bpy.types.Operator):
             return {'CANCELLED'}
 
 
+class ExplodeBakeOperator(bpy.types.Operator):
+    """把爆炸图偏移动画烘焙为关键帧"""
+    bl_idname = "explode.bake_animation"
+    bl_label = "Bake Explode Animation"
+    bl_description = "Write location keyframes for every part over a frame range"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    frame_start: bpy.props.IntProperty(
+        name="Start Frame",
+        default=1
+    ) # type: ignore
+    
+    frame_end: bpy.props.IntProperty(
+        name="End Frame",
+        default=100
+    ) # type: ignore
+    
+    offset_start: bpy.props.FloatProperty(
+        name="Start Offset",
+        default=0.0
+    ) # type: ignore
+    
+    offset_end: bpy.props.FloatProperty(
+        name="End Offset",
+        default=10.0
+    ) # type: ignore
+    
+    curve: bpy.props.EnumProperty(
+        name="Curve",
+        items=[
+            ('LINEAR', "Linear", "Constant speed"),
+            ('EASE_IN', "Ease In", "Start slowly"),
+            ('EASE_OUT', "Ease Out", "End slowly"),
+            ('EASE_IN_OUT', "Ease In Out", "Start and end slowly"),
+        ],
+        default='EASE_IN_OUT'
+    ) # type: ignore
+    
+    def invoke(self, context, event):
+        explode_props = context.window_manager.atprops.explode_props
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        if explode_props.explode_offset != 0.0:
+            self.offset_end = explode_props.explode_offset
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        from ..i18n.translation import get_text
+        from ..properties.property_groups import get_explode_state, get_explode_scheduler, sync_explode_settings
+        from ..utils.explode_nodes import bake_explode_modifiers
+        from ..utils.explode_utils import evaluate_offset_curve
+        
+        explode_props = context.window_manager.atprops.explode_props
+        collection = bpy.data.collections.get(explode_props.target_collection) if explode_props.target_collection else None
+        
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR'}, "结束帧不能小于开始帧")
+            return {'CANCELLED'}
+        
+        # 几何节点后端烘焙修改器的偏移输入
+        if collection is not None and explode_props.explode_backend == 'GEOMETRY_NODES':
+            get_explode_scheduler().flush()
+            frames = np.arange(self.frame_start, self.frame_end + 1)
+            offsets = evaluate_offset_curve(self.curve, len(frames), self.offset_start, self.offset_end)
+            baked = bake_explode_modifiers(collection, frames, offsets)
+            self.report({'INFO'}, f"已烘焙 {baked} 个对象 × {len(frames)} 帧")
+            return {'FINISHED'}
+        
+        state = get_explode_state(explode_props)
+        if collection is None or state is None:
+            self.report({'ERROR'}, get_text("⚠ Please Record Initial Positions", context))
+            return {'CANCELLED'}
+        
+        get_explode_scheduler().flush()
+        sync_explode_settings(state, explode_props)
+        if state.output == state.OUTPUT_DRIVER:
+            self.report({'ERROR'}, "驱动器模式下无法烘焙关键帧，请切换到其他输出方式")
+            return {'CANCELLED'}
+        
+        start = time.perf_counter()
+        frames = np.arange(self.frame_start, self.frame_end + 1)
+        offsets = evaluate_offset_curve(self.curve, len(frames), self.offset_start, self.offset_end)
+        baked = state.bake(collection, frames, offsets)
+        elapsed = time.perf_counter() - start
+        
+        self.report({'INFO'}, f"已烘焙 {baked} 个对象 × {len(frames)} 帧 ({elapsed:.2f} 秒)")
+        return {'FINISHED'}
+
+
 class ResetExplodePositionsOperator(bpy.types.Operator):
     """重置爆炸图位置到初始状态"""
     bl_idname = "explode.reset_positions"
@@ -390,15 +488,11 @@ class ResetExplodePositionsOperator(bpy.types.Operator):
     
     def execute(self, context):
         from ..i18n.translation import get_text
-        from ..properties.property_groups import _initial_positions_cache
+        from ..properties.property_groups import get_explode_state, get_explode_scheduler
         
         wm = context.window_manager
         explode_props = wm.atprops.explode_props
         
-        # 从全局缓存获取初始位置
-        wm_id = context.window_manager.as_pointer()
-        initial_positions = _initial_positions_cache.get(wm_id, {})
-        
         # 如果没有选择集合，直接返回
         if not explode_props.target_collection:
             return {'CANCELLED'}
@@ -408,30 +502,15 @@ class ResetExplodePositionsOperator(bpy.types.Operator):
         if not collection:
             return {'CANCELLED'}
         
-        # 获取集合中的所有网格对象
-        mesh_objects = [obj for obj in collection.all_objects if obj.type == 'MESH']
-        
-        # 为每个对象重置位置（使用对象指针作为key）
-        for obj in mesh_objects:
-            obj_key = id(obj)
-            if obj_key in initial_positions:
-                # 跳过距离范围标记
-                if obj_key in ['_min_distance', '_max_distance']:
-                    continue
-                    
-                initial_data = initial_positions[obj_key]
-                # 恢复对象的原始位置
-                if isinstance(initial_data, dict) and 'location' in initial_data:
-                    obj.location = initial_data['location']
-                else:
-                    # 兼容旧格式（如果存在）
-                    initial_world_center = initial_data if not isinstance(initial_data, dict) else initial_data.get('center', mathutils.Vector((0, 0, 0)))
-                    direction = initial_world_center.normalized() if initial_world_center.length > 0.001 else mathutils.Vector((1, 0, 0))
-                    offset_vector = direction * initial_world_center.length
-                    obj.location = offset_vector
+        # 丢弃尚未应用的滑条更新，再恢复所有对象的原始位置
+        get_explode_scheduler().cancel()
+        state = get_explode_state(explode_props) if explode_props.explode_backend == 'OBJECTS' else None
+        if state is not None:
+            state.reset(collection)
         
-        # 重置偏移值为0
+        # 重置偏移值为0，延迟更新产生的请求立即应用，归入本操作符的撤销步骤
         explode_props.explode_offset = 0.0
+        get_explode_scheduler().flush()
         
         self.report({'INFO'}, get_text("Reset all objects to initial positions", context))
         return {'FINISHED'}
@@ -444,6 +523,7 @@ classes = (
     MeshResetOriginOperator,
     CollectionEnumOperator,
     RecordInitialPositionsOperator,
+    ExplodeBakeOperator,
     ResetExplodePositionsOperator,
 )
 
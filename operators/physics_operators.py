@@ -1,9 +1,25 @@
+import time
+from concurrent.futures import wait
 import bpy
+from bpy.props import BoolProperty, IntProperty
 from bpy.utils import register_class, unregister_class
-from mathutils import Matrix
 from ..i18n.translation import get_text
 from ..config.constants import PhysicsSettings
 from ..utils.common_utils import ATOperationError, validate_object_selection
+from ..utils.physics_utils import (SHRINK_MODIFIER, RestDetector, add_rigid_bodies, add_shrink_modifier,
+                                   configure_rigid_body, cull_passive_candidates, data_object_indices,
+                                   read_world_matrices, remove_rigid_bodies, remove_shrink_modifier,
+                                   shrink_strength, write_world_matrices)
+from ..utils.physics_geometry import get_proxy_cache, get_shape_classifier, resolve_collision_shape
+from ..utils.physics_journal import JOURNAL_PROP, PhysicsJournal
+from ..utils.physics_islands import IslandSimulation, cluster_islands
+from ..utils.physics_stats import PhysicsRunStats, begin_run, end_run, get_current_run, get_last_run
+from ..utils.physics_bake import MotionRecorder
+from ..utils.physics_takes import PhysicsTakes, jitter_matrices
+from ..utils.physics_placement import get_tree_cache, resolve_initial_overlaps
+from ..utils.physics_result_cache import compute_input_hash, get_result_cache
+from ..utils.physics_tuning import (estimate_seconds, frame_work, get_substeps, measure_scene, scene_gravity,
+                                    set_last_estimate, set_substeps, tune_simulation)
 
 
 def get_atprops(context):
@@ -23,152 +39,468 @@ def get_atprops(context):
     return wm.atprops
 
 
-def add_shrink_modifier(obj, strength):
-    """添加或更新收缩/膨胀修改器"""
-    mod_name = "AT_Physics_Shrink"
-    mod = obj.modifiers.get(mod_name)
-    if not mod:
-        mod = obj.modifiers.new(name=mod_name, type='DISPLACE')
-    
-    mod.strength = strength
-    mod.mid_level = 0.0  # 确保从表面开始偏移
-    # 确保修改器在最上层（或合适位置），通常物理计算取最终结果，所以只要开启即可
-    # 为了确保效果，可以考虑移到最前？但通常保持默认添加顺序即可，除非有Subsurf
-    return mod
+def report_missing_meshes(operator, journal):
+    """报告会话结束时找不到、无法换回的原始网格"""
+    missing = journal.missing_meshes
+    if missing:
+        more = f" ... (+{len(missing) - 3})" if len(missing) > 3 else ""
+        operator.report({'WARNING'}, f"找不到 {len(missing)} 个原始网格，对象仍在使用临时碰撞网格: {', '.join(missing[:3])}{more}")
 
 
-def remove_shrink_modifier(obj):
-    """移除收缩/膨胀修改器"""
-    mod_name = "AT_Physics_Shrink"
-    mod = obj.modifiers.get(mod_name)
-    if mod:
-        obj.modifiers.remove(mod)
+class PhysicsSessionMixin:
+    """物理模拟会话：保存/恢复场景设置，添加/移除刚体，供交互模拟和后台模拟共用"""
 
+    # 是否允许把下落过程烘焙为关键帧（多次尝试时只保留最终姿态）
+    allow_motion_bake = True
+    # 模拟结果缓存键，None 表示本次模拟不写入缓存
+    cache_key = None
 
-class PhysicsCalculateOperator(bpy.types.Operator):
-    """计算物理模拟"""
-    bl_idname = "physics.calculate"
-    bl_label = "Calculate Physics"
-    bl_description = ""
-    bl_options = {"REGISTER"}
+    def collect_colliders(self, context, atprops):
+        """获取参与模拟的碰撞体：自定义碰撞体列表或所有可见的未选中网格"""
+        if atprops.physics_use_custom_colliders:
+            # Use custom colliders
+            return [item.obj for item in atprops.physics_custom_colliders if item.obj]
+        # Use visible objects that are not selected
+        return [obj for obj in context.visible_objects if not obj.select_get() and obj.type == "MESH"]
 
-    @classmethod
-    def poll(cls, context):
-        return True
+    def tune_parameters(self, context, atprops, selected_objects):
+        """按主动对象的最小尺寸和下落高度选择子步数、迭代次数和时间缩放，并估算耗时"""
+        selected_set = set(selected_objects)
+        colliders = [obj for obj in self.collect_colliders(context, atprops) if obj not in selected_set]
+        if not atprops.physics_use_custom_colliders and atprops.physics_cull_colliders:
+            colliders, _culled = cull_passive_candidates(selected_objects, colliders, atprops.physics_cull_padding)
+        tuning = tune_simulation(measure_scene(selected_objects, colliders), scene_gravity(context.scene))
+        tuning["seconds"] = estimate_seconds(tuning["cost"], get_last_run())
+        return set_last_estimate(tuning)
+
+    def simulation_parameters(self, context, atprops, selected_objects):
+        """返回 (时间缩放, 求解迭代次数, 每帧子步数)，手动模式下子步数为 None 表示保持场景设置"""
+        if atprops.physics_auto_tune:
+            tuning = self.tune_parameters(context, atprops, selected_objects)
+            return tuning["time_scale"], tuning["iterations"], tuning["substeps"]
+        return atprops.physics_time_scale, max(1, int(atprops.physics_solver_iterations)), None
+
+    def settle_frame_count(self, context, atprops, selected_objects):
+        """快速沉降的帧数：自动调参时使用估算的沉降帧数，与面板显示的计算量一致"""
+        if atprops.physics_auto_tune:
+            return self.tune_parameters(context, atprops, selected_objects)["frames"]
+        return max(1, int(atprops.physics_settle_frames))
+
+    def swap_offset_meshes(self, objects, strength):
+        """换入沿法线预偏移的网格，代替逐帧求值的收缩修改器
+
+        带修改器或形状键的对象偏移原始网格与修改器栈末端的 Displace 结果不同，
+        这些对象以及创建失败的对象仍使用收缩修改器
+        """
+        if abs(strength) < 1e-9:
+            return
+        cache = get_proxy_cache()
+        # 共用网格的对象只计算一次哈希
+        offsets = {}
+        fallback = []
+        for obj in objects:
+            if any(mod.name != SHRINK_MODIFIER for mod in obj.modifiers) or obj.data.shape_keys is not None:
+                fallback.append(obj)
+                continue
+            try:
+                key = obj.data.as_pointer()
+                if key not in offsets:
+                    offsets[key] = cache.get_offset_mesh(obj.data, strength)
+                offset = offsets[key]
+                self.journal.record_mesh_swap(obj, obj.data)
+                obj.data = offset
+            except Exception as e:
+                print(f"ATools: 创建预偏移网格失败 {obj.name}: {str(e)}")
+                fallback.append(obj)
+        if fallback:
+            self.journal.record_modifiers(fallback)
+            for obj in fallback:
+                add_shrink_modifier(obj, strength)
+
+    def cache_settings(self, context, atprops, selected_objects, frame_count):
+        """影响模拟结果的设置，参与缓存键计算
+
+        使用模拟实际采用的时间缩放、迭代次数和子步数（自动调参或场景设置），以及场景重力
+        """
+        scene = context.scene
+        world = scene.rigidbody_world
+        time_scale, solver_iterations, substeps = self.simulation_parameters(context, atprops, selected_objects)
+        if substeps is None and world is not None:
+            substeps = get_substeps(world)
+        return {
+            "frames": frame_count,
+            "fps": PhysicsSettings.DEFAULT_FPS,
+            "friction": atprops.physics_friction,
+            "restitution": atprops.physics_restitution,
+            "collision_margin": atprops.physics_collision_margin,
+            "collision_shape": atprops.physics_collision_shape,
+            "auto_shape_tolerance": atprops.physics_auto_shape_tolerance,
+            "solver_iterations": solver_iterations,
+            "time_scale": time_scale,
+            "substeps": substeps,
+            "gravity": [scene.use_gravity, list(scene.gravity),
+                        world.effector_weights.gravity if world is not None else 1.0],
+            "split_impulse": atprops.physics_split_impulse,
+            "use_proxies": atprops.physics_use_proxies,
+            "proxy": [atprops.physics_proxy_type, atprops.physics_proxy_min_vertices, atprops.physics_proxy_resolution],
+            "prebake_margin": atprops.physics_prebake_margin,
+            "fix_overlaps": atprops.physics_fix_overlaps,
+            "rest": [atprops.physics_rest_detection, atprops.physics_rest_linear_threshold,
+                     atprops.physics_rest_angular_threshold, atprops.physics_rest_check_interval],
+        }
+
+    def apply_cached_result(self, context, frame_count):
+        """按输入哈希查找模拟结果缓存，命中时直接应用并返回对象数量，未命中返回 0"""
+        self.cache_key = None
+        atprops = get_atprops(context)
+        # 烘焙动画需要完整的模拟过程，不能使用缓存
+        if not atprops.physics_use_result_cache or atprops.physics_bake_motion:
+            return 0
+        selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+        selected_set = set(selected_objects)
+        colliders = [obj for obj in self.collect_colliders(context, atprops) if obj not in selected_set]
+        if not atprops.physics_use_custom_colliders and atprops.physics_cull_colliders:
+            colliders, _culled = cull_passive_candidates(selected_objects, colliders, atprops.physics_cull_padding)
+        self.cache_key = compute_input_hash(selected_objects, colliders, self.cache_settings(context, atprops, selected_objects, frame_count))
+        
+        hit = get_result_cache().lookup(self.cache_key)
+        if hit is None:
+            return 0
+        names, matrices, _meta = hit
+        objects = bpy.data.objects
+        found = [(objects.get(name), index) for index, name in enumerate(names)]
+        found = [(obj, index) for obj, index in found if obj is not None]
+        write_world_matrices([obj for obj, _index in found], matrices[[index for _obj, index in found]])
+        self.cache_key = None
+        return len(found)
+
+    def fix_initial_overlaps(self, context, atprops, selected_objects):
+        """分开互相穿插的主动对象并抬高与碰撞体穿插的对象"""
+        colliders = self.collect_colliders(context, atprops)
+        if not atprops.physics_use_custom_colliders:
+            colliders, _culled = cull_passive_candidates(selected_objects, colliders, atprops.physics_cull_padding)
+        self.fixed_pairs, self.unresolved_pairs = resolve_initial_overlaps(
+            selected_objects, colliders, context.evaluated_depsgraph_get())
+        if self.fixed_pairs:
+            context.view_layer.update()
+            pairs = ", ".join(f"{a} / {b}" for a, b in self.fixed_pairs[:5])
+            more = f" ... (+{len(self.fixed_pairs) - 5})" if len(self.fixed_pairs) > 5 else ""
+            self.report({'INFO'}, f"已修正 {len(self.fixed_pairs)} 对初始穿插: {pairs}{more}")
+        if self.unresolved_pairs:
+            self.report({'WARNING'}, f"仍有 {len(self.unresolved_pairs)} 对对象穿插，模拟开始时可能弹开")
 
     def add_passive_bodies(self, context, add):
         """添加或移除被动刚体"""
         atprops = get_atprops(context)
         active_object = context.active_object
 
-        objects_to_process = []
-        if atprops.physics_use_custom_colliders:
-            # Use custom colliders
-            for item in atprops.physics_custom_colliders:
-                if item.obj:  # Ensure object is valid
-                    objects_to_process.append(item.obj)
+        if not add and getattr(self, 'passive_objects', None) is not None:
+            # 只移除本次添加的被动刚体
+            objects_to_process = self.passive_objects
         else:
-            # Use visible objects that are not selected
-            objects_to_process = [obj for obj in context.visible_objects if not obj.select_get() and obj.type == "MESH"]
-
-        for obj in objects_to_process:
-            context.view_layer.objects.active = obj
-            if add and obj.rigid_body == None:
-                bpy.ops.rigidbody.object_add()
-                obj.rigid_body.friction = atprops.physics_friction
-                obj.rigid_body.use_margin = True
-                
-                # 使用 Displace 修改器来处理 Margin (收缩/膨胀)
-                safety_margin = 0.001
-                target_margin = atprops.physics_collision_margin
-                
-                physics_margin = safety_margin
-                displace_strength = target_margin - physics_margin
-                
-                add_shrink_modifier(obj, displace_strength)
-                
-                obj.rigid_body.collision_margin = physics_margin
-                obj.rigid_body.restitution = atprops.physics_restitution
-                obj.rigid_body.type = "PASSIVE"
-                obj.rigid_body.collision_shape = atprops.physics_collision_shape
-            elif not add and obj.rigid_body != None:
-                bpy.ops.rigidbody.object_remove()
+            objects_to_process = self.collect_colliders(context, atprops)
+            
+            # 剔除不在主动对象下落范围内的碰撞体
+            if add and not atprops.physics_use_custom_colliders and atprops.physics_cull_colliders:
+                active_objects = [obj for obj in context.selected_objects if obj.type == "MESH"]
+                objects_to_process, self.culled_count = cull_passive_candidates(
+                    active_objects, objects_to_process, atprops.physics_cull_padding)
+
+        start = time.perf_counter()
+        if add:
+            self.passive_objects = [obj for obj in objects_to_process if obj.rigid_body == None]
+            # AUTO 形状按原始网格分类，必须在换入代理或预偏移网格之前
+            for obj in self.passive_objects:
+                resolve_collision_shape(obj, atprops)
+            
+            # 高面数碰撞体使用缓存的简化代理网格
+            if atprops.physics_use_proxies:
+                proxy_cache = get_proxy_cache()
+                for obj in self.passive_objects:
+                    if len(obj.data.vertices) < atprops.physics_proxy_min_vertices:
+                        continue
+                    try:
+                        proxy = proxy_cache.get_proxy(obj.data, atprops.physics_proxy_type, atprops.physics_proxy_resolution)
+                        self.journal.record_mesh_swap(obj, obj.data)
+                        obj.data = proxy
+                    except Exception as e:
+                        print(f"ATools: 创建碰撞代理失败 {obj.name}: {str(e)}")
+            
+            # 先写日志再修改，崩溃后也能按日志恢复
+            self.journal.record_rigid_bodies(self.passive_objects)
+            if atprops.physics_prebake_margin:
+                self.swap_offset_meshes(self.passive_objects, shrink_strength(atprops))
+            else:
+                self.journal.record_modifiers(self.passive_objects)
+            if atprops.physics_batch_setup:
+                # 一次操作符调用添加全部刚体，再在循环中设置属性
+                add_rigid_bodies(context, self.passive_objects, 'PASSIVE')
+            else:
+                for obj in self.passive_objects:
+                    context.view_layer.objects.active = obj
+                    bpy.ops.rigidbody.object_add()
+            for obj in self.passive_objects:
+                configure_rigid_body(obj, atprops, 'PASSIVE', not atprops.physics_prebake_margin)
+        else:
+            if atprops.physics_batch_setup:
+                remove_rigid_bodies(context, objects_to_process)
+            else:
+                for obj in objects_to_process:
+                    if obj.rigid_body != None:
+                        context.view_layer.objects.active = obj
+                        bpy.ops.rigidbody.object_remove()
+        
+        elapsed = (time.perf_counter() - start) * 1000.0
+        mode = "批量" if atprops.physics_batch_setup else "逐个"
+        print(f"ATools: {'添加' if add else '移除'}被动刚体 ({mode}) {len(objects_to_process)} 个对象, 耗时 {elapsed:.1f} ms")
 
         context.view_layer.objects.active = active_object
 
-    def invoke(self, context, event):
+    def begin_session(self, context, frame_count):
+        """保存场景设置并搭建刚体模拟，返回参与模拟的选中对象"""
+        # 验证选择的对象
+        selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+        
+        atprops = get_atprops(context)
+        scene = context.scene
+        self.selected_objects = selected_objects
+        self.culled_count = 0
+        self.passive_objects = None
+        # 网格指针可能已被复用，每次会话重新校验 AUTO 形状缓存
+        get_shape_classifier().clear()
+        
+        # 上次会话异常中断时先按日志恢复
+        stale_journal = PhysicsJournal.load(scene)
+        if stale_journal is not None:
+            stale_journal.rollback(context)
+            report_missing_meshes(self, stale_journal)
+            print("ATools: 已恢复上次未完成的物理会话")
+        self.journal = PhysicsJournal(scene)
+        
+        # Handle selection for custom colliders
+        if atprops.physics_use_custom_colliders:
+            deselected_objects = [item.obj for item in atprops.physics_custom_colliders if item.obj and item.obj.select_get()]
+            self.journal.record_deselected(deselected_objects)
+            for obj in deselected_objects:
+                obj.select_set(False)
+
+        # 修正初始穿插，避免模拟开始时接触爆炸
+        self.fixed_pairs, self.unresolved_pairs = [], []
+        if atprops.physics_fix_overlaps:
+            self.fix_initial_overlaps(context, atprops, selected_objects)
+
+        # 确保刚体世界存在
+        if scene.rigidbody_world == None:
+            bpy.ops.rigidbody.world_add()
+
+        # 保存当前设置
+        rigidbody_world = scene.rigidbody_world
+        self.journal.record_settings()
+
+        # 应用物理模拟设置
+        time_scale, solver_iterations, substeps = self.simulation_parameters(context, atprops, selected_objects)
+        # 静止检测会提前结束，ETA 按沉降帧数估算；在搭建刚体之前测量场景
+        expected_frames = self.settle_frame_count(context, atprops, selected_objects) \
+            if atprops.physics_rest_detection else None
+        rigidbody_world.time_scale = time_scale
+        scene.render.fps = PhysicsSettings.DEFAULT_FPS
+        scene.frame_start = 0
+        scene.frame_end = frame_count
+        scene.frame_current = 0
+        rigidbody_world.enabled = True
+        rigidbody_world.use_split_impulse = atprops.physics_split_impulse
+        rigidbody_world.solver_iterations = solver_iterations
+        if substeps is not None:
+            set_substeps(rigidbody_world, substeps)
+        self.tuned_parameters = {"time_scale": time_scale, "solver_iterations": solver_iterations,
+                                 "substeps": get_substeps(rigidbody_world)}
+        # 缓存范围需覆盖整个模拟，否则刚体会在缓存结束帧停止
+        rigidbody_world.point_cache.frame_start = 0
+        rigidbody_world.point_cache.frame_end = frame_count
+
+        # 添加被动刚体
+        self.add_passive_bodies(context, True)
+
+        # 为选中对象添加主动物理
+        self.journal.record_rigid_bodies(selected_objects)
+        for obj in selected_objects:
+            resolve_collision_shape(obj, atprops)
+        if atprops.physics_prebake_margin:
+            self.swap_offset_meshes(selected_objects, shrink_strength(atprops))
+        else:
+            self.journal.record_modifiers(selected_objects)
+        bpy.ops.physics.add_active(use_shrink_modifier=not atprops.physics_prebake_margin)
+        
+        # 静止检测，未启用提前结束时仍用于统计活动/静止刚体数量
+        self.stop_at_rest = atprops.physics_rest_detection
+        self.settled = False
+        self.rest_detector = RestDetector(
+            selected_objects,
+            atprops.physics_rest_linear_threshold,
+            atprops.physics_rest_angular_threshold,
+            atprops.physics_rest_check_interval
+        )
+        
+        # 运行统计
+        self.stats = begin_run(PhysicsRunStats(
+            self.bl_idname.split('.')[-1].upper(),
+            len(selected_objects),
+            len(self.passive_objects or ()),
+            frame_count,
+            self.culled_count,
+            frame_work(len(selected_objects), self.tuned_parameters["substeps"], solver_iterations),
+            expected_frames
+        ))
+        self.stats.start()
+        
+        # 记录下落过程，结束后烘焙为关键帧
+        self.motion_recorder = None
+        if atprops.physics_bake_motion and self.allow_motion_bake:
+            self.motion_recorder = MotionRecorder(selected_objects)
+            self.motion_recorder.capture(0)
+        
+        return selected_objects
+
+    def update_frame(self, frame):
+        """记录当前帧的统计，返回 True 表示所有主动对象已经静止且启用了提前结束"""
+        at_rest = self.rest_detector.update(frame)
+        self.frame_recorded = self.stats.record(frame, self.rest_detector.moving_count)
+        if self.motion_recorder is not None:
+            self.motion_recorder.capture(frame)
+        self.settled = at_rest and self.stop_at_rest
+        return self.settled
+
+    def settings_snapshot(self, context):
+        """运行日志中记录的模拟设置"""
+        atprops = get_atprops(context)
+        # 会话结束时场景设置已恢复，记录模拟实际使用的值
+        tuned = getattr(self, 'tuned_parameters', None) or {}
+        return {
+            "auto_tune": atprops.physics_auto_tune,
+            "time_scale": tuned.get("time_scale", atprops.physics_time_scale),
+            "solver_iterations": tuned.get("solver_iterations", atprops.physics_solver_iterations),
+            "substeps": tuned.get("substeps"),
+            "split_impulse": atprops.physics_split_impulse,
+            "collision_shape": atprops.physics_collision_shape,
+            "collision_margin": atprops.physics_collision_margin,
+            "batch_setup": atprops.physics_batch_setup,
+            "cull_colliders": atprops.physics_cull_colliders,
+            "use_proxies": atprops.physics_use_proxies,
+            "rest_detection": atprops.physics_rest_detection,
+        }
+
+    def abort_session(self, context):
+        """搭建失败时按日志撤销已做的修改"""
+        journal = getattr(self, 'journal', None)
+        if journal is not None and PhysicsJournal.exists(journal.scene):
+            journal.rollback(context)
+            report_missing_meshes(self, journal)
+        get_proxy_cache().release()
+        # 多次尝试时之前的会话已经正常结束，只结束仍在进行的统计
+        stats = getattr(self, 'stats', None)
+        if stats is not None and get_current_run() is stats:
+            end_run(stats)
+
+    def run_headless(self, context, frame_count):
+        """不依赖视口播放直接逐帧步进模拟，返回 (模拟对象, 实际模拟帧数)"""
+        selected_objects = self.begin_session(context, frame_count)
         try:
-            # 验证选择的对象
-            selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
-            
-            # Initialize variables here instead of in __init__
-            self.fps = 0
-            self.frame_start = 0
-            self.frame_end = 0
-            self.frame_current = 0
-            self.world_enabled = True
-            self.use_split_impulse = True
-            self.world_time_scale = 1.0
-            self.solver_iterations = PhysicsSettings.DEFAULT_SOLVER_ITERATIONS
+            # 每帧只做依赖图求值，不重绘视口
+            scene = context.scene
+            for frame in range(1, frame_count + 1):
+                scene.frame_set(frame)
+                if self.update_frame(frame):
+                    frame_count = frame
+                    break
+        finally:
+            # 通过 PhysicsApplyOperator 应用最终变换并恢复场景
+            self.end_session(context)
+        return selected_objects, frame_count
+
+    def end_session(self, context):
+        """应用模拟结果，移除临时刚体并恢复场景设置"""
+        self.stats.record(context.scene.frame_current)
+        self.stats.finish(self.settled)
+        if self.motion_recorder is not None:
+            self.motion_recorder.capture(context.scene.frame_current)
+        bpy.ops.physics.apply()
+
+        # 按日志恢复场景设置、移除被动刚体和修改器、换回网格并恢复选择，
+        # 只处理本次会话实际修改过的对象
+        self.journal.rollback(context)
+        report_missing_meshes(self, self.journal)
+        # 换回原网格后释放不再使用的代理和预偏移网格
+        get_proxy_cache().release()
+        
+        # 关键帧从场景原来的起始帧开始
+        if self.motion_recorder is not None:
+            atprops = get_atprops(context)
+            try:
+                key_count, frame_count = self.motion_recorder.write_keys(
+                    context.scene.frame_start,
+                    atprops.physics_bake_reduce_keys,
+                    atprops.physics_bake_tolerance,
+                    atprops.physics_bake_angle_tolerance
+                )
+                self.report({'INFO'}, f"已烘焙 {len(self.motion_recorder.objects)} 个对象的下落动画 ({frame_count} 帧, 共 {key_count} 个关键帧)")
+            except Exception as e:
+                self.report({'WARNING'}, f"烘焙下落动画失败: {str(e)}")
+        
+        self.stats.write_log(self.settings_snapshot(context))
+        end_run(self.stats)
+        
+        # 保存结果，下次相同输入直接应用
+        if self.cache_key is not None and self.stats.stop_reason != "CANCELLED":
+            objects = self.selected_objects
+            get_result_cache().store(self.cache_key, objects, read_world_matrices(objects, data_object_indices(objects)),
+                                     {"frames": self.stats.frame})
+        self.cache_key = None
+
+
+class PhysicsCalculateOperator(PhysicsSessionMixin, bpy.types.Operator):
+    """计算物理模拟"""
+    bl_idname = "physics.calculate"
+    bl_label = "Calculate Physics"
+    bl_description = ""
+    bl_options = {"REGISTER"}
 
+    @classmethod
+    def poll(cls, context):
+        return True
+
+    def invoke(self, context, event):
+        try:
             wm = context.window_manager
             atprops = get_atprops(context)
+            
+            # 相同输入已模拟过时直接应用缓存结果
+            cached_count = self.apply_cached_result(context, PhysicsSettings.MAX_SIMULATION_FRAMES)
+            if cached_count:
+                bpy.ops.ed.undo_push(message="Calc Physics")
+                self.report({'INFO'}, f"命中模拟缓存，已直接应用 {cached_count} 个对象的结果")
+                return {"FINISHED"}
+            
+            # 保存场景设置并搭建刚体
+            selected_objects = self.begin_session(context, PhysicsSettings.MAX_SIMULATION_FRAMES)
+            
             wm.modal_handler_add(self)
             atprops.running_physics_calculation = True
-            
-            # Handle selection for custom colliders
-            self.deselected_objects = []
-            if atprops.physics_use_custom_colliders:
-                for item in atprops.physics_custom_colliders:
-                    if item.obj and item.obj.select_get():
-                        item.obj.select_set(False)
-                        self.deselected_objects.append(item.obj)
-
-            # 确保刚体世界存在
-            if context.scene.rigidbody_world == None:
-                bpy.ops.rigidbody.world_add()
-
-            # 保存当前设置
-            scene = context.scene
-            self.fps = scene.render.fps
-            self.frame_start = scene.frame_start
-            self.frame_end = scene.frame_end
-            self.frame_current = scene.frame_current
-            self.world_enabled = scene.rigidbody_world.enabled
-            self.use_split_impulse = scene.rigidbody_world.use_split_impulse
-            self.world_time_scale = scene.rigidbody_world.time_scale
-            self.solver_iterations = scene.rigidbody_world.solver_iterations
-
-            # 应用物理模拟设置
-            scene.rigidbody_world.time_scale = atprops.physics_time_scale
-            scene.render.fps = PhysicsSettings.DEFAULT_FPS
-            scene.frame_start = 0
-            scene.frame_end = PhysicsSettings.MAX_SIMULATION_FRAMES
-            scene.frame_current = 0
-            scene.rigidbody_world.enabled = True
-            scene.rigidbody_world.use_split_impulse = atprops.physics_split_impulse
-            scene.rigidbody_world.solver_iterations = max(1, int(atprops.physics_solver_iterations))
-
-            # 添加被动刚体
-            self.add_passive_bodies(context, True)
-
-            # 为选中对象添加主动物理
-            bpy.ops.physics.add_active()
 
             # 开始播放动画
             bpy.ops.screen.animation_play()
 
             # 开始进度条
-            tot = scene.frame_end
+            tot = context.scene.frame_end
             wm.progress_begin(0, tot)
             
-            self.report({'INFO'}, f"开始物理模拟 ({len(selected_objects)} 个对象)")
+            self.report({'INFO'}, f"开始物理模拟 ({len(selected_objects)} 个对象, 跳过 {self.culled_count} 个碰撞体)")
             return {"RUNNING_MODAL"}
             
         except ATOperationError as e:
             self.report({'ERROR'}, str(e))
             return {"CANCELLED"}
         except Exception as e:
+            self.abort_session(context)
             self.report({'ERROR'}, f"启动物理模拟失败: {str(e)}")
             return {"CANCELLED"}
 
@@ -177,36 +509,8 @@ class PhysicsCalculateOperator(bpy.types.Operator):
         atprops = get_atprops(context)
         atprops.running_physics_calculation = False
         bpy.ops.screen.animation_play()
-        bpy.ops.physics.apply()
 
-        context.scene.render.fps = self.fps
-        context.scene.frame_start = self.frame_start
-        context.scene.frame_end = self.frame_end
-        context.scene.frame_current = self.frame_current
-        context.scene.rigidbody_world.enabled = self.world_enabled
-        context.scene.rigidbody_world.use_split_impulse = self.use_split_impulse
-        context.scene.rigidbody_world.time_scale = self.world_time_scale
-        context.scene.rigidbody_world.solver_iterations = self.solver_iterations
-
-        self.add_passive_bodies(context, False)
-
-        # Clean up shrink modifiers from active objects
-        # We need to find which objects were active. 
-        # Since we don't store the list explicitly in this operator instance (except selection),
-        # we can iterate over selection (if selection hasn't changed) or check all visible objects for the modifier.
-        # Checking all visible objects is safer and fast enough.
-        for obj in context.visible_objects:
-            if obj.type == 'MESH':
-                 remove_shrink_modifier(obj)
-
-        # Restore selection
-        if hasattr(self, 'deselected_objects'):
-             for obj in self.deselected_objects:
-                 if obj:
-                     try:
-                         obj.select_set(True)
-                     except:
-                         pass
+        self.end_session(context)
 
         wm.progress_end()
         bpy.ops.ed.undo_push(message="Calc Physics")
@@ -218,16 +522,336 @@ class PhysicsCalculateOperator(bpy.types.Operator):
         if event.type in {"ESC"} or context.scene.frame_current >= PhysicsSettings.MAX_SIMULATION_FRAMES or not atprops.running_physics_calculation:
             self.exit_modal(context, wm)
             return {"CANCELLED"}
+        # 所有对象静止后提前结束
+        if self.update_frame(context.scene.frame_current):
+            self.report({'INFO'}, f"所有对象已静止，模拟在第 {context.scene.frame_current} 帧结束")
+            self.exit_modal(context, wm)
+            return {"FINISHED"}
         wm.progress_update(context.scene.frame_current)
+        if self.frame_recorded:
+            # 刷新面板上的 ETA
+            for area in context.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
         return {"PASS_THROUGH"}
 
 
+class PhysicsSettleOperator(PhysicsSessionMixin, bpy.types.Operator):
+    """后台快速沉降：直接逐帧步进刚体世界，不依赖视口播放"""
+    bl_idname = "physics.settle"
+    bl_label = "Fast Settle"
+    bl_description = "Step the rigid body simulation directly without viewport playback (works in background mode)"
+    bl_options = {"REGISTER"}
+
+    def execute(self, context):
+        try:
+            atprops = get_atprops(context)
+            selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+            frame_count = self.settle_frame_count(context, atprops, selected_objects)
+            
+            # 相同输入已模拟过时直接应用缓存结果
+            cached_count = self.apply_cached_result(context, frame_count)
+            if cached_count:
+                bpy.ops.ed.undo_push(message="Settle Physics")
+                self.report({'INFO'}, f"命中模拟缓存，已直接应用 {cached_count} 个对象的结果")
+                return {'FINISHED'}
+            
+            start = time.perf_counter()
+            selected_objects, frame_count = self.run_headless(context, frame_count)
+            elapsed = time.perf_counter() - start
+            
+            bpy.ops.ed.undo_push(message="Settle Physics")
+            self.report({'INFO'}, f"快速沉降完成 ({len(selected_objects)} 个对象, {frame_count} 帧, {elapsed:.2f} 秒, 跳过 {self.culled_count} 个碰撞体)")
+            return {'FINISHED'}
+            
+        except ATOperationError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        except Exception as e:
+            self.abort_session(context)
+            self.report({'ERROR'}, f"快速沉降失败: {str(e)}")
+            return {'CANCELLED'}
+
+
+class PhysicsRunTakesOperator(PhysicsSessionMixin, bpy.types.Operator):
+    """多次尝试：用不同的随机扰动依次后台沉降，只保存每次的最终姿态"""
+    bl_idname = "physics.run_takes"
+    bl_label = "Run Takes"
+    bl_description = "Settle the selection several times from jittered starting poses and store each final pose as a take"
+    bl_options = {"REGISTER"}
+
+    allow_motion_bake = False
+
+    def execute(self, context):
+        try:
+            selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+            atprops = get_atprops(context)
+            frame_count = self.settle_frame_count(context, atprops, selected_objects)
+            
+            start = time.perf_counter()
+            initial = read_world_matrices(selected_objects, data_object_indices(selected_objects))
+            takes = PhysicsTakes(context.scene)
+            takes.clear()
+            takes.set_initial(selected_objects, initial)
+            
+            try:
+                for index in range(atprops.physics_take_count):
+                    seed = atprops.physics_take_seed + index
+                    # 每次都从扰动后的初始姿态开始
+                    write_world_matrices(selected_objects, jitter_matrices(
+                        initial, seed, atprops.physics_take_jitter, atprops.physics_take_rotation_jitter))
+                    _objects, frames = self.run_headless(context, frame_count)
+                    final = read_world_matrices(selected_objects, data_object_indices(selected_objects))
+                    takes.add_take(selected_objects, final, seed, frames)
+            except Exception:
+                # 失败时回到初始姿态
+                write_world_matrices(selected_objects, initial)
+                raise
+            elapsed = time.perf_counter() - start
+            
+            atprops.physics_active_take = len(takes.takes) - 1
+            bpy.ops.ed.undo_push(message="Physics Takes")
+            self.report({'INFO'}, f"完成 {len(takes.takes)} 次模拟尝试 ({len(selected_objects)} 个对象, {elapsed:.2f} 秒)")
+            return {'FINISHED'}
+            
+        except ATOperationError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        except Exception as e:
+            self.abort_session(context)
+            self.report({'ERROR'}, f"多次模拟失败: {str(e)}")
+            return {'CANCELLED'}
+
+
+class PhysicsApplyTakeOperator(bpy.types.Operator):
+    """切换到保存的模拟结果"""
+    bl_idname = "physics.apply_take"
+    bl_label = "Apply Take"
+    bl_description = "Move the objects to a stored take (-1 restores the pose before the takes were run)"
+    bl_options = {"REGISTER", "UNDO"}
+
+    index: IntProperty(
+        name="Take",
+        default=0,
+        min=-1
+    ) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return PhysicsTakes.exists(context.scene)
+
+    def execute(self, context):
+        takes = PhysicsTakes(context.scene)
+        if self.index >= len(takes.takes):
+            self.report({'ERROR'}, f"不存在第 {self.index + 1} 次模拟结果")
+            return {'CANCELLED'}
+        count = takes.apply_take(self.index)
+        get_atprops(context).physics_active_take = self.index
+        self.report({'INFO'}, f"已切换 {count} 个对象的姿态")
+        return {'FINISHED'}
+
+
+class PhysicsClearTakesOperator(bpy.types.Operator):
+    """删除保存的模拟结果"""
+    bl_idname = "physics.clear_takes"
+    bl_label = "Clear Takes"
+    bl_description = "Delete all stored takes"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return PhysicsTakes.exists(context.scene)
+
+    def execute(self, context):
+        PhysicsTakes(context.scene).clear()
+        self.report({'INFO'}, "已删除所有模拟结果")
+        return {'FINISHED'}
+
+
+class PhysicsSettleParallelOperator(PhysicsSessionMixin, bpy.types.Operator):
+    """并行沉降：把互不影响的物理岛分发到多个后台 Blender 进程中模拟"""
+    bl_idname = "physics.settle_parallel"
+    bl_label = "Parallel Settle"
+    bl_description = "Split the selection into independent islands and settle them in parallel background Blender processes"
+    bl_options = {"REGISTER"}
+
+    def island_mesh_swaps(self, atprops, active_objects, passive_objects):
+        """与串行沉降相同的网格替换：被动对象的碰撞代理和预偏移网格
+
+        不修改主进程中的对象，返回 ({对象名称: 网格名称}, 已预偏移的对象名称列表)，
+        由工作进程加载后替换
+        """
+        cache = get_proxy_cache()
+        meshes = {}
+        if atprops.physics_use_proxies:
+            for obj in passive_objects:
+                if len(obj.data.vertices) < atprops.physics_proxy_min_vertices:
+                    continue
+                try:
+                    meshes[obj] = cache.get_proxy(obj.data, atprops.physics_proxy_type, atprops.physics_proxy_resolution)
+                except Exception as e:
+                    print(f"ATools: 创建碰撞代理失败 {obj.name}: {str(e)}")
+        
+        prebaked = []
+        strength = shrink_strength(atprops)
+        if atprops.physics_prebake_margin and abs(strength) >= 1e-9:
+            for obj in [*active_objects, *passive_objects]:
+                if any(mod.name != SHRINK_MODIFIER for mod in obj.modifiers) or obj.data.shape_keys is not None:
+                    continue
+                try:
+                    meshes[obj] = cache.get_offset_mesh(meshes.get(obj, obj.data), strength)
+                    prebaked.append(obj.name)
+                except Exception as e:
+                    print(f"ATools: 创建预偏移网格失败 {obj.name}: {str(e)}")
+        return {obj.name: mesh.name for obj, mesh in meshes.items()}, prebaked
+
+    def execute(self, context):
+        self.simulation = None
+        self._timer = None
+        try:
+            selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+            atprops = get_atprops(context)
+            if not bpy.app.binary_path:
+                raise ATOperationError("找不到 Blender 可执行文件，无法启动后台进程")
+            
+            self.start_time = time.perf_counter()
+            selected_set = set(selected_objects)
+            colliders = [obj for obj in self.collect_colliders(context, atprops) if obj not in selected_set]
+            islands = cluster_islands(selected_objects, colliders, atprops.physics_cull_padding)
+            if len(islands) < 2:
+                # 只有一个岛时没有并行的意义，直接在当前进程中沉降
+                self.report({'INFO'}, "所有对象位于同一个物理岛，改用快速沉降")
+                return bpy.ops.physics.settle()
+            
+            # AUTO 形状按原始网格分类，必须在计算代理或预偏移网格之前
+            shapes = {obj.name: resolve_collision_shape(obj, atprops) for obj in [*selected_objects, *colliders]} \
+                if atprops.physics_collision_shape == 'AUTO' else {}
+            mesh_swaps, prebaked = self.island_mesh_swaps(atprops, selected_objects, colliders)
+            time_scale, solver_iterations, substeps = self.simulation_parameters(context, atprops, selected_objects)
+            scene = context.scene
+            world = scene.rigidbody_world
+            settings = {
+                "frames": self.settle_frame_count(context, atprops, selected_objects),
+                "fps": PhysicsSettings.DEFAULT_FPS,
+                # 工作进程使用出厂设置，重力需要从当前场景传入
+                "use_gravity": scene.use_gravity,
+                "gravity": list(scene.gravity),
+                "gravity_weight": world.effector_weights.gravity if world is not None else 1.0,
+                "time_scale": time_scale,
+                "solver_iterations": solver_iterations,
+                "substeps": substeps,
+                "split_impulse": atprops.physics_split_impulse,
+                "friction": atprops.physics_friction,
+                "restitution": atprops.physics_restitution,
+                "collision_margin": atprops.physics_collision_margin,
+                "safety_margin": PhysicsSettings.SAFETY_MARGIN,
+                "collision_shape": atprops.physics_collision_shape,
+                # AUTO 形状在主进程中分类，工作进程按对象名称读取
+                "shapes": shapes,
+                "mesh_swaps": mesh_swaps,
+                "prebaked": prebaked,
+                "rest": {
+                    "enabled": atprops.physics_rest_detection,
+                    "linear": atprops.physics_rest_linear_threshold,
+                    "angular": atprops.physics_rest_angular_threshold,
+                    "interval": atprops.physics_rest_check_interval,
+                    "required": PhysicsSettings.REST_REQUIRED_CHECKS,
+                },
+            }
+            self.simulation = IslandSimulation(islands, settings, atprops.physics_parallel_workers)
+            self.simulation.start()
+            
+            if bpy.app.background:
+                # 后台模式没有事件循环，直接等待全部工作进程
+                wait(self.simulation.futures)
+                return self.finish(context)
+            
+            wm = context.window_manager
+            self._timer = wm.event_timer_add(PhysicsSettings.WORKER_POLL_INTERVAL, window=context.window)
+            wm.modal_handler_add(self)
+            wm.progress_begin(0, len(islands))
+            self.report({'INFO'}, f"开始并行沉降 ({len(islands)} 个物理岛, 按 ESC 取消)")
+            return {'RUNNING_MODAL'}
+            
+        except ATOperationError as e:
+            self.cancel_simulation(context)
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        except Exception as e:
+            self.cancel_simulation(context)
+            self.report({'ERROR'}, f"并行沉降失败: {str(e)}")
+            return {'CANCELLED'}
+
+    def modal(self, context, event):
+        """轮询工作进程，全部结束后写回结果"""
+        wm = context.window_manager
+        if event.type == 'ESC':
+            self.cancel_simulation(context)
+            self.report({'INFO'}, "已取消并行沉降")
+            return {'CANCELLED'}
+        if event.type != 'TIMER' or event.timer != self._timer:
+            return {'PASS_THROUGH'}
+        if not self.simulation.done:
+            wm.progress_update(self.simulation.finished_count)
+            return {'PASS_THROUGH'}
+        self.remove_timer(context)
+        try:
+            return self.finish(context)
+        except Exception as e:
+            self.report({'ERROR'}, f"并行沉降失败: {str(e)}")
+            return {'CANCELLED'}
+
+    def finish(self, context):
+        """写回结果并报告"""
+        simulation, self.simulation = self.simulation, None
+        try:
+            updated, frames, failures = simulation.finish()
+        finally:
+            get_proxy_cache().release()
+        elapsed = time.perf_counter() - self.start_time
+        
+        if updated:
+            bpy.ops.ed.undo_push(message="Parallel Settle Physics")
+            self.report({'INFO'}, f"并行沉降完成 ({len(simulation.islands)} 个物理岛, {updated} 个对象, 最多 {max(frames)} 帧, {elapsed:.2f} 秒)")
+        if failures:
+            error_msg = "模拟失败的物理岛:\n" + "\n".join(failures[:3])
+            if len(failures) > 3:
+                error_msg += f"\n... 还有 {len(failures) - 3} 个物理岛失败"
+            self.report({'WARNING'}, error_msg)
+        return {'FINISHED'} if updated else {'CANCELLED'}
+
+    def remove_timer(self, context):
+        if self._timer is not None:
+            wm = context.window_manager
+            wm.event_timer_remove(self._timer)
+            wm.progress_end()
+            self._timer = None
+
+    def cancel_simulation(self, context):
+        """终止工作进程并释放本次创建的代理网格"""
+        self.remove_timer(context)
+        if self.simulation is not None:
+            self.simulation.cancel()
+            self.simulation = None
+        get_proxy_cache().release()
+
+    def cancel(self, context):
+        # 窗口关闭等情况下 Blender 直接结束模态操作符
+        self.cancel_simulation(context)
+
+
 class PhysicsAddActiveOperator(bpy.types.Operator):
     """为选中对象添加主动物理属性"""
     bl_idname = "physics.add_active"
     bl_label = "Add physics to Assets"
     bl_description = "Sets up Assets as rigidbody objects."
 
+    use_shrink_modifier: BoolProperty(
+        name="Shrink Modifier",
+        description="Apply the collision margin with a Displace modifier (disable when pre-offset meshes are swapped in)",
+        default=True
+    ) # type: ignore
+
     def execute(self, context):
         try:
             # 验证对象选择
@@ -238,52 +862,30 @@ class PhysicsAddActiveOperator(bpy.types.Operator):
             processed_count = 0
             failed_objects = []
             
+            start = time.perf_counter()
+            if atprops.physics_batch_setup:
+                # 一次操作符调用添加全部刚体
+                add_rigid_bodies(context, selected_objects, 'ACTIVE')
+            
             for obj in selected_objects:
                 try:
-                    context.view_layer.objects.active = obj
-                    bpy.ops.rigidbody.object_add()
-                    obj.rigid_body.friction = atprops.physics_friction
-                    obj.rigid_body.use_margin = True
-                    
-                    # 使用 Displace 修改器来处理 Margin (收缩/膨胀)
-                    # 为了保证物理计算稳定性（特别是Mesh形状），保留一个微小的物理边距
-                    safety_margin = 0.001
-                    target_margin = atprops.physics_collision_margin
-                    
-                    # 物理边距设为安全值（不能为负）
-                    physics_margin = safety_margin
-                    
-                    # 修改器偏移 = 目标边距 - 物理边距
-                    # 例子: 目标0 -> 物理0.001 -> 偏移 -0.001 -> 最终视觉碰撞面 = 原面
-                    displace_strength = target_margin - physics_margin
-                    
-                    # 总是添加修改器，使用计算后的偏移值
-                    add_shrink_modifier(obj, displace_strength)
-                    
-                    # 将刚体自带的 Margin 设为安全值
-                    obj.rigid_body.collision_margin = physics_margin
-                    
-                    obj.rigid_body.restitution = atprops.physics_restitution
-                    # Active objects always use MESH unless we want to expose this too, 
-                    # but user asked for "proxy shape of physics objects" which usually refers to passive/colliders in this context.
-                    # However, if the user meant "Active" objects too, we can change it here. 
-                    # Given the context of optimization, it's usually about the static colliders.
-                    # Let's stick to "MESH" for active objects as they need accurate simulation, 
-                    # OR we can use the same property if that's what the user intends.
-                    # User said "choose proxy shape for physics simulation objects", let's use it for ACTIVE too.
-                    # Wait, usually active objects need convex hull or mesh to be useful in simulations like this (debris).
-                    # Let's use the property for consistency if that's the request.
-                    obj.rigid_body.collision_shape = atprops.physics_collision_shape 
+                    if not atprops.physics_batch_setup:
+                        context.view_layer.objects.active = obj
+                        bpy.ops.rigidbody.object_add()
+                    # Active objects use the same collision shape as the colliders
+                    configure_rigid_body(obj, atprops, 'ACTIVE', self.use_shrink_modifier)
                     processed_count += 1
                 except Exception as e:
                     failed_objects.append(f"{obj.name}: {str(e)}")
+            elapsed = (time.perf_counter() - start) * 1000.0
             
             # 恢复活动对象
             context.view_layer.objects.active = active_object
             
             # 报告结果
             if processed_count > 0:
-                self.report({'INFO'}, f"成功为 {processed_count} 个对象添加物理属性")
+                mode = "批量" if atprops.physics_batch_setup else "逐个"
+                self.report({'INFO'}, f"成功为 {processed_count} 个对象添加物理属性 ({mode}, {elapsed:.1f} ms)")
             
             if failed_objects:
                 error_msg = "添加物理属性失败的对象:\n" + "\n".join(failed_objects[:3])
@@ -313,55 +915,51 @@ class PhysicsApplyOperator(bpy.types.Operator):
             selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
             
             active_object = context.active_object
-            obj_transformation = []
-            processed_count = 0
-            failed_objects = []
+            failed_objects = {}
+            start = time.perf_counter()
             
-            # 更新视图层
-            context.view_layer.update()
+            # 一次求值依赖图，批量读取模拟后的世界矩阵
+            context.evaluated_depsgraph_get()
+            matrices = read_world_matrices(selected_objects, data_object_indices(selected_objects))
 
-            # 保存对象变换矩阵
+            # Remove shrink modifiers (we want the position from the simulation, but the shape from before the shrink)
             for obj in selected_objects:
-                obj_transformation.append({
-                    "obj": obj, 
-                    "matrix_world": Matrix(obj.matrix_world)
-                })
-
-            # 应用物理变换并移除刚体
-            for data in obj_transformation:
                 try:
-                    obj = bpy.data.objects[data["obj"].name]
-                    context.view_layer.objects.active = obj
-                    
-                    # Remove shrink modifier BEFORE applying visual transform
-                    # (We want the position from the simulation, but the shape from before the shrink)
                     remove_shrink_modifier(obj)
-                    
-                    # 应用视觉变换
-                    bpy.ops.object.visual_transform_apply()
-                    
-                    # 移除刚体
-                    if obj.rigid_body:
-                        bpy.ops.rigidbody.object_remove()
-                    
-                    # 恢复原始变换矩阵
-                    obj.matrix_world = data["matrix_world"]
-                    processed_count += 1
-                    
                 except Exception as e:
-                    failed_objects.append(f"{data['obj'].name}: {str(e)}")
-
+                    failed_objects[obj.name] = f"{obj.name}: {str(e)}"
+            
+            # 批量移除刚体，再写回模拟结果（代替逐个 visual_transform_apply）
+            try:
+                remove_rigid_bodies(context, selected_objects)
+            except Exception as e:
+                # 批量移除失败时逐个移除，只跳过出错的对象
+                print(f"ATools: 批量移除刚体失败，改为逐个移除: {str(e)}")
+                for obj in selected_objects:
+                    try:
+                        remove_rigid_bodies(context, [obj])
+                    except Exception as e:
+                        failed_objects.setdefault(obj.name, f"{obj.name}: {str(e)}")
+            for index, obj in enumerate(selected_objects):
+                try:
+                    write_world_matrices([obj], matrices[index:index + 1])
+                except Exception as e:
+                    failed_objects.setdefault(obj.name, f"{obj.name}: {str(e)}")
+            elapsed = (time.perf_counter() - start) * 1000.0
+            
             # 恢复活动对象
             context.view_layer.objects.active = active_object
             
             # 报告结果
+            processed_count = len(selected_objects) - len(failed_objects)
             if processed_count > 0:
-                self.report({'INFO'}, f"成功应用物理到 {processed_count} 个对象")
+                self.report({'INFO'}, f"成功应用物理到 {processed_count} 个对象 ({elapsed:.1f} ms)")
             
             if failed_objects:
-                error_msg = "应用物理失败的对象:\n" + "\n".join(failed_objects[:3])
-                if len(failed_objects) > 3:
-                    error_msg += f"\n... 还有 {len(failed_objects) - 3} 个对象失败"
+                failed = list(failed_objects.values())
+                error_msg = "应用物理失败的对象:\n" + "\n".join(failed[:3])
+                if len(failed) > 3:
+                    error_msg += f"\n... 还有 {len(failed) - 3} 个对象失败"
                 self.report({'WARNING'}, error_msg)
 
             return {'FINISHED'}
@@ -374,6 +972,72 @@ class PhysicsApplyOperator(bpy.types.Operator):
             return {'CANCELLED'}
 
 
+class PhysicsRecoverSessionOperator(bpy.types.Operator):
+    """按会话日志恢复异常中断的物理模拟"""
+    bl_idname = "physics.recover_session"
+    bl_label = "Recover Physics Session"
+    bl_description = "Remove leftover rigid bodies and shrink modifiers and restore scene settings from an interrupted simulation"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return PhysicsJournal.exists(context.scene) and not get_atprops(context).running_physics_calculation
+
+    def execute(self, context):
+        journal = PhysicsJournal.load(context.scene)
+        if journal is None:
+            # 日志损坏，只能丢弃
+            del context.scene[JOURNAL_PROP]
+            self.report({'WARNING'}, "物理会话日志已损坏，已丢弃")
+            return {'CANCELLED'}
+        try:
+            count = journal.rollback(context)
+            report_missing_meshes(self, journal)
+            self.report({'INFO'}, f"已恢复物理会话 ({count} 个对象)")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"恢复物理会话失败: {str(e)}")
+            return {'CANCELLED'}
+
+
+class PhysicsEstimateTuningOperator(PhysicsSessionMixin, bpy.types.Operator):
+    """按对象尺寸和下落高度估算自动调参结果和计算量"""
+    bl_idname = "physics.estimate_tuning"
+    bl_label = "Estimate Settings"
+    bl_description = "Pick substeps, solver iterations and time scale from the selection's scale and fall height, and estimate the cost"
+
+    @classmethod
+    def poll(cls, context):
+        return any(obj.type == 'MESH' for obj in context.selected_objects)
+
+    def execute(self, context):
+        try:
+            selected_objects = validate_object_selection(context, min_count=1, obj_type='MESH')
+            tuning = self.tune_parameters(context, get_atprops(context), selected_objects)
+            seconds = f", 预计 {tuning['seconds']:.1f} 秒" if tuning["seconds"] is not None else ""
+            self.report({'INFO'}, f"子步 {tuning['substeps']}, 迭代 {tuning['iterations']}, "
+                                  f"时间缩放 {tuning['time_scale']:g}, 约 {tuning['frames']} 帧{seconds}")
+            return {'FINISHED'}
+        except ATOperationError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"估算模拟参数失败: {str(e)}")
+            return {'CANCELLED'}
+
+
+class PhysicsClearResultCacheOperator(bpy.types.Operator):
+    """清空模拟结果缓存"""
+    bl_idname = "physics.clear_result_cache"
+    bl_label = "Clear Result Cache"
+    bl_description = "Delete all cached simulation results from disk"
+
+    def execute(self, context):
+        count = get_result_cache().clear()
+        self.report({'INFO'}, f"已删除 {count} 条模拟缓存")
+        return {'FINISHED'}
+
+
 class PhysicsGetCustomCollidersOperator(bpy.types.Operator):
     """将选中的Mesh对象添加到自定义碰撞体列表"""
     bl_idname = "physics.get_custom_colliders"
@@ -448,8 +1112,16 @@ class PhysicsRemoveCustomColliderOperator(bpy.types.Operator):
 
 classes = (
     PhysicsCalculateOperator,
+    PhysicsSettleOperator,
+    PhysicsSettleParallelOperator,
+    PhysicsRunTakesOperator,
+    PhysicsApplyTakeOperator,
+    PhysicsClearTakesOperator,
     PhysicsAddActiveOperator,
     PhysicsApplyOperator,
+    PhysicsRecoverSessionOperator,
+    PhysicsEstimateTuningOperator,
+    PhysicsClearResultCacheOperator,
     PhysicsGetCustomCollidersOperator,
     PhysicsClearCustomCollidersOperator,
     PhysicsRemoveCustomColliderOperator,
@@ -465,4 +1137,9 @@ def register():
 def unregister():
     global classes
     for cls in classes:
-        unregister_class(cls) 
\ No newline at end of file
+        unregister_class(cls)
+    
+    # 清理碰撞代理缓存
+    get_proxy_cache().clear()
+    get_shape_classifier().clear()
+    get_tree_cache().clear()
\ No newline at end of file
@@ -1,14 +1,15 @@
 import bpy
-import mathutils
+from bpy.app.handlers import persistent
 from bpy.props import (BoolProperty, EnumProperty, FloatProperty, FloatVectorProperty, IntProperty,
                        StringProperty, PointerProperty, CollectionProperty)
 from bpy.types import PropertyGroup
 from bpy.utils import register_class, unregister_class
-from ..config.constants import PhysicsSettings, PathConstants
+from ..config.constants import PhysicsSettings, PathConstants, ExplodeSettings
+from ..utils.explode_nodes import attach_explode_modifiers, remove_explode_modifiers, set_explode_modifier_offset
+from ..utils.explode_utils import ExplodeState, ExplodeStore, ExplodeUpdateScheduler, MeshCentroidCalculator
 
-# 全局缓存存储初始位置，使用 window_manager id 作为 key
-# 存储格式: {obj_key: {'location': Vector, 'center': Vector, 'distance': float}, 'min_distance': float, 'max_distance': float}
-_initial_positions_cache = {}
+# 全局爆炸图状态存储，按集合保存，对象以 session_uid 作为稳定标识
+_explode_store = ExplodeStore()
 
 
 def get_collection_items(self, context):
@@ -19,89 +20,144 @@ def get_collection_items(self, context):
     return items
 
 
-def get_initial_positions_from_cache(wm_id):
-    """从缓存获取初始位置"""
-    global _initial_positions_cache
-    return _initial_positions_cache.get(wm_id, {})
+def get_explode_store():
+    """获取全局爆炸图状态存储"""
+    return _explode_store
 
 
-def update_explode_offset(self, context):
-    """当偏移值改变时实时更新对象位置"""
-    global _initial_positions_cache
+def get_explode_state(explode_props, rebuild=True):
+    """获取目标集合的爆炸图状态"""
+    if not explode_props.target_collection:
+        return None
+    collection = bpy.data.collections.get(explode_props.target_collection)
+    return _explode_store.get(collection, rebuild)
+
+
+def has_explode_record(explode_props):
+    """目标集合是否有保存在文件中的记录（几何节点后端检查修改器）"""
+    collection = bpy.data.collections.get(explode_props.target_collection) if explode_props.target_collection else None
+    if collection is None:
+        return False
+    if explode_props.explode_backend == 'GEOMETRY_NODES':
+        return _explode_store.has_node_record(collection)
+    return _explode_store.has_record(collection)
+
+
+@persistent
+def invalidate_explode_objects(*args):
+    """撤销/重做后对象引用失效，下一次更新时按 session_uid 重新解析"""
+    _explode_store.invalidate_objects()
+
+
+@persistent
+def clear_explode_store(*args):
+    """载入文件后清空状态，需要时从文件中的记录重建"""
+    _explode_scheduler.cancel()
+    _explode_store.clear()
+
+
+def sync_explode_settings(state, explode_props):
+    """把面板上的爆炸图选项同步到状态"""
+    state.separate = explode_props.use_separation
+
+
+def apply_explode_offset(collection_name, offset):
+    """把偏移值应用到集合中的对象"""
+    collection = bpy.data.collections.get(collection_name)
+    if collection is None:
+        return
+    explode_props = bpy.context.window_manager.atprops.explode_props
+    
+    # 几何节点后端只需更新修改器输入
+    if explode_props.explode_backend == 'GEOMETRY_NODES':
+        set_explode_modifier_offset(collection, offset)
+        return
     
-    # 从全局缓存获取初始位置
-    wm_id = context.window_manager.as_pointer()
-    initial_positions = _initial_positions_cache.get(wm_id, {})
+    state = _explode_store.get(collection)
     
     # 如果没有记录初始位置，直接返回
-    if not self.has_initial_positions or not initial_positions:
+    if state is None:
         return
     
+    sync_explode_settings(state, explode_props)
+    
+    # 一次数组运算计算全部位置，再写回对象
+    state.apply(offset, collection)
+    _explode_store.save_offset(collection, state)
+
+
+# 滑条更新调度器：合并中间值，每帧最多更新一次
+_explode_scheduler = ExplodeUpdateScheduler(apply_explode_offset, undo_message="Explode Offset")
+
+
+def get_explode_scheduler():
+    """获取爆炸图更新调度器"""
+    return _explode_scheduler
+
+
+def update_explode_offset(self, context):
+    """当偏移值改变时实时更新对象位置"""
     # 如果没有选择集合，直接返回
     if not self.target_collection:
         return
     
-    # 获取目标集合
+    if self.use_deferred_update:
+        _explode_scheduler.request(self.target_collection, self.explode_offset)
+    else:
+        apply_explode_offset(self.target_collection, self.explode_offset)
+
+
+def update_explode_settings(self, context):
+    """爆炸图选项改变后按当前偏移值重新计算"""
+    update_explode_offset(self, context)
+
+
+def update_explode_backend(self, context):
+    """切换后端：离开几何节点后端时移除修改器"""
+    if not self.target_collection:
+        return
     collection = bpy.data.collections.get(self.target_collection)
-    if not collection:
+    if collection is None:
         return
-    
-    # 获取集合中的所有网格对象
-    mesh_objects = [obj for obj in collection.all_objects if obj.type == 'MESH']
-    
-    # 获取距离范围用于归一化
-    min_distance = initial_positions.get('_min_distance', 0.0)
-    max_distance = initial_positions.get('_max_distance', 1.0)
-    distance_range = max_distance - min_distance if max_distance > min_distance else 1.0
-    
-    # 为每个对象计算偏移
-    for obj in mesh_objects:
-        # 使用对象指针作为key，避免重名问题
-        obj_key = id(obj)
-        if obj_key not in initial_positions:
-            continue
-        
-        # 跳过距离范围标记
-        if obj_key in ['_min_distance', '_max_distance']:
-            continue
-        
-        # 获取记录的初始位置和重心
-        initial_data = initial_positions[obj_key]
-        initial_location = initial_data['location']
-        initial_world_center = initial_data['center']
-        distance = initial_data.get('distance', initial_world_center.length)
-        
-        # 根据距离计算缩放因子（距离越远，缩放因子越大）
-        # 使用非线性映射以增强距离差异，更好地拉开密集区域
-        if distance_range > 0.001:
-            # 归一化距离到 0-1 范围
-            normalized_distance = (distance - min_distance) / distance_range
-            # 使用平方函数增强距离差异：距离越远，缩放因子增长越快
-            # 映射到更大范围：[0.1, 3.0]，让距离远的对象偏移更多，拉开密集区域
-            min_scale = 0.1
-            max_scale = 3.0
-            # 使用 normalized_distance 的平方，让距离差异更明显
-            scale_factor = min_scale + (normalized_distance ** 2) * (max_scale - min_scale)
-            scale_factor = max(0.1, scale_factor)  # 确保最小缩放因子
-        else:
-            # 如果所有对象距离相同，使用固定缩放
-            scale_factor = 1.0
-        
-        # 计算归一化的方向向量（从原点到重心的方向）
-        if initial_world_center.length > 0.001:
-            direction = initial_world_center.normalized()
-        else:
-            # 如果重心在原点，使用默认方向
-            direction = mathutils.Vector((1, 0, 0))
-        
-        # 计算偏移向量：使用归一化方向向量，距离越远偏移越多
-        offset_vector = direction * self.explode_offset * scale_factor
-        
-        # 计算新位置：原始位置 + 偏移向量
-        new_location = initial_location + offset_vector
-        
-        # 设置新位置
-        obj.location = new_location
+    _explode_scheduler.cancel()
+    if self.explode_backend == 'GEOMETRY_NODES':
+        # 对象后端已写入的偏移先恢复
+        state = _explode_store.get(collection)
+        if state is not None:
+            state.reset(collection)
+            _explode_store.save_offset(collection, state)
+    else:
+        remove_explode_modifiers(collection)
+        _explode_store.invalidate_node_record(collection)
+        update_explode_offset(self, context)
+
+
+def update_explode_method(self, context):
+    """切换展开方式后重新计算位移向量并按当前偏移值重新应用"""
+    if not self.target_collection:
+        return
+    collection = bpy.data.collections.get(self.target_collection)
+    state = _explode_store.get(collection)
+    if state is None:
+        return
+    _explode_scheduler.flush()
+    state.set_layout(self.explode_method, self.level_falloff, collection)
+    state.apply(self.explode_offset, collection, force=True)
+    _explode_store.save_offset(collection, state)
+
+
+def update_explode_output(self, context):
+    """切换输出方式：清理旧方式写入的数据后按当前偏移值重新应用"""
+    if not self.target_collection:
+        return
+    collection = bpy.data.collections.get(self.target_collection)
+    state = _explode_store.get(collection)
+    if state is None:
+        return
+    _explode_scheduler.flush()
+    state.set_output(self.explode_output, collection)
+    state.apply(self.explode_offset, collection, force=True)
+    _explode_store.save_offset(collection, state)
 
 
 class ExplodeProperties(PropertyGroup):
@@ -126,6 +182,87 @@ class ExplodeProperties(PropertyGroup):
         update=update_explode_offset
     ) # type: ignore
     
+    # 重心计算方式
+    explode_pivot: EnumProperty(
+        name="重心",
+        description="计算对象重心的方式",
+        items=[
+            ('MEAN', "Vertex Mean", "Average of all vertex positions"),
+            ('BOUNDS', "Bounds Center", "Center of the bounding box"),
+            ('EVALUATED', "Evaluated Mesh", "Vertex mean of the mesh with modifiers applied"),
+        ],
+        default='MEAN'
+    ) # type: ignore
+    
+    # 是否把记录保存到 .blend 文件
+    store_in_file: BoolProperty(
+        name="Store In File",
+        description="Save recorded positions into the .blend file so they survive reloading",
+        default=True
+    ) # type: ignore
+    
+    # 计算后端
+    explode_backend: EnumProperty(
+        name="后端",
+        description="爆炸图的计算方式",
+        items=[
+            ('OBJECTS', "Objects", "Move every mesh object in the collection"),
+            ('GEOMETRY_NODES', "Geometry Nodes", "Offset the loose parts inside each mesh with a generated Geometry Nodes modifier"),
+        ],
+        default='OBJECTS',
+        update=update_explode_backend
+    ) # type: ignore
+    
+    # 展开方式
+    explode_method: EnumProperty(
+        name="展开方式",
+        description="对象的展开方式",
+        items=[
+            ('RADIAL', "Radial", "Explode every part away from the world origin"),
+            ('HIERARCHY', "Hierarchy", "Explode sub-collections as rigid groups around their parent's centroid, then recursively within themselves"),
+        ],
+        default='RADIAL',
+        update=update_explode_method
+    ) # type: ignore
+    
+    # 层级衰减
+    level_falloff: FloatProperty(
+        name="层级衰减",
+        description="每深入一层集合，偏移量乘以该系数",
+        default=ExplodeSettings.DEFAULT_LEVEL_FALLOFF,
+        min=0.0,
+        max=2.0,
+        update=update_explode_method
+    ) # type: ignore
+    
+    # 输出方式
+    explode_output: EnumProperty(
+        name="输出方式",
+        description="爆炸偏移写入的位置",
+        items=[
+            ('LOCATION', "Location", "Write object locations directly"),
+            ('DELTA', "Delta Transform", "Write only delta locations, leaving the original locations untouched"),
+            ('DRIVER', "Drivers", "Drive delta locations from a single collection property without Python updates (ignores overlap separation)"),
+        ],
+        default='LOCATION',
+        update=update_explode_output
+    ) # type: ignore
+    
+    # 是否推开重叠的对象
+    use_separation: BoolProperty(
+        name="Separate Overlaps",
+        description="Push apart parts whose bounds still overlap after the radial offset",
+        default=False,
+        update=update_explode_settings
+    ) # type: ignore
+    
+    # 是否合并滑条更新
+    use_deferred_update: BoolProperty(
+        name="Smooth Dragging",
+        description="Coalesce slider changes and update at most once per viewport frame",
+        default=True
+    ) # type: ignore
+    
     # 是否已记录初始位置
     has_initial_positions: BoolProperty(
         name="Has Initial Positions",
@@ -133,65 +270,62 @@ class ExplodeProperties(PropertyGroup):
         default=False
     ) # type: ignore
     
+    def attach_node_backend(self):
+        """为目标集合中的网格添加几何节点爆炸图修改器，返回对象数量"""
+        if not self.target_collection:
+            return 0
+        collection = bpy.data.collections.get(self.target_collection)
+        if not collection:
+            return 0
+        _explode_store.invalidate_node_record(collection)
+        return attach_explode_modifiers(collection, self.explode_offset)
+    
     def record_initial_positions(self):
-        """记录集合中所有对象的初始位置"""
-        global _initial_positions_cache
-        
+        """记录集合中所有对象的初始位置，返回 ExplodeState"""
         # 如果没有选择集合，直接返回
         if not self.target_collection:
-            return {}
+            return None
         
         # 获取目标集合
         collection = bpy.data.collections.get(self.target_collection)
         if not collection:
-            return {}
+            return None
         
         # 获取集合中的所有网格对象
         mesh_objects = [obj for obj in collection.all_objects if obj.type == 'MESH']
         
         if len(mesh_objects) == 0:
-            return {}
+            return None
+        
+        # 批量计算重心（按网格数据块缓存）
+        depsgraph = bpy.context.evaluated_depsgraph_get() if self.explode_pivot == 'EVALUATED' else None
+        calculator = MeshCentroidCalculator(self.explode_pivot, depsgraph)
+        objects, centers, radii = calculator.compute(mesh_objects)
+        
+        if not objects:
+            return None
         
-        # 记录初始位置（使用对象指针作为key）
-        initial_positions = {}
-        distances = []
+        locations = [tuple(obj.location) for obj in objects]
+        uids = [obj.session_uid for obj in objects]
         
-        for obj in mesh_objects:
-            # 计算网格的重心（本地空间）
-            mesh = obj.data
-            if len(mesh.vertices) == 0:
-                continue
-            
-            local_center = sum((mesh.vertices[i].co for i in range(len(mesh.vertices))), start=type(mesh.vertices[0].co)((0,0,0)))
-            local_center /= len(mesh.vertices)
-            
-            # 转换为世界空间
-            world_center = obj.matrix_world @ mathutils.Vector(local_center)
-            
-            # 计算到原点的距离
-            distance = world_center.length
-            
-            # 使用对象指针作为key，避免重名问题
-            obj_key = id(obj)
-            # 同时记录对象的原始位置、重心坐标和距离
-            initial_positions[obj_key] = {
-                'location': mathutils.Vector(obj.location),
-                'center': world_center.copy(),
-                'distance': distance
-            }
-            distances.append(distance)
+        state = ExplodeState(uids, locations, centers, radii, objects)
+        sync_explode_settings(state, self)
+        state.output = self.explode_output
+        state.set_layout(self.explode_method, self.level_falloff, collection, update_drivers=False)
+        if state.output == ExplodeState.OUTPUT_DRIVER:
+            state.install_drivers(collection)
+        _explode_store.set(collection, state, serialize=self.store_in_file)
         
-        # 记录距离范围用于归一化
-        if distances:
-            initial_positions['_min_distance'] = min(distances)
-            initial_positions['_max_distance'] = max(distances)
+        # DELTA/DRIVER 模式不改动 location，按当前偏移值刷新增量
+        if state.output != ExplodeState.OUTPUT_LOCATION:
+            state.apply(self.explode_offset, collection, force=True)
+            _explode_store.save_offset(collection, state)
         
         self.has_initial_positions = True
-        return initial_positions
+        return state
     
 
 
-
 class CustomColliderItem(PropertyGroup):
     """自定义碰撞体列表项"""
     
@@ -264,6 +398,7 @@ class AToolsToolProperties(PropertyGroup):
         name="Collision Shape",
         description="Shape of the collision hull",
         items=[
+            ('AUTO', "Auto", "Choose the cheapest shape that fits each mesh within the tolerance"),
             ('MESH', "Mesh", "Mesh collision shape"),
             ('CONVEX_HULL', "Convex Hull", "Convex Hull collision shape"),
             ('BOX', "Box", "Box collision shape"),
@@ -275,6 +410,14 @@ class AToolsToolProperties(PropertyGroup):
         default='MESH'
     ) # type: ignore
 
+    physics_auto_shape_tolerance: FloatProperty(
+        name="Shape Tolerance",
+        description="Relative fit error allowed when the Auto shape picks a primitive instead of a hull or mesh",
+        default=0.1,
+        min=0.0, max=1.0,
+        subtype='FACTOR'
+    ) # type: ignore
+
     physics_collision_margin: FloatProperty(
         name="Collision Margin",
         description="Margin for the collision shape (can be negative to shrink)",
@@ -303,6 +446,12 @@ class AToolsToolProperties(PropertyGroup):
         min=1, max=200
     ) # type: ignore
     
+    physics_auto_tune: BoolProperty(
+        name="Auto Tune",
+        description="Pick substeps, solver iterations, time scale and the Fast Settle frame count from the smallest object size and the fall height",
+        default=False
+    ) # type: ignore
+    
     physics_split_impulse: BoolProperty(
         description="Reduce penetration artifacts",
         default=PhysicsSettings.DEFAULT_SPLIT_IMPULSE
@@ -314,6 +463,184 @@ class AToolsToolProperties(PropertyGroup):
         min=0.0, max=1.0
     ) # type: ignore
     
+    physics_settle_frames: IntProperty(
+        name="Settle Frames",
+        description="Number of frames stepped by Fast Settle",
+        default=PhysicsSettings.DEFAULT_SETTLE_FRAMES,
+        min=1, max=PhysicsSettings.MAX_SIMULATION_FRAMES
+    ) # type: ignore
+    
+    physics_batch_setup: BoolProperty(
+        name="Batch Setup",
+        description="Add and remove rigid bodies for all objects with one operator call",
+        default=True
+    ) # type: ignore
+    
+    physics_cull_colliders: BoolProperty(
+        name="Cull Colliders",
+        description="Only use passive colliders whose bounds intersect the fall volume of the active objects",
+        default=True
+    ) # type: ignore
+    
+    physics_cull_padding: FloatProperty(
+        name="Cull Padding",
+        description="Horizontal expansion of the fall volume used for collider culling",
+        default=PhysicsSettings.DEFAULT_CULL_PADDING,
+        min=0.0, max=1000.0,
+        unit='LENGTH'
+    ) # type: ignore
+    
+    physics_prebake_margin: BoolProperty(
+        name="Pre-bake Margin",
+        description="Offset meshes along their normals once before simulating instead of evaluating a Displace modifier every frame",
+        default=True
+    ) # type: ignore
+    
+    physics_use_result_cache: BoolProperty(
+        name="Result Cache",
+        description="Reuse stored results when the same objects, colliders and settings were simulated before",
+        default=True
+    ) # type: ignore
+    
+    physics_fix_overlaps: BoolProperty(
+        name="Fix Overlaps",
+        description="Separate or lift active objects that intersect each other or the colliders before simulating",
+        default=True
+    ) # type: ignore
+    
+    physics_bake_motion: BoolProperty(
+        name="Bake Motion",
+        description="Record every simulated frame and bake the fall animation to location/rotation keyframes",
+        default=False
+    ) # type: ignore
+    
+    physics_bake_reduce_keys: BoolProperty(
+        name="Reduce Keys",
+        description="Drop the keyframes after each body has come to rest",
+        default=True
+    ) # type: ignore
+    
+    physics_bake_tolerance: FloatProperty(
+        name="Key Tolerance",
+        description="Movement below this distance counts as at rest when reducing keys",
+        default=0.0001,
+        min=0.0, max=1.0,
+        precision=5
+    ) # type: ignore
+    
+    physics_bake_angle_tolerance: FloatProperty(
+        name="Angle Tolerance",
+        description="Rotation below this angle counts as at rest when reducing keys",
+        default=0.001,
+        min=0.0, max=0.5,
+        precision=4,
+        subtype='ANGLE'
+    ) # type: ignore
+    
+    physics_take_count: IntProperty(
+        name="Takes",
+        description="Number of simulations to run from jittered starting poses",
+        default=4,
+        min=1, max=64
+    ) # type: ignore
+    
+    physics_take_seed: IntProperty(
+        name="Seed",
+        description="Random seed of the first take, following takes use consecutive seeds",
+        default=0,
+        min=0
+    ) # type: ignore
+    
+    physics_take_jitter: FloatProperty(
+        name="Location Jitter",
+        description="Maximum random offset of the starting positions",
+        default=0.05,
+        min=0.0, max=10.0,
+        unit='LENGTH'
+    ) # type: ignore
+    
+    physics_take_rotation_jitter: FloatProperty(
+        name="Rotation Jitter",
+        description="Maximum random rotation of the starting poses around each axis",
+        default=0.0872665,
+        min=0.0, max=3.14159,
+        subtype='ANGLE'
+    ) # type: ignore
+    
+    physics_active_take: IntProperty(
+        name="Active Take",
+        default=-1,
+        min=-1
+    ) # type: ignore
+    
+    physics_parallel_workers: IntProperty(
+        name="Workers",
+        description="Number of background Blender processes for parallel settle (0 = number of CPU cores)",
+        default=0,
+        min=0, max=256
+    ) # type: ignore
+    
+    physics_use_proxies: BoolProperty(
+        name="Collision Proxies",
+        description="Simulate heavy passive meshes against a cached simplified proxy",
+        default=False
+    ) # type: ignore
+    
+    physics_proxy_type: EnumProperty(
+        name="Proxy Type",
+        description="How collision proxies are built",
+        items=[
+            ('CONVEX_HULL', "Convex Hull", "Convex hull of the mesh vertices"),
+            ('CLUSTER', "Vertex Clustering", "Decimate by merging vertices on a uniform grid"),
+        ],
+        default='CLUSTER'
+    ) # type: ignore
+    
+    physics_proxy_min_vertices: IntProperty(
+        name="Min Vertices",
+        description="Only meshes with at least this many vertices get a proxy",
+        default=PhysicsSettings.DEFAULT_PROXY_MIN_VERTICES,
+        min=0
+    ) # type: ignore
+    
+    physics_proxy_resolution: IntProperty(
+        name="Resolution",
+        description="Number of clustering cells along the bounding box diagonal",
+        default=PhysicsSettings.DEFAULT_PROXY_RESOLUTION,
+        min=2, max=1024
+    ) # type: ignore
+    
+    physics_rest_detection: BoolProperty(
+        name="Stop At Rest",
+        description="End the simulation automatically once every active body has settled",
+        default=True
+    ) # type: ignore
+    
+    physics_rest_linear_threshold: FloatProperty(
+        name="Linear Threshold",
+        description="Bodies moving slower than this distance per frame count as resting",
+        default=PhysicsSettings.DEFAULT_REST_LINEAR_THRESHOLD,
+        min=0.0, max=1.0,
+        precision=5,
+        unit='LENGTH'
+    ) # type: ignore
+    
+    physics_rest_angular_threshold: FloatProperty(
+        name="Angular Threshold",
+        description="Bodies rotating slower than this angle per frame count as resting",
+        default=PhysicsSettings.DEFAULT_REST_ANGULAR_THRESHOLD,
+        min=0.0, max=1.0,
+        precision=4,
+        unit='ROTATION'
+    ) # type: ignore
+    
+    physics_rest_check_interval: IntProperty(
+        name="Check Interval",
+        description="Number of frames between rest checks",
+        default=PhysicsSettings.DEFAULT_REST_CHECK_INTERVAL,
+        min=1, max=100
+    ) # type: ignore
+    
     is_running_physics: BoolProperty(
         description="",
         default=False
@@ -359,6 +686,10 @@ def register():
     for cls in classes:
         register_class(cls)
     
+    bpy.app.handlers.undo_post.append(invalidate_explode_objects)
+    bpy.app.handlers.redo_post.append(invalidate_explode_objects)
+    bpy.app.handlers.load_post.append(clear_explode_store)
+    
     # 注册后添加嵌套属性
     # 注意：这里添加的 PointerProperty 会在类上，而不是实例上
     # 这是 Blender 的推荐做法，用于在类定义后添加属性
@@ -371,6 +702,12 @@ def unregister():
     for cls in reversed(classes):  # 反向注销
         unregister_class(cls)
     
+    for handlers, handler in ((bpy.app.handlers.undo_post, invalidate_explode_objects),
+                              (bpy.app.handlers.redo_post, invalidate_explode_objects),
+                              (bpy.app.handlers.load_post, clear_explode_store)):
+        if handler in handlers:
+            handlers.remove(handler)
+    
     # 清理全局缓存
-    global _initial_positions_cache
-    _initial_positions_cache.clear() 
\ No newline at end of file
+    _explode_scheduler.cancel()
+    _explode_store.clear() 
\ No newline at end of file
@@ -2,6 +2,11 @@ import bpy
 from bpy.utils import register_class, unregister_class
 from ..i18n.translation import get_text
 from ..config.constants import UIConstants
+from ..properties.property_groups import get_explode_state, has_explode_record
+from ..utils.physics_journal import PhysicsJournal
+from ..utils.physics_stats import get_current_run, get_last_run
+from ..utils.physics_takes import PhysicsTakes
+from ..utils.physics_tuning import get_last_estimate
 
 
 class AT_UL_CustomColliderList(bpy.types.UIList):
@@ -57,16 +62,76 @@ class MainPanel(bpy.types.Panel):
             physics_box = physics_panel.box()
             physics_column = physics_box.column()
             physics_column.prop(wm.atprops, 'physics_collision_shape', text="Collision Shape")
+            if wm.atprops.physics_collision_shape == 'AUTO':
+                physics_column.prop(wm.atprops, 'physics_auto_shape_tolerance', text=get_text("Shape Tolerance", context), slider=True)
             physics_column.prop(wm.atprops, 'physics_collision_margin', text="Collision Margin", slider=True)
             physics_column.prop(wm.atprops, 'physics_friction', text=get_text("Friction", context), slider=True)
-            physics_column.prop(wm.atprops, 'physics_time_scale', text=get_text("Time Scale", context))
-            physics_column.prop(wm.atprops, 'physics_solver_iterations', text=get_text("Solver Iterations", context))
+            # 自动调参：运行前显示选择的参数和预计计算量
+            tune_row = physics_column.row(align=True)
+            tune_row.prop(wm.atprops, 'physics_auto_tune', text=get_text("Auto Tune", context))
+            if wm.atprops.physics_auto_tune:
+                tune_row.operator('physics.estimate_tuning', text=get_text("Estimate", context), icon='TIME')
+                estimate = get_last_estimate()
+                if estimate is not None:
+                    tune_column = physics_column.box().column(align=True)
+                    tune_column.label(text=f"{get_text('Substeps', context)}: {estimate['substeps']}  {get_text('Solver Iterations', context)}: {estimate['iterations']}  {get_text('Time Scale', context)}: {estimate['time_scale']:g}")
+                    seconds = f", ~{estimate['seconds']:.1f} s" if estimate['seconds'] is not None else ""
+                    tune_column.label(text=f"{get_text('Cost', context)}: ~{estimate['frames']} {get_text('frames', context)}{seconds}")
+            else:
+                physics_column.prop(wm.atprops, 'physics_time_scale', text=get_text("Time Scale", context))
+                physics_column.prop(wm.atprops, 'physics_solver_iterations', text=get_text("Solver Iterations", context))
             physics_column.prop(wm.atprops, 'physics_split_impulse', text=get_text("Split Impulse", context))
             physics_column.prop(wm.atprops, 'physics_restitution', text=get_text("Restitution", context), slider=True)
             
+            physics_column.prop(wm.atprops, 'physics_batch_setup', text=get_text("Batch Setup", context))
+            physics_column.prop(wm.atprops, 'physics_prebake_margin', text=get_text("Pre-bake Margin", context))
+            
+            # 碰撞代理
+            physics_column.separator()
+            physics_column.prop(wm.atprops, 'physics_use_proxies', text=get_text("Collision Proxies", context))
+            if wm.atprops.physics_use_proxies:
+                proxy_column = physics_column.column(align=True)
+                proxy_column.prop(wm.atprops, 'physics_proxy_type', text=get_text("Proxy Type", context))
+                proxy_column.prop(wm.atprops, 'physics_proxy_min_vertices', text=get_text("Min Vertices", context))
+                if wm.atprops.physics_proxy_type == 'CLUSTER':
+                    proxy_column.prop(wm.atprops, 'physics_proxy_resolution', text=get_text("Resolution", context))
+            
+            # 静止检测
+            physics_column.separator()
+            physics_column.prop(wm.atprops, 'physics_rest_detection', text=get_text("Stop At Rest", context))
+            if wm.atprops.physics_rest_detection:
+                rest_column = physics_column.column(align=True)
+                rest_column.prop(wm.atprops, 'physics_rest_linear_threshold', text=get_text("Linear Threshold", context))
+                rest_column.prop(wm.atprops, 'physics_rest_angular_threshold', text=get_text("Angular Threshold", context))
+                rest_column.prop(wm.atprops, 'physics_rest_check_interval', text=get_text("Check Interval", context))
+            
+            physics_column.prop(wm.atprops, 'physics_fix_overlaps', text=get_text("Fix Overlaps", context))
+            cache_row = physics_column.row(align=True)
+            cache_row.prop(wm.atprops, 'physics_use_result_cache', text=get_text("Result Cache", context))
+            cache_row.operator('physics.clear_result_cache', text="", icon='TRASH')
+            
+            # 烘焙下落动画
+            physics_column.separator()
+            physics_column.prop(wm.atprops, 'physics_bake_motion', text=get_text("Bake Motion", context))
+            if wm.atprops.physics_bake_motion:
+                bake_row = physics_column.row(align=True)
+                bake_row.prop(wm.atprops, 'physics_bake_reduce_keys', text=get_text("Reduce Keys", context))
+                sub = bake_row.row(align=True)
+                sub.active = wm.atprops.physics_bake_reduce_keys
+                sub.prop(wm.atprops, 'physics_bake_tolerance', text=get_text("Tolerance", context))
+                angle_row = physics_column.row(align=True)
+                angle_row.active = wm.atprops.physics_bake_reduce_keys
+                angle_row.prop(wm.atprops, 'physics_bake_angle_tolerance', text=get_text("Angle Tolerance", context))
+            
             # Custom Colliders
             physics_column.separator()
             physics_column.prop(wm.atprops, 'physics_use_custom_colliders', text="Use Custom Colliders")
+            if not wm.atprops.physics_use_custom_colliders:
+                cull_row = physics_column.row(align=True)
+                cull_row.prop(wm.atprops, 'physics_cull_colliders', text=get_text("Cull Colliders", context))
+                sub = cull_row.row(align=True)
+                sub.active = wm.atprops.physics_cull_colliders
+                sub.prop(wm.atprops, 'physics_cull_padding', text=get_text("Padding", context))
             if wm.atprops.physics_use_custom_colliders:
                 box = physics_column.box()
                 row = box.row()
@@ -81,10 +146,58 @@ class MainPanel(bpy.types.Panel):
             
             physics_column.separator()
 
+            # 上次模拟异常中断，提示恢复
+            if PhysicsJournal.exists(context.scene) and not wm.atprops.running_physics_calculation:
+                recover_box = physics_column.box()
+                recover_box.label(text=get_text("Interrupted simulation found", context), icon='ERROR')
+                recover_box.operator('physics.recover_session', text=get_text("Recover Session", context), icon='RECOVER_LAST')
+
             if not wm.atprops.running_physics_calculation:
                 physics_column.operator('physics.calculate', text=get_text("开始模拟", context))
+                settle_row = physics_column.row(align=True)
+                settle_row.prop(wm.atprops, 'physics_settle_frames', text=get_text("Settle Frames", context))
+                settle_row.operator('physics.settle', text=get_text("Fast Settle", context), icon='FF')
+                parallel_row = physics_column.row(align=True)
+                parallel_row.prop(wm.atprops, 'physics_parallel_workers', text=get_text("Workers", context))
+                parallel_row.operator('physics.settle_parallel', text=get_text("Parallel Settle", context), icon='MOD_ARRAY')
+                
+                # 多次尝试
+                takes_box = physics_column.box()
+                takes_column = takes_box.column(align=True)
+                takes_row = takes_column.row(align=True)
+                takes_row.prop(wm.atprops, 'physics_take_count', text=get_text("Takes", context))
+                takes_row.prop(wm.atprops, 'physics_take_seed', text=get_text("Seed", context))
+                jitter_row = takes_column.row(align=True)
+                jitter_row.prop(wm.atprops, 'physics_take_jitter', text=get_text("Location Jitter", context))
+                jitter_row.prop(wm.atprops, 'physics_take_rotation_jitter', text=get_text("Rotation Jitter", context))
+                takes_column.operator('physics.run_takes', text=get_text("Run Takes", context), icon='FILE_REFRESH')
+                if PhysicsTakes.exists(context.scene):
+                    take_row = takes_box.row(align=True)
+                    active_take = wm.atprops.physics_active_take
+                    op = take_row.operator('physics.apply_take', text=get_text("Original", context), depress=active_take == -1)
+                    op.index = -1
+                    for index in range(PhysicsTakes.count(context.scene)):
+                        op = take_row.operator('physics.apply_take', text=str(index + 1), depress=active_take == index)
+                        op.index = index
+                    take_row.operator('physics.clear_takes', text="", icon='TRASH')
             else:
                 physics_column.prop(wm.atprops, 'running_physics_calculation', text=get_text("Cancel Calculation", context), icon="X")
+            
+            # 运行统计：模拟中显示 ETA，结束后显示摘要
+            current_run = get_current_run()
+            last_run = get_last_run()
+            if current_run is not None:
+                stats_column = physics_column.box().column(align=True)
+                eta = current_run.eta()
+                stats_column.label(text=f"{get_text('Frame', context)}: {current_run.frame} / {current_run.max_frames}")
+                stats_column.label(text=f"ETA: {eta:.1f} s" if eta is not None else "ETA: -")
+                stats_column.label(text=f"{get_text('Awake', context)}: {current_run.awake_count}  {get_text('Sleeping', context)}: {current_run.sleeping_count}  {get_text('Colliders', context)}: {current_run.collider_count}")
+            elif last_run is not None:
+                summary = last_run.summary()
+                stats_column = physics_column.box().column(align=True)
+                stats_column.label(text=f"{get_text('Last Run', context)}: {summary['frames']} {get_text('frames', context)}, {summary['setup_seconds'] + summary['sim_seconds']:.2f} s ({summary['stop_reason']})")
+                stats_column.label(text=f"{summary['frame_ms_mean']:.2f} ms/{get_text('frame', context)}, p95 {summary['frame_ms_p95']:.2f} ms, {get_text('Setup', context)} {summary['setup_seconds']:.2f} s")
+                stats_column.label(text=f"{get_text('Objects', context)}: {summary['objects']}  {get_text('Colliders', context)}: {summary['colliders']}  {get_text('Sleeping', context)}: {summary['sleeping']}")
 
         # 3. Explode 爆炸图面板
         header, explode_panel = layout.panel("explode_panel", default_closed=True)
@@ -98,20 +211,38 @@ class MainPanel(bpy.types.Panel):
             
             # 集合选择下拉菜单
             explode_column.prop(explode_props, 'target_collection', text=get_text("Target Collection", context))
+            explode_column.prop(explode_props, 'explode_backend', text=get_text("Backend", context))
+            use_objects = explode_props.explode_backend == 'OBJECTS'
+            if use_objects:
+                explode_column.prop(explode_props, 'explode_pivot', text=get_text("Pivot", context))
+                explode_column.prop(explode_props, 'explode_method', text=get_text("Method", context))
+                if explode_props.explode_method == 'HIERARCHY':
+                    explode_column.prop(explode_props, 'level_falloff', text=get_text("Level Falloff", context))
+                explode_column.prop(explode_props, 'explode_output', text=get_text("Output", context))
+                explode_column.prop(explode_props, 'store_in_file', text=get_text("Store In File", context))
+                explode_column.prop(explode_props, 'use_separation', text=get_text("Separate Overlaps", context))
+            explode_column.prop(explode_props, 'use_deferred_update', text=get_text("Smooth Dragging", context))
             
             # 记录初始位置和重置按钮
             button_row = explode_column.row()
             button_row.operator('explode.record_initial_positions', text=get_text("Record Initial Positions", context), icon='REC')
             button_row.operator('explode.reset_positions', text=get_text("Reset Positions", context), icon='LOOP_BACK')
             
-            # 显示是否已记录初始位置
-            if explode_props.has_initial_positions:
+            # 显示是否已记录初始位置（包括保存在文件中的记录）
+            state = get_explode_state(explode_props, rebuild=False) if use_objects else None
+            if state is not None or has_explode_record(explode_props):
                 explode_column.label(text=get_text("✓ Recorded Initial Positions", context), icon='CHECKMARK')
             else:
                 explode_column.label(text=get_text("⚠ Please Record Initial Positions", context), icon='ERROR')
             
             # 偏移值滑条（实时更新）
             explode_column.prop(explode_props, 'explode_offset', text=get_text("Offset Value", context), slider=True)
+            
+            explode_column.operator('explode.bake_animation', text=get_text("Bake Explode Animation", context), icon='KEYINGSET')
+            
+            # 显示每次更新耗时
+            if state is not None:
+                explode_column.label(text=get_text("Update Time: {0:.2f} ms ({1} objects)", context).format(state.last_update_ms, len(state)), icon='TIME')
 
 
 
@@ -0,0 +1,53 @@
+import bpy
+import numpy as np
+
+
+def ensure_action(obj):
+    """确保对象有动画数据和动作"""
+    anim_data = obj.animation_data or obj.animation_data_create()
+    if anim_data.action is None:
+        anim_data.action = bpy.data.actions.new(name=f"{obj.name}Action")
+    return anim_data.action
+
+
+def ensure_fcurve(obj, data_path, index, group_name="Object Transforms"):
+    """获取或创建对象指定属性通道的 F 曲线"""
+    action = ensure_action(obj)
+    # Blender 4.4+ 的分层动作需要通过槽位创建 F 曲线
+    if hasattr(action, "fcurve_ensure_for_datablock"):
+        return action.fcurve_ensure_for_datablock(obj, data_path, index=index, group_name=group_name)
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group_name)
+    return fcurve
+
+
+def write_fcurve_keys(fcurve, frames, values):
+    """批量写入关键帧，替换曲线上已有的关键帧
+
+    使用 keyframe_points.add + foreach_set，避免逐帧调用 keyframe_insert
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32)
+    count = len(frames)
+
+    points = fcurve.keyframe_points
+    points.clear()
+    if count == 0:
+        return
+    points.add(count)
+
+    # co 为 (frame, value) 交错排列
+    coords = np.empty(count * 2, dtype=np.float32)
+    coords[0::2] = frames
+    coords[1::2] = values
+    points.foreach_set("co", coords)
+    fcurve.update()
+
+
+def write_vector_keys(obj, data_path, frames, vectors, group_name="Object Transforms"):
+    """把 (F, K) 的向量序列写入 data_path 的 K 条 F 曲线"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    for index in range(vectors.shape[1]):
+        fcurve = ensure_fcurve(obj, data_path, index, group_name)
+        write_fcurve_keys(fcurve, frames, vectors[:, index])
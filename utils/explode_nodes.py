@@ -0,0 +1,196 @@
+import bpy
+from ..config.constants import ExplodeSettings
+from .anim_utils import ensure_fcurve, write_fcurve_keys
+
+# 几何节点爆炸图：同一网格中的松散部件按各自重心方向偏移
+EXPLODE_NODE_GROUP = "AT_Explode_Islands"
+EXPLODE_MODIFIER = "AT_Explode"
+# 节点组接口 (group.interface) 和 Accumulate Field 的 Group ID 输入需要 4.0
+MIN_BLENDER_VERSION = (4, 0, 0)
+
+
+def geometry_nodes_supported():
+    """当前 Blender 版本是否支持几何节点后端"""
+    return bpy.app.version >= MIN_BLENDER_VERSION
+
+
+def _socket(sockets, name, socket_type=None):
+    """按名称（和类型）查找已启用的节点接口，兼容不同版本的多类型接口"""
+    names = (name,) if isinstance(name, str) else name
+    for socket in sockets:
+        if socket.name in names and (socket_type is None or socket.type == socket_type) and socket.enabled:
+            return socket
+    raise KeyError(f"节点接口不存在: {name}")
+
+
+def _accumulate(nodes, data_type):
+    """创建按网格岛分组累加的 Accumulate Field 节点"""
+    node = nodes.new('GeometryNodeAccumulateField')
+    node.data_type = data_type
+    node.domain = 'POINT'
+    return node
+
+
+def _vector_math(nodes, operation):
+    node = nodes.new('ShaderNodeVectorMath')
+    node.operation = operation
+    return node
+
+
+def _build_explode_node_group(group):
+    """构建节点：岛重心 -> 方向 -> 按距离缩放 -> Set Position 偏移"""
+    nodes = group.nodes
+    links = group.links
+    nodes.clear()
+
+    group_in = nodes.new('NodeGroupInput')
+    group_out = nodes.new('NodeGroupOutput')
+    island = nodes.new('GeometryNodeInputMeshIsland')
+    position = nodes.new('GeometryNodeInputPosition')
+    island_index = _socket(island.outputs, "Island Index")
+
+    # 每个岛的坐标和与顶点数 -> 岛重心
+    sum_position = _accumulate(nodes, 'FLOAT_VECTOR')
+    links.new(position.outputs[0], _socket(sum_position.inputs, "Value", 'VECTOR'))
+    links.new(island_index, _socket(sum_position.inputs, ("Group ID", "Group Index"), 'INT'))
+    count = _accumulate(nodes, 'FLOAT')
+    _socket(count.inputs, "Value", 'VALUE').default_value = 1.0
+    links.new(island_index, _socket(count.inputs, ("Group ID", "Group Index"), 'INT'))
+
+    centroid = _vector_math(nodes, 'DIVIDE')
+    links.new(_socket(sum_position.outputs, "Total", 'VECTOR'), centroid.inputs[0])
+    links.new(_socket(count.outputs, "Total", 'VALUE'), centroid.inputs[1])
+
+    direction = _vector_math(nodes, 'NORMALIZE')
+    links.new(centroid.outputs[0], direction.inputs[0])
+
+    # 与对象模式一致：按重心距离的归一化平方映射到 [MIN_SCALE, MAX_SCALE]
+    distance = _vector_math(nodes, 'LENGTH')
+    links.new(centroid.outputs[0], distance.inputs[0])
+    statistic = nodes.new('GeometryNodeAttributeStatistic')
+    statistic.data_type = 'FLOAT'
+    statistic.domain = 'POINT'
+    links.new(group_in.outputs[0], _socket(statistic.inputs, "Geometry"))
+    links.new(_socket(distance.outputs, "Value"), _socket(statistic.inputs, "Attribute", 'VALUE'))
+
+    normalized = nodes.new('ShaderNodeMapRange')
+    normalized.data_type = 'FLOAT'
+    links.new(_socket(distance.outputs, "Value"), _socket(normalized.inputs, "Value", 'VALUE'))
+    links.new(_socket(statistic.outputs, "Min", 'VALUE'), _socket(normalized.inputs, "From Min", 'VALUE'))
+    links.new(_socket(statistic.outputs, "Max", 'VALUE'), _socket(normalized.inputs, "From Max", 'VALUE'))
+
+    squared = nodes.new('ShaderNodeMath')
+    squared.operation = 'POWER'
+    squared.inputs[1].default_value = 2.0
+    links.new(_socket(normalized.outputs, "Result", 'VALUE'), squared.inputs[0])
+
+    scale_factor = nodes.new('ShaderNodeMapRange')
+    scale_factor.data_type = 'FLOAT'
+    _socket(scale_factor.inputs, "To Min", 'VALUE').default_value = ExplodeSettings.MIN_SCALE
+    _socket(scale_factor.inputs, "To Max", 'VALUE').default_value = ExplodeSettings.MAX_SCALE
+    links.new(squared.outputs[0], _socket(scale_factor.inputs, "Value", 'VALUE'))
+
+    amount = nodes.new('ShaderNodeMath')
+    amount.operation = 'MULTIPLY'
+    links.new(_socket(scale_factor.outputs, "Result", 'VALUE'), amount.inputs[0])
+    links.new(group_in.outputs[1], amount.inputs[1])
+
+    offset = _vector_math(nodes, 'SCALE')
+    links.new(direction.outputs[0], offset.inputs[0])
+    links.new(amount.outputs[0], _socket(offset.inputs, "Scale"))
+
+    set_position = nodes.new('GeometryNodeSetPosition')
+    links.new(group_in.outputs[0], _socket(set_position.inputs, "Geometry"))
+    links.new(offset.outputs[0], _socket(set_position.inputs, "Offset"))
+    links.new(_socket(set_position.outputs, "Geometry"), group_out.inputs[0])
+
+
+def ensure_explode_node_group():
+    """获取或创建爆炸图几何节点组"""
+    if not geometry_nodes_supported():
+        version = ".".join(str(part) for part in MIN_BLENDER_VERSION[:2])
+        raise RuntimeError(f"几何节点爆炸图需要 Blender {version} 或更高版本")
+    group = bpy.data.node_groups.get(EXPLODE_NODE_GROUP)
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(EXPLODE_NODE_GROUP, 'GeometryNodeTree')
+    interface = group.interface
+    interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    interface.new_socket("Offset", in_out='INPUT', socket_type='NodeSocketFloat')
+    interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    try:
+        _build_explode_node_group(group)
+    except Exception:
+        bpy.data.node_groups.remove(group)
+        raise
+    return group
+
+
+def get_offset_identifier(group):
+    """获取节点组 Offset 输入在修改器上的标识符"""
+    for item in group.interface.items_tree:
+        if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.name == "Offset":
+            return item.identifier
+    raise KeyError("节点组缺少 Offset 输入")
+
+
+def get_explode_modifiers(collection):
+    """获取集合中所有带爆炸图修改器的 (对象, 修改器)"""
+    result = []
+    for obj in collection.all_objects:
+        if obj.type == 'MESH':
+            mod = obj.modifiers.get(EXPLODE_MODIFIER)
+            if mod is not None and mod.type == 'NODES':
+                result.append((obj, mod))
+    return result
+
+
+def attach_explode_modifiers(collection, offset=0.0):
+    """为集合中的网格对象添加爆炸图几何节点修改器，返回对象数量"""
+    group = ensure_explode_node_group()
+    identifier = get_offset_identifier(group)
+    count = 0
+    for obj in collection.all_objects:
+        if obj.type != 'MESH':
+            continue
+        mod = obj.modifiers.get(EXPLODE_MODIFIER)
+        if mod is None:
+            mod = obj.modifiers.new(name=EXPLODE_MODIFIER, type='NODES')
+        mod.node_group = group
+        mod[identifier] = float(offset)
+        obj.update_tag()
+        count += 1
+    return count
+
+
+def set_explode_modifier_offset(collection, offset):
+    """更新所有爆炸图修改器的偏移输入，计算在 Blender 原生求值器中完成"""
+    group = bpy.data.node_groups.get(EXPLODE_NODE_GROUP)
+    if group is None:
+        return 0
+    identifier = get_offset_identifier(group)
+    modifiers = get_explode_modifiers(collection)
+    for obj, mod in modifiers:
+        mod[identifier] = float(offset)
+        obj.update_tag()
+    return len(modifiers)
+
+
+def remove_explode_modifiers(collection):
+    """移除集合中的爆炸图修改器"""
+    for obj, mod in get_explode_modifiers(collection):
+        obj.modifiers.remove(mod)
+
+
+def bake_explode_modifiers(collection, frames, offsets):
+    """把修改器的偏移输入烘焙为关键帧，返回写入的对象数量"""
+    group = bpy.data.node_groups.get(EXPLODE_NODE_GROUP)
+    if group is None:
+        return 0
+    identifier = get_offset_identifier(group)
+    modifiers = get_explode_modifiers(collection)
+    for obj, mod in modifiers:
+        fcurve = ensure_fcurve(obj, f'modifiers["{EXPLODE_MODIFIER}"]["{identifier}"]', 0, group_name="Explode")
+        write_fcurve_keys(fcurve, frames, offsets)
+    return len(modifiers)
@@ -0,0 +1,784 @@
+import time
+from collections import OrderedDict
+import bpy
+import numpy as np
+from mathutils.kdtree import KDTree
+from ..config.constants import ExplodeSettings
+from .anim_utils import write_vector_keys
+from .explode_nodes import get_explode_modifiers
+
+
+def compute_radial_vectors(centers):
+    """根据重心计算每个对象的单位方向和缩放因子
+
+    centers: (N, 3) 世界空间重心
+    返回 (directions, scale_factors)，分别为 (N, 3) 和 (N,)
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    count = len(centers)
+    if count == 0:
+        return np.zeros((0, 3)), np.zeros(0)
+
+    distances = np.linalg.norm(centers, axis=1)
+
+    # 归一化的方向向量（重心在原点时使用默认方向）
+    directions = np.zeros((count, 3))
+    directions[:, 0] = 1.0
+    valid = distances > ExplodeSettings.MIN_DIRECTION_LENGTH
+    directions[valid] = centers[valid] / distances[valid, None]
+
+    # 距离越远缩放因子越大，使用平方映射拉开密集区域
+    min_distance = distances.min()
+    distance_range = distances.max() - min_distance
+    if distance_range > ExplodeSettings.MIN_DISTANCE_RANGE:
+        normalized = (distances - min_distance) / distance_range
+        scale_factors = ExplodeSettings.MIN_SCALE + normalized ** 2 * (ExplodeSettings.MAX_SCALE - ExplodeSettings.MIN_SCALE)
+        scale_factors = np.maximum(scale_factors, ExplodeSettings.MIN_SCALE)
+    else:
+        scale_factors = np.ones(count)
+
+    return directions, scale_factors
+
+
+# 对象自定义属性：紧凑记录；集合自定义属性：当前偏移值（同时作为驱动器的控制属性）和输出方式
+EXPLODE_RECORD_PROP = "at_explode"
+EXPLODE_OFFSET_PROP = "at_explode_offset"
+EXPLODE_OUTPUT_PROP = "at_explode_output"
+EXPLODE_METHOD_PROP = "at_explode_method"
+EXPLODE_FALLOFF_PROP = "at_explode_falloff"
+
+
+def ensure_offset_driver(obj, index, collection, factor):
+    """为 delta_location 的一个分量添加读取集合控制属性的简单表达式驱动器"""
+    fcurve = None
+    if obj.animation_data is not None:
+        fcurve = obj.animation_data.drivers.find('delta_location', index=index)
+    if fcurve is None:
+        fcurve = obj.driver_add('delta_location', index)
+    driver = fcurve.driver
+    driver.type = 'SCRIPTED'
+    var = driver.variables.get('off') or driver.variables.new()
+    var.name = 'off'
+    var.type = 'SINGLE_PROP'
+    target = var.targets[0]
+    target.id_type = 'COLLECTION'
+    target.id = collection
+    target.data_path = f'["{EXPLODE_OFFSET_PROP}"]'
+    # 简单表达式由 Blender 直接求值，不需要 Python
+    driver.expression = f"off*{factor:.6g}"
+    return fcurve
+
+
+def remove_offset_drivers(obj):
+    """移除 delta_location 上的驱动器，并清零驱动器最后写入的值"""
+    if obj.animation_data is None:
+        return
+    for index in range(3):
+        if obj.animation_data.drivers.find('delta_location', index=index) is not None:
+            obj.driver_remove('delta_location', index)
+            # 驱动器结果会写回原始对象，移除后不会自动恢复
+            obj.delta_location[index] = 0.0
+
+
+def _unit_rows(vectors):
+    """逐行归一化，长度过小的行返回零向量"""
+    lengths = np.linalg.norm(vectors, axis=1)
+    units = np.zeros_like(vectors)
+    valid = lengths > ExplodeSettings.MIN_DIRECTION_LENGTH
+    units[valid] = vectors[valid] / lengths[valid, None]
+    return units
+
+
+def compute_hierarchy_vectors(collection, uids, centers, falloff=ExplodeSettings.DEFAULT_LEVEL_FALLOFF):
+    """按集合层级计算每个对象单位偏移值对应的位移向量
+
+    子集合作为整体沿自身重心相对父集合重心的方向移动，再在内部递归展开；
+    第 d 层的位移权重为 falloff ** d。集合树只遍历一次，对象部分一次向量化完成。
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    rows = {uid: row for row, uid in enumerate(np.asarray(uids).tolist())}
+
+    # 广度优先构建集合树，父节点总在子节点之前
+    nodes = [collection]
+    parents = [-1]
+    depths = [0]
+    visited = {collection.name}
+    head = 0
+    while head < len(nodes):
+        node = nodes[head]
+        for child in node.children:
+            if child.name in visited:
+                continue
+            visited.add(child.name)
+            nodes.append(child)
+            parents.append(head)
+            depths.append(depths[head] + 1)
+        head += 1
+
+    # 每个对象归属于最先遇到的（最浅的）集合
+    part_nodes = np.full(len(centers), -1, dtype=np.int64)
+    for index, node in enumerate(nodes):
+        for obj in node.objects:
+            row = rows.get(obj.session_uid)
+            if row is not None and part_nodes[row] < 0:
+                part_nodes[row] = index
+    part_nodes[part_nodes < 0] = 0
+
+    # 子树重心：先累加直接对象，再自底向上合并到父节点
+    node_count = len(nodes)
+    sums = np.zeros((node_count, 3))
+    counts = np.zeros(node_count)
+    np.add.at(sums, part_nodes, centers)
+    np.add.at(counts, part_nodes, 1.0)
+    for index in range(node_count - 1, 0, -1):
+        sums[parents[index]] += sums[index]
+        counts[parents[index]] += counts[index]
+    node_centers = np.zeros((node_count, 3))
+    non_empty = counts > 0
+    node_centers[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+    # 自顶向下累积每个节点的整体位移
+    depths = np.asarray(depths, dtype=np.float64)
+    node_vectors = np.zeros((node_count, 3))
+    for index in range(1, node_count):
+        parent = parents[index]
+        if counts[index] == 0:
+            node_vectors[index] = node_vectors[parent]
+            continue
+        direction = node_centers[index] - node_centers[parent]
+        length = np.linalg.norm(direction)
+        step = direction / length if length > ExplodeSettings.MIN_DIRECTION_LENGTH else 0.0
+        node_vectors[index] = node_vectors[parent] + step * falloff ** (depths[index] - 1)
+
+    # 对象在所属集合内部相对集合重心展开
+    local = _unit_rows(centers - node_centers[part_nodes])
+    return node_vectors[part_nodes] + local * (falloff ** depths[part_nodes])[:, None]
+
+
+def evaluate_offset_curve(curve, frame_count, offset_start, offset_end):
+    """按曲线类型生成每一帧的偏移值"""
+    t = np.linspace(0.0, 1.0, frame_count) if frame_count > 1 else np.ones(frame_count)
+    if curve == 'EASE_IN':
+        eased = t * t
+    elif curve == 'EASE_OUT':
+        eased = 1.0 - (1.0 - t) ** 2
+    elif curve == 'EASE_IN_OUT':
+        eased = t * t * (3.0 - 2.0 * t)
+    else:
+        eased = t
+    return offset_start + (offset_end - offset_start) * eased
+
+
+def _overlap_candidates(positions, radii):
+    """用 KD 树范围查询找出可能重叠的球对 (i, j)，i < j
+
+    查询半径为自身半径加最大半径，只比较空间上相邻的对象，密集装配体中也不会退化为平方复杂度。
+    """
+    count = len(positions)
+    tree = KDTree(count)
+    for index, position in enumerate(positions):
+        tree.insert(position, index)
+    tree.balance()
+
+    max_radius = float(radii.max())
+    first = []
+    second = []
+    for index, position in enumerate(positions):
+        for _co, other, _distance in tree.find_range(position, float(radii[index]) + max_radius):
+            if other > index:
+                first.append(index)
+                second.append(other)
+    return np.array(first, dtype=np.int64), np.array(second, dtype=np.int64)
+
+
+def separate_spheres(centers, radii, iterations=ExplodeSettings.SEPARATION_ITERATIONS):
+    """迭代推开重叠的包围球，返回每个对象的附加位移 (N, 3)
+
+    每次迭代用 KD 树范围查询找出候选对，再在 NumPy 中批量计算重叠和推开距离。
+    """
+    positions = np.array(centers, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    count = len(positions)
+    if count < 2:
+        return np.zeros_like(positions)
+
+    for _ in range(iterations):
+        first, second = _overlap_candidates(positions, radii)
+        delta = positions[second] - positions[first]
+        distances = np.linalg.norm(delta, axis=1)
+        overlaps = radii[first] + radii[second] - distances
+        mask = overlaps > 0.0
+        if not np.any(mask):
+            break
+        first, second = first[mask], second[mask]
+        delta, distances, overlaps = delta[mask], distances[mask], overlaps[mask]
+
+        directions = np.zeros_like(delta)
+        directions[:, 0] = 1.0
+        apart = distances > 1e-6
+        directions[apart] = delta[apart] / distances[apart, None]
+        # 两个对象各承担一半的推开距离
+        push = directions * (overlaps * 0.5)[:, None]
+        pushes = np.zeros_like(positions)
+        np.add.at(pushes, first, -push)
+        np.add.at(pushes, second, push)
+        positions += pushes
+
+    return positions - np.asarray(centers, dtype=np.float64)
+
+
+class MeshCentroidCalculator:
+    """批量计算网格重心和包围盒
+
+    通过 foreach_get 把顶点坐标读入可复用的 float32 缓冲区，在 NumPy 中归约，
+    结果按网格数据块缓存，关联复制的对象只计算一次。
+    """
+
+    PIVOT_MEAN = 'MEAN'
+    PIVOT_BOUNDS = 'BOUNDS'
+    PIVOT_EVALUATED = 'EVALUATED'
+
+    def __init__(self, pivot=PIVOT_MEAN, depsgraph=None):
+        self.pivot = pivot
+        self.depsgraph = depsgraph
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._cache = {}
+
+    def _read_coords(self, mesh):
+        """读取顶点坐标到复用缓冲区"""
+        count = len(mesh.vertices) * 3
+        if self._buffer.size < count:
+            self._buffer = np.empty(count, dtype=np.float32)
+        coords = self._buffer[:count]
+        mesh.vertices.foreach_get('co', coords)
+        return coords.reshape(-1, 3)
+
+    def _reduce(self, mesh):
+        """返回 (center, bounds_min, bounds_max)，空网格返回 None"""
+        if len(mesh.vertices) == 0:
+            return None
+        coords = self._read_coords(mesh)
+        bounds_min = coords.min(axis=0).astype(np.float64)
+        bounds_max = coords.max(axis=0).astype(np.float64)
+        if self.pivot == self.PIVOT_BOUNDS:
+            center = (bounds_min + bounds_max) * 0.5
+        else:
+            center = coords.mean(axis=0, dtype=np.float64)
+        return center, bounds_min, bounds_max
+
+    def local_bounds(self, obj):
+        """获取对象本地空间的重心和包围盒"""
+        if self.pivot == self.PIVOT_EVALUATED and self.depsgraph is not None and len(obj.modifiers) > 0:
+            # 带修改器的对象使用求值后的网格，不能按数据块共享
+            obj_eval = obj.evaluated_get(self.depsgraph)
+            mesh = obj_eval.to_mesh()
+            try:
+                return self._reduce(mesh)
+            finally:
+                obj_eval.to_mesh_clear()
+
+        key = obj.data.as_pointer()
+        if key not in self._cache:
+            self._cache[key] = self._reduce(obj.data)
+        return self._cache[key]
+
+    def compute(self, objects):
+        """计算对象列表的世界空间重心和包围半径
+
+        返回 (objects, centers, radii)，跳过没有顶点的对象
+        """
+        valid_objects = []
+        local_centers = []
+        half_extents = []
+        matrices = []
+        for obj in objects:
+            result = self.local_bounds(obj)
+            if result is None:
+                continue
+            center, bounds_min, bounds_max = result
+            valid_objects.append(obj)
+            local_centers.append(center)
+            half_extents.append((bounds_max - bounds_min) * 0.5)
+            matrices.append(np.array(obj.matrix_world, dtype=np.float64))
+
+        if not valid_objects:
+            return [], np.zeros((0, 3)), np.zeros(0)
+
+        local_centers = np.asarray(local_centers)
+        matrices = np.asarray(matrices)
+        # 批量转换到世界空间
+        centers = np.einsum('nij,nj->ni', matrices[:, :3, :3], local_centers) + matrices[:, :3, 3]
+        # 包围半径 = 本地半对角线长度 * 最大轴向缩放
+        axis_scales = np.linalg.norm(matrices[:, :3, :3], axis=1).max(axis=1)
+        radii = np.linalg.norm(np.asarray(half_extents), axis=1) * axis_scales
+        return valid_objects, centers, radii
+
+
+class ExplodeState:
+    """爆炸图状态：以连续数组保存初始位置、方向和缩放因子
+
+    对象以 session_uid 作为稳定标识，撤销/重做后仍然有效；
+    每个对象的紧凑记录为 [location(3), center(3), radius]。
+
+    输出方式:
+    - LOCATION: 直接写入 location
+    - DELTA: 只写入 delta_location，不改动原始位置
+    - DRIVER: delta_location 由读取集合控制属性的驱动器求值，更新时只写一个属性
+    """
+
+    OUTPUT_LOCATION = 'LOCATION'
+    OUTPUT_DELTA = 'DELTA'
+    OUTPUT_DRIVER = 'DRIVER'
+
+    METHOD_RADIAL = 'RADIAL'
+    METHOD_HIERARCHY = 'HIERARCHY'
+
+    RECORD_SIZE = 7
+
+    def __init__(self, uids, base_locations, centers, radii=None, objects=None):
+        self.uids = np.asarray(uids, dtype=np.int64)
+        self.base_locations = np.asarray(base_locations, dtype=np.float64).reshape(-1, 3)
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.radii = np.zeros(len(self.centers)) if radii is None else np.asarray(radii, dtype=np.float64)
+        # session_uid -> 行号，保证单个对象 O(1) 查找
+        self._rows = {uid: row for row, uid in enumerate(self.uids.tolist())}
+        # 对象引用在撤销或重新载入后会失效，需要时按 session_uid 重新解析
+        self.objects = list(objects) if objects is not None else None
+        self.directions, self.scale_factors = compute_radial_vectors(self.centers)
+        # 单位偏移值对应的位移向量
+        self.vectors = self.directions * self.scale_factors[:, None]
+        self.current_offset = 0.0
+        self.current_locations = self.base_locations.copy()
+        self.last_update_ms = 0.0
+        # 重叠分离模式及其按偏移值缓存的结果
+        self.separate = False
+        self._separation_cache = OrderedDict()
+        self.output = self.OUTPUT_LOCATION
+        self.method = self.METHOD_RADIAL
+        self.falloff = ExplodeSettings.DEFAULT_LEVEL_FALLOFF
+
+    def __len__(self):
+        return len(self.uids)
+
+    def row_of(self, obj):
+        """获取对象所在行，不存在返回 None"""
+        return self._rows.get(obj.session_uid)
+
+    def records(self):
+        """返回 (N, 7) 的紧凑记录数组"""
+        return np.hstack((self.base_locations, self.centers, self.radii[:, None]))
+
+    @classmethod
+    def from_records(cls, objects, records):
+        """从紧凑记录重建状态"""
+        records = np.asarray(records, dtype=np.float64).reshape(-1, cls.RECORD_SIZE)
+        uids = [obj.session_uid for obj in objects]
+        return cls(uids, records[:, 0:3], records[:, 3:6], records[:, 6], objects)
+
+    def resolve(self, collection):
+        """按 session_uid 重新解析集合中的对象引用"""
+        objects = [None] * len(self.uids)
+        rows = self._rows
+        for obj in collection.all_objects:
+            row = rows.get(obj.session_uid)
+            if row is not None:
+                objects[row] = obj
+        self.objects = objects
+        return objects
+
+    def invalidate(self):
+        """丢弃对象引用（撤销、重做或载入文件之后调用）
+
+        撤销后对象的实际位置未知，已写入位置的记录也一并作废，下一次更新写入所有对象
+        """
+        self.objects = None
+        self.current_locations = np.full_like(self.base_locations, np.nan)
+
+    def set_layout(self, method, falloff, collection, update_drivers=True):
+        """切换展开方式（径向或按集合层级），重新计算位移向量"""
+        if method == self.METHOD_HIERARCHY:
+            self.vectors = compute_hierarchy_vectors(collection, self.uids, self.centers, falloff)
+        else:
+            self.vectors = self.directions * self.scale_factors[:, None]
+        self.method = method
+        self.falloff = falloff
+        self._separation_cache.clear()
+        if update_drivers and self.output == self.OUTPUT_DRIVER:
+            self.install_drivers(collection)
+
+    def separation(self, offset):
+        """获取给定偏移值下的分离位移，结果按量化后的偏移值缓存"""
+        key = round(offset / ExplodeSettings.SEPARATION_CACHE_STEP)
+        cache = self._separation_cache
+        displacement = cache.get(key)
+        if displacement is None:
+            centers = self.centers + self.vectors * offset
+            displacement = separate_spheres(centers, self.radii)
+            # 偏移值从 0 开始逐渐引入分离，保持装配状态不变
+            max_radius = self.radii.max() if len(self.radii) else 0.0
+            if max_radius > 0.0:
+                displacement *= min(1.0, abs(offset) / max_radius)
+            cache[key] = displacement
+            if len(cache) > ExplodeSettings.SEPARATION_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return displacement
+
+    def locations(self, offset):
+        """计算给定偏移值下所有对象的位置"""
+        locations = self.base_locations + self.vectors * offset
+        if self.separate:
+            locations = locations + self.separation(offset)
+        return locations
+
+    def locations_for_offsets(self, offsets):
+        """批量计算多个偏移值下的位置，返回 (F, N, 3)"""
+        offsets = np.asarray(offsets, dtype=np.float32)
+        if self.separate:
+            return np.stack([self.locations(offset) for offset in offsets.tolist()]).astype(np.float32)
+        return (self.base_locations.astype(np.float32)[None, :, :]
+                + offsets[:, None, None] * self.vectors.astype(np.float32)[None, :, :])
+
+    def bake(self, collection, frames, offsets):
+        """把偏移动画烘焙为关键帧，返回写入的对象数量
+
+        DELTA 模式写入 delta_location，其余模式写入 location
+        """
+        if self.objects is None:
+            self.resolve(collection)
+        trajectories = self.locations_for_offsets(offsets)
+        data_path = 'location'
+        if self.output == self.OUTPUT_DELTA:
+            trajectories -= self.base_locations.astype(np.float32)[None, :, :]
+            data_path = 'delta_location'
+        baked = 0
+        for row, obj in enumerate(self.objects):
+            if obj is None:
+                continue
+            write_vector_keys(obj, data_path, frames, trajectories[:, row, :])
+            baked += 1
+        return baked
+
+    def write_locations(self, locations, force=False):
+        """写回对象位置，只对位置变化的对象执行 RNA 写入"""
+        if len(self.uids) == 0:
+            return 0
+        # 跳过位置未变化的对象，减少 RNA 写入
+        if force:
+            changed = np.arange(len(self.uids))
+        else:
+            # 作废的记录为 NaN，比较结果为 False，同样视为已变化
+            changed = np.flatnonzero(~np.all(np.abs(locations - self.current_locations) <= 1e-7, axis=1))
+        if self.output == self.OUTPUT_DELTA:
+            attribute = 'delta_location'
+            rows = (locations[changed] - self.base_locations[changed]).tolist()
+        else:
+            attribute = 'location'
+            rows = locations[changed].tolist()
+        objects = self.objects
+        for index, location in zip(changed.tolist(), rows):
+            obj = objects[index]
+            if obj is not None:
+                setattr(obj, attribute, location)
+        self.current_locations[changed] = locations[changed]
+        return len(rows)
+
+    def install_drivers(self, collection):
+        """为所有对象安装偏移驱动器"""
+        if self.objects is None:
+            self.resolve(collection)
+        if EXPLODE_OFFSET_PROP not in collection:
+            collection[EXPLODE_OFFSET_PROP] = float(self.current_offset)
+        for obj, vector in zip(self.objects, self.vectors.tolist()):
+            if obj is None:
+                continue
+            for index in range(3):
+                ensure_offset_driver(obj, index, collection, vector[index])
+
+    def remove_drivers(self, collection):
+        """移除所有对象的偏移驱动器"""
+        if self.objects is None:
+            self.resolve(collection)
+        for obj in self.objects:
+            if obj is not None:
+                remove_offset_drivers(obj)
+
+    def _set_control(self, collection, offset):
+        """更新驱动器读取的控制属性"""
+        collection[EXPLODE_OFFSET_PROP] = float(offset)
+        collection.update_tag()
+
+    def apply(self, offset, collection, force=False):
+        """应用偏移值并记录耗时；force 为 True 时写入所有对象"""
+        start = time.perf_counter()
+        if self.objects is None:
+            self.resolve(collection)
+        if self.output == self.OUTPUT_DRIVER:
+            # 驱动器模式只写一个控制属性，由 Blender 求值所有对象
+            self._set_control(collection, offset)
+            self.current_locations = self.base_locations + self.vectors * offset
+        else:
+            self.write_locations(self.locations(offset), force)
+        self.current_offset = offset
+        self.last_update_ms = (time.perf_counter() - start) * 1000.0
+
+    def set_output(self, output, collection):
+        """切换输出方式：先清理旧方式写入的数据，再应用到新方式"""
+        if output == self.output:
+            return
+        self.reset(collection)
+        if self.output == self.OUTPUT_DRIVER:
+            self.remove_drivers(collection)
+        self.output = output
+        if output == self.OUTPUT_DRIVER:
+            self.install_drivers(collection)
+
+    def reset_object(self, obj):
+        """恢复单个对象到初始位置"""
+        row = self.row_of(obj)
+        if row is None:
+            return False
+        if self.output == self.OUTPUT_LOCATION:
+            obj.location = self.base_locations[row].tolist()
+        else:
+            obj.delta_location = (0.0, 0.0, 0.0)
+        self.current_locations[row] = self.base_locations[row]
+        return True
+
+    def reset(self, collection):
+        """恢复所有对象到初始位置
+
+        DELTA/DRIVER 模式不改动 location，只需清零 delta_location 或控制属性
+        """
+        if self.objects is None:
+            self.resolve(collection)
+        if self.output == self.OUTPUT_DRIVER:
+            self._set_control(collection, 0.0)
+        elif self.output == self.OUTPUT_DELTA:
+            for obj in self.objects:
+                if obj is not None:
+                    obj.delta_location = (0.0, 0.0, 0.0)
+        else:
+            for obj, location in zip(self.objects, self.base_locations.tolist()):
+                if obj is not None:
+                    obj.location = location
+        self.current_locations = self.base_locations.copy()
+        self.current_offset = 0.0
+
+
+class ExplodeStore:
+    """按集合保存爆炸图状态，可选择序列化到 .blend 文件
+
+    状态以集合的 session_uid 为键，重命名集合后仍能找到。
+
+    每个对象的记录保存在自定义属性 RECORD_PROP 中，当前偏移值保存在集合的
+    OFFSET_PROP 中，重新打开文件后无需重新记录即可恢复。
+    """
+
+    RECORD_PROP = EXPLODE_RECORD_PROP
+    OFFSET_PROP = EXPLODE_OFFSET_PROP
+    OUTPUT_PROP = EXPLODE_OUTPUT_PROP
+    METHOD_PROP = EXPLODE_METHOD_PROP
+    FALLOFF_PROP = EXPLODE_FALLOFF_PROP
+
+    def __init__(self):
+        self._states = {}
+        # 几何节点后端：集合是否带有爆炸图修改器，避免面板每次重绘都遍历对象
+        self._node_records = {}
+
+    def get(self, collection, rebuild=True):
+        """获取集合的爆炸图状态，必要时从文件中的记录重建"""
+        if collection is None:
+            return None
+        state = self._states.get(collection.session_uid)
+        if state is None and rebuild:
+            state = self.load(collection)
+            if state is not None:
+                self._states[collection.session_uid] = state
+        return state
+
+    def set(self, collection, state, serialize=True):
+        """保存状态；serialize 为 True 时同时写入对象自定义属性"""
+        self._states[collection.session_uid] = state
+        if serialize:
+            self.save(collection, state)
+        else:
+            self.clear_records(collection, keep_control=state.output == state.OUTPUT_DRIVER)
+
+    def discard(self, collection):
+        """丢弃集合的状态"""
+        if collection is not None:
+            self._states.pop(collection.session_uid, None)
+
+    def invalidate_objects(self):
+        """使所有状态中的对象引用失效"""
+        for state in self._states.values():
+            state.invalidate()
+        self._node_records.clear()
+
+    def clear(self):
+        self._states.clear()
+        self._node_records.clear()
+
+    def has_node_record(self, collection):
+        """集合中是否有爆炸图几何节点修改器，结果缓存到修改器变化或撤销为止"""
+        record = self._node_records.get(collection.session_uid)
+        if record is None:
+            record = len(get_explode_modifiers(collection)) > 0
+            self._node_records[collection.session_uid] = record
+        return record
+
+    def invalidate_node_record(self, collection):
+        """添加或移除爆炸图修改器后调用"""
+        self._node_records.pop(collection.session_uid, None)
+
+    def save(self, collection, state):
+        """把紧凑记录写入对象自定义属性"""
+        if state.objects is None:
+            state.resolve(collection)
+        for obj, record in zip(state.objects, state.records().tolist()):
+            if obj is not None:
+                obj[self.RECORD_PROP] = record
+        collection[self.OFFSET_PROP] = float(state.current_offset)
+        collection[self.OUTPUT_PROP] = state.output
+        collection[self.METHOD_PROP] = state.method
+        collection[self.FALLOFF_PROP] = float(state.falloff)
+
+    def save_offset(self, collection, state):
+        """只更新集合上保存的偏移值和输出方式（驱动器模式由状态自己写入）"""
+        if self.OFFSET_PROP in collection and state.output != state.OUTPUT_DRIVER:
+            collection[self.OFFSET_PROP] = float(state.current_offset)
+        if self.OUTPUT_PROP in collection:
+            collection[self.OUTPUT_PROP] = state.output
+            collection[self.METHOD_PROP] = state.method
+            collection[self.FALLOFF_PROP] = float(state.falloff)
+
+    def has_record(self, collection):
+        """集合是否有保存在文件中的记录"""
+        return self.OFFSET_PROP in collection
+
+    def clear_records(self, collection, keep_control=False):
+        """删除文件中的记录；keep_control 为 True 时保留驱动器使用的控制属性"""
+        for obj in collection.all_objects:
+            if self.RECORD_PROP in obj:
+                del obj[self.RECORD_PROP]
+        props = (self.OUTPUT_PROP, self.METHOD_PROP, self.FALLOFF_PROP)
+        if not keep_control:
+            props += (self.OFFSET_PROP,)
+        for prop in props:
+            if prop in collection:
+                del collection[prop]
+
+    def load(self, collection):
+        """从对象自定义属性重建状态，没有记录返回 None"""
+        if self.OFFSET_PROP not in collection:
+            return None
+        objects = []
+        records = []
+        for obj in collection.all_objects:
+            record = obj.get(self.RECORD_PROP)
+            if obj.type == 'MESH' and record is not None and len(record) == ExplodeState.RECORD_SIZE:
+                objects.append(obj)
+                records.append(list(record))
+        if not objects:
+            return None
+        state = ExplodeState.from_records(objects, records)
+        # 恢复保存时的偏移状态和输出方式
+        state.output = collection.get(self.OUTPUT_PROP, ExplodeState.OUTPUT_LOCATION)
+        method = collection.get(self.METHOD_PROP, ExplodeState.METHOD_RADIAL)
+        if method != ExplodeState.METHOD_RADIAL:
+            state.set_layout(method, float(collection.get(self.FALLOFF_PROP, state.falloff)), collection, update_drivers=False)
+        state.current_offset = float(collection[self.OFFSET_PROP])
+        state.current_locations = state.locations(state.current_offset)
+        return state
+
+
+class ExplodeUpdateScheduler:
+    """基于 bpy.app.timers 的滑条更新调度器
+
+    合并拖动过程中的中间值，每个视口帧最多应用一次更新；定时器总是应用
+    最新的值，因此松开滑条后的最后一次更新与最终值完全一致。
+    定时器中的写入不属于任何操作符的撤销步骤：中间更新不推送撤销，
+    滑条静止 UNDO_DEBOUNCE_SECONDS 后由单独的一次性定时器推送一个撤销步骤，
+    每次 request() 都会重新计时。
+    """
+
+    def __init__(self, apply_callback, max_rate=ExplodeSettings.MAX_UPDATES_PER_SECOND, undo_message=None,
+                 undo_delay=ExplodeSettings.UNDO_DEBOUNCE_SECONDS):
+        self._apply = apply_callback
+        self.undo_message = undo_message
+        self.undo_delay = undo_delay
+        self.interval = 1.0 / max_rate
+        self._pending = {}
+        self._last_apply = 0.0
+        self._registered = False
+        self._undo_registered = False
+        self._needs_undo = False
+        # 定时器按函数对象识别，保存同一个绑定方法以便注销
+        self._timer = self._tick
+        self._undo_timer = self._push_undo
+
+    def request(self, key, offset):
+        """登记一次更新请求，同一 key 的旧值会被覆盖"""
+        self._pending[key] = offset
+        if not self._registered:
+            elapsed = time.perf_counter() - self._last_apply
+            bpy.app.timers.register(self._timer, first_interval=max(0.0, self.interval - elapsed))
+            self._registered = True
+        if self.undo_message:
+            # 重新计时：只在最后一次请求之后静止一段时间才推送撤销
+            self._cancel_undo()
+            bpy.app.timers.register(self._undo_timer, first_interval=self.undo_delay)
+            self._undo_registered = True
+
+    def _tick(self):
+        pending, self._pending = self._pending, {}
+        for key, offset in pending.items():
+            try:
+                self._apply(key, offset)
+            except Exception as e:
+                print(f"ATools: 爆炸图更新失败: {str(e)}")
+        self._last_apply = time.perf_counter()
+        if pending:
+            self._needs_undo = True
+        # 拖动过程中有新值则在下一帧继续，否则停止定时器
+        if self._pending:
+            return self.interval
+        self._registered = False
+        return None
+
+    def _push_undo(self):
+        if self._registered:
+            # 仍有更新未应用，等应用后再推送
+            return self.undo_delay
+        self._undo_registered = False
+        if self._needs_undo:
+            self._needs_undo = False
+            try:
+                bpy.ops.ed.undo_push(message=self.undo_message)
+            except RuntimeError as e:
+                print(f"ATools: 推送爆炸图撤销步骤失败: {str(e)}")
+        return None
+
+    def _cancel_undo(self):
+        if self._undo_registered and bpy.app.timers.is_registered(self._undo_timer):
+            bpy.app.timers.unregister(self._undo_timer)
+        self._undo_registered = False
+
+    def flush(self):
+        """立即应用所有待处理的更新，写入归入调用方（操作符）的撤销步骤"""
+        self.cancel(keep_pending=True)
+        if self._pending:
+            self._tick()
+        self._needs_undo = False
+
+    def cancel(self, keep_pending=False):
+        """注销定时器，包括尚未推送的撤销步骤"""
+        if self._registered and bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        self._registered = False
+        self._cancel_undo()
+        if not keep_pending:
+            self._pending.clear()
+            self._needs_undo = False
@@ -0,0 +1,134 @@
+import numpy as np
+from mathutils import Matrix
+from .anim_utils import write_vector_keys
+from .physics_utils import WorldMatrixReader
+
+
+def _rotation_basis(matrices):
+    """去掉缩放的旋转矩阵，matrices 为 (..., 4, 4) 行主序矩阵"""
+    basis = matrices[..., :3, :3]
+    lengths = np.linalg.norm(basis, axis=-2)
+    lengths[lengths == 0.0] = 1.0
+    return basis / lengths[..., None, :]
+
+
+def matrices_to_euler_xyz(rotations):
+    """(F, 3, 3) 旋转矩阵 -> (F, 3) XYZ 欧拉角，并沿帧展开避免 ±π 跳变"""
+    x = np.arctan2(rotations[:, 2, 1], rotations[:, 2, 2])
+    y = np.arcsin(np.clip(-rotations[:, 2, 0], -1.0, 1.0))
+    z = np.arctan2(rotations[:, 1, 0], rotations[:, 0, 0])
+    return np.unwrap(np.stack((x, y, z), axis=1), axis=0)
+
+
+def matrices_to_quaternions(rotations):
+    """(F, 3, 3) 旋转矩阵 -> (F, 4) 四元数 (w, x, y, z)，保持相邻帧符号一致"""
+    m = rotations
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    quats = np.empty((len(m), 4), dtype=np.float64)
+    # 按对角线最大分量选择数值稳定的公式
+    cases = np.stack((trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]), axis=1).argmax(axis=1)
+    for case, (i, j, k) in ((1, (0, 1, 2)), (2, (1, 2, 0)), (3, (2, 0, 1))):
+        sel = cases == case
+        s = np.sqrt(np.maximum(1.0 + m[sel, i, i] - m[sel, j, j] - m[sel, k, k], 1e-12)) * 2.0
+        quats[sel, 0] = (m[sel, k, j] - m[sel, j, k]) / s
+        quats[sel, 1 + i] = 0.25 * s
+        quats[sel, 1 + j] = (m[sel, j, i] + m[sel, i, j]) / s
+        quats[sel, 1 + k] = (m[sel, k, i] + m[sel, i, k]) / s
+    sel = cases == 0
+    s = np.sqrt(np.maximum(trace[sel] + 1.0, 1e-12)) * 2.0
+    quats[sel, 0] = 0.25 * s
+    quats[sel, 1] = (m[sel, 2, 1] - m[sel, 1, 2]) / s
+    quats[sel, 2] = (m[sel, 0, 2] - m[sel, 2, 0]) / s
+    quats[sel, 3] = (m[sel, 1, 0] - m[sel, 0, 1]) / s
+    # q 与 -q 表示同一旋转，翻转符号使相邻帧连续
+    for index in range(1, len(quats)):
+        if np.dot(quats[index], quats[index - 1]) < 0.0:
+            quats[index] = -quats[index]
+    return quats
+
+
+class MotionRecorder:
+    """逐帧记录主动对象的世界矩阵，模拟结束后批量写成关键帧
+
+    每帧通过 WorldMatrixReader 批量读取一次，只保存旋转和位移 (N, 12)，最终堆叠为 (F, N, 12) float32。
+    """
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+        self._reader = WorldMatrixReader(self.objects)
+        self.frames = []
+        self._samples = []
+
+    def capture(self, frame):
+        """记录当前帧，重复的帧会被忽略"""
+        if self.frames and frame <= self.frames[-1]:
+            return
+        # read_world_matrices 返回转置矩阵，行 0-2 为旋转列，行 3 为位移
+        matrices = self._reader.read()
+        self._samples.append(matrices[:, :, :3].reshape(len(self.objects), 12).copy())
+        self.frames.append(frame)
+
+    def local_matrices(self):
+        """(F, N, 4, 4) 行主序局部矩阵，父级在模拟期间视为静止"""
+        samples = np.stack(self._samples).astype(np.float64)
+        matrices = np.zeros(samples.shape[:2] + (4, 4))
+        matrices[..., :3, :] = samples.reshape(samples.shape[:2] + (4, 3)).transpose(0, 1, 3, 2)
+        matrices[..., 3, 3] = 1.0
+        corrections = []
+        for obj in self.objects:
+            if obj.parent is None:
+                corrections.append(np.eye(4))
+            else:
+                corrections.append(np.array((obj.parent.matrix_world @ obj.matrix_parent_inverse).inverted()))
+        return np.einsum('nij,fnjk->fnik', np.array(corrections), matrices)
+
+    def _rest_frame_count(self, locations, rotations, tolerance, angle_tolerance):
+        """对象停止运动后的关键帧都是多余的，返回需要保留的帧数
+
+        位移按距离 tolerance 判定，旋转按与最终姿态之间的夹角（弧度）angle_tolerance 判定
+        """
+        location_delta = np.linalg.norm(locations - locations[-1], axis=1)
+        # trace(Rf^T R) = 1 + 2cos(θ)
+        trace = np.einsum('fij,ij->f', rotations, rotations[-1])
+        rotation_delta = np.arccos(np.clip((trace - 1.0) * 0.5, -1.0, 1.0))
+        moving = np.nonzero((location_delta > tolerance) | (rotation_delta > angle_tolerance))[0]
+        return min(len(locations), (moving[-1] + 2) if len(moving) else 1)
+
+    def write_keys(self, frame_offset=0, reduce_keys=False, tolerance=1e-4, angle_tolerance=1e-3):
+        """把记录的运动写成 location / rotation F 曲线
+
+        返回 (写入的关键帧总数, 最长的关键帧范围帧数)
+        """
+        if not self._samples:
+            return 0, 0
+        frames = np.asarray(self.frames, dtype=np.float64) + frame_offset
+        local = self.local_matrices()
+        key_count = 0
+        frame_count = 0
+        for index, obj in enumerate(self.objects):
+            locations = local[:, index, :3, 3]
+            rotations = _rotation_basis(local[:, index])
+            count = self._rest_frame_count(locations, rotations, tolerance, angle_tolerance) if reduce_keys else len(frames)
+            locations, rotations = locations[:count], rotations[:count]
+
+            write_vector_keys(obj, "location", frames[:count], locations)
+            if obj.rotation_mode == 'XYZ':
+                write_vector_keys(obj, "rotation_euler", frames[:count], matrices_to_euler_xyz(rotations))
+            elif obj.rotation_mode == 'QUATERNION':
+                write_vector_keys(obj, "rotation_quaternion", frames[:count], matrices_to_quaternions(rotations))
+            elif obj.rotation_mode == 'AXIS_ANGLE':
+                axis_angles = [Matrix(rotation.tolist()).to_quaternion().to_axis_angle() for rotation in rotations]
+                values = np.array([(angle, *axis) for axis, angle in axis_angles])
+                write_vector_keys(obj, "rotation_axis_angle", frames[:count], values)
+            else:
+                # 其他欧拉顺序较少见，逐帧用 mathutils 转换并保持连续
+                eulers = []
+                euler = None
+                for rotation in rotations:
+                    matrix = Matrix(rotation.tolist())
+                    euler = matrix.to_euler(obj.rotation_mode) if euler is None else matrix.to_euler(obj.rotation_mode, euler)
+                    eulers.append(tuple(euler))
+                write_vector_keys(obj, "rotation_euler", frames[:count], eulers)
+            key_count += count
+            frame_count = max(frame_count, count)
+        return key_count, frame_count
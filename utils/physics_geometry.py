@@ -0,0 +1,335 @@
+import hashlib
+from collections import OrderedDict
+import bpy
+import bmesh
+import numpy as np
+from ..config.constants import PhysicsSettings
+
+
+def read_mesh_coords(mesh):
+    """读取网格顶点坐标，返回 (N, 3) float32"""
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
+
+def read_mesh_triangles(mesh):
+    """读取网格三角化后的顶点索引，返回 (M, 3) int32"""
+    mesh.calc_loop_triangles()
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+    return triangles.reshape(-1, 3)
+
+
+def mesh_geometry_hash(mesh):
+    """根据顶点坐标和拓扑计算网格的几何哈希"""
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loops)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.int64([len(mesh.vertices), len(mesh.loops)]).tobytes())
+    digest.update(read_mesh_coords(mesh).tobytes())
+    digest.update(loops.tobytes())
+    return digest.hexdigest()
+
+
+def mesh_from_arrays(name, coords, triangles):
+    """用 foreach_set 从顶点和三角形数组创建网格"""
+    coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set('co', coords.ravel())
+    mesh.loops.add(triangles.size)
+    mesh.loops.foreach_set('vertex_index', triangles.ravel())
+    mesh.polygons.add(len(triangles))
+    mesh.polygons.foreach_set('loop_start', np.arange(0, triangles.size, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        # 4.0 起 loop_total 由 loop_start 推导且为只读
+        mesh.polygons.foreach_set('loop_total', np.full(len(triangles), 3, dtype=np.int32))
+    mesh.update()
+    return mesh
+
+
+def convex_hull_bmesh(coords):
+    """点集的凸包 bmesh，顶点通过临时网格的 foreach_set 批量写入，调用方负责 free"""
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    points = bpy.data.meshes.new("AT_HullPoints")
+    bm = bmesh.new()
+    try:
+        points.vertices.add(len(coords))
+        points.vertices.foreach_set('co', coords.ravel())
+        bm.from_mesh(points)
+        result = bmesh.ops.convex_hull(bm, input=bm.verts)
+        # 删除没有参与凸包的内部顶点
+        unused = result['geom_interior'] + result['geom_unused']
+        bmesh.ops.delete(bm, geom=[elem for elem in unused if isinstance(elem, bmesh.types.BMVert)], context='VERTS')
+    except Exception:
+        bm.free()
+        raise
+    finally:
+        bpy.data.meshes.remove(points)
+    return bm
+
+
+def build_convex_hull_mesh(mesh, name):
+    """用 bmesh.ops.convex_hull 生成凸包网格"""
+    bm = convex_hull_bmesh(read_mesh_coords(mesh))
+    try:
+        proxy = bpy.data.meshes.new(name)
+        bm.to_mesh(proxy)
+    finally:
+        bm.free()
+    return proxy
+
+
+def convex_hull_volume(coords):
+    """用 bmesh 计算点集凸包的体积"""
+    bm = convex_hull_bmesh(coords)
+    try:
+        return abs(bm.calc_volume())
+    finally:
+        bm.free()
+
+
+def build_cluster_mesh(mesh, name, resolution):
+    """顶点聚类简化：按包围盒对角线/resolution 的网格合并顶点，删除退化三角形"""
+    coords = read_mesh_coords(mesh).astype(np.float64)
+    triangles = read_mesh_triangles(mesh)
+    diagonal = np.linalg.norm(coords.max(axis=0) - coords.min(axis=0)) if len(coords) else 0.0
+    cell_size = max(diagonal / max(1, resolution), 1e-6)
+
+    keys = np.floor(coords / cell_size).astype(np.int64)
+    _unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    cluster_count = inverse.max() + 1 if len(inverse) else 0
+
+    # 每个聚类取顶点平均值
+    sums = np.zeros((cluster_count, 3))
+    np.add.at(sums, inverse, coords)
+    counts = np.bincount(inverse, minlength=cluster_count)
+    cluster_coords = sums / counts[:, None]
+
+    remapped = inverse[triangles]
+    valid = (remapped[:, 0] != remapped[:, 1]) & (remapped[:, 1] != remapped[:, 2]) & (remapped[:, 0] != remapped[:, 2])
+    remapped = remapped[valid]
+    # 去除重复三角形
+    if len(remapped):
+        _keys, first = np.unique(np.sort(remapped, axis=1), axis=0, return_index=True)
+        remapped = remapped[np.sort(first)]
+    return mesh_from_arrays(name, cluster_coords, remapped)
+
+
+def build_offset_mesh(mesh, name, strength):
+    """复制网格并把顶点沿法线偏移 strength，结果与 mid_level=0 的 Displace 修改器一致
+
+    只对没有其他修改器和形状键的对象成立，调用方负责筛选
+    """
+    coords = read_mesh_coords(mesh)
+    normals = np.empty(coords.size, dtype=np.float32)
+    mesh.vertices.foreach_get('normal', normals)
+    offset = mesh.copy()
+    offset.name = name
+    offset.vertices.foreach_set('co', (coords + normals.reshape(-1, 3) * strength).ravel())
+    offset.update()
+    return offset
+
+
+def _relative_spread(distances):
+    """距离的相对离散度，0 表示所有点到形状表面的距离完全一致"""
+    top = distances.max() if len(distances) else 0.0
+    return float((top - distances.min()) / top) if top > 0.0 else 0.0
+
+
+def _volume_matches(volume, expected, tolerance):
+    """凸包体积与理想形状体积的相对误差是否在 tolerance 内"""
+    return expected > 0.0 and abs(volume / expected - 1.0) <= tolerance
+
+
+def analyze_collision_shape(mesh, tolerance):
+    """分析网格几何，返回误差在 tolerance 内计算代价最低的刚体碰撞形状
+
+    依次尝试 SPHERE、CAPSULE、BOX、CONVEX_HULL，都不满足时使用 MESH。
+    球体和胶囊体除了顶点到表面的距离一致外，凸包体积也必须与理想形状相符，
+    否则只有角点的立方体或方柱也会被判为球体或胶囊体。
+    Blender 的 BOX/SPHERE/CAPSULE 以对象原点为中心、按局部包围盒尺寸创建，
+    原点偏离包围盒中心超过 tolerance（相对对角线）时基本形状会整体错位，只考虑凸包和网格。
+    """
+    coords = read_mesh_coords(mesh).astype(np.float64)
+    if len(coords) < 4:
+        return 'BOX'
+    bounds_min, bounds_max = coords.min(axis=0), coords.max(axis=0)
+    extents = bounds_max - bounds_min
+    center = (bounds_min + bounds_max) * 0.5
+    diagonal = float(np.linalg.norm(extents))
+    box_volume = float(np.prod(extents))
+    hull_volume = convex_hull_volume(coords)
+
+    # 平面或线状网格：薄盒子即可
+    if diagonal == 0.0 or hull_volume <= 1e-6 * diagonal ** 3:
+        return 'BOX'
+
+    local = coords - center
+    # 原点在底部等情况下基本形状与网格错位
+    centered = float(np.linalg.norm(center)) <= tolerance * diagonal
+
+    # 球体：三个方向尺寸相近，所有顶点到中心距离一致，且体积接近 4/3·π·r³
+    if centered and extents.min() >= extents.max() * (1.0 - tolerance):
+        distances = np.linalg.norm(local, axis=1)
+        sphere_volume = 4.0 / 3.0 * np.pi * float(distances.max()) ** 3
+        if _relative_spread(distances) <= tolerance and _volume_matches(hull_volume, sphere_volume, tolerance):
+            return 'SPHERE'
+
+    # 胶囊体：沿局部 Z 轴，XY 截面为圆，两端为半球
+    radius = max(extents[0], extents[1]) * 0.5
+    if centered and extents[2] > radius * 2.0 and min(extents[0], extents[1]) >= max(extents[0], extents[1]) * (1.0 - tolerance):
+        half_length = extents[2] * 0.5 - radius
+        axial = local[:, 2] - np.clip(local[:, 2], -half_length, half_length)
+        distances = np.sqrt(local[:, 0] ** 2 + local[:, 1] ** 2 + axial ** 2)
+        capsule_volume = np.pi * radius ** 2 * (2.0 * half_length) + 4.0 / 3.0 * np.pi * radius ** 3
+        if _relative_spread(distances) <= tolerance and _volume_matches(hull_volume, capsule_volume, tolerance):
+            return 'CAPSULE'
+
+    # 盒子：凸包几乎填满包围盒
+    if centered and box_volume > 0.0 and hull_volume / box_volume >= 1.0 - tolerance:
+        return 'BOX'
+
+    # 凸包：封闭网格的体积接近凸包体积，即没有明显的凹陷
+    loops_edges = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loops_edges)
+    closed = len(mesh.edges) > 0 and np.all(np.bincount(loops_edges, minlength=len(mesh.edges)) == 2)
+    if closed:
+        triangles = coords[read_mesh_triangles(mesh)]
+        mesh_volume = abs(float(np.einsum('ij,ij->i', triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum())) / 6.0
+        if mesh_volume / hull_volume >= 1.0 - tolerance:
+            return 'CONVEX_HULL'
+    return 'MESH'
+
+
+class CollisionShapeClassifier:
+    """AUTO 碰撞形状：分析结果连同几何哈希保存在网格数据块上，几何不变时直接复用"""
+
+    SHAPE_PROP = "at_auto_shape"
+    HASH_PROP = "at_auto_shape_hash"
+    # 分析规则变化时递增，使文件中保存的旧结果失效
+    ANALYSIS_VERSION = 2
+
+    def __init__(self):
+        # 本次会话内按网格指针缓存，避免重复计算哈希
+        self._shapes = {}
+        # 本次会话内按对象缓存，换入代理或预偏移网格后仍返回原始网格的分类结果
+        self._object_shapes = {}
+
+    def classify_object(self, obj, tolerance):
+        key = (obj.session_uid, round(float(tolerance), 4))
+        shape = self._object_shapes.get(key)
+        if shape is None:
+            shape = self.classify(obj.data, tolerance)
+            self._object_shapes[key] = shape
+        return shape
+
+    def classify(self, mesh, tolerance):
+        pointer_key = (mesh.as_pointer(), round(float(tolerance), 4))
+        shape = self._shapes.get(pointer_key)
+        if shape is not None:
+            return shape
+
+        geometry_key = f"{mesh_geometry_hash(mesh)}:{pointer_key[1]}:{self.ANALYSIS_VERSION}"
+        if mesh.get(self.HASH_PROP) == geometry_key and mesh.get(self.SHAPE_PROP):
+            shape = mesh[self.SHAPE_PROP]
+        else:
+            shape = analyze_collision_shape(mesh, tolerance)
+            # 链接的网格不可写，只在本次会话内缓存
+            if mesh.library is None:
+                mesh[self.SHAPE_PROP] = shape
+                mesh[self.HASH_PROP] = geometry_key
+        self._shapes[pointer_key] = shape
+        return shape
+
+    def clear(self):
+        self._shapes.clear()
+        self._object_shapes.clear()
+
+
+class CollisionProxyCache:
+    """按几何哈希缓存模拟用的碰撞网格（简化代理、预偏移网格），重复模拟时直接复用"""
+
+    HASH_PROP = "at_proxy_hash"
+
+    def __init__(self):
+        # 按最近使用顺序排列，会话结束时只保留最近的若干个
+        self._names = OrderedDict()
+
+    def _cached(self, key):
+        name = self._names.get(key)
+        mesh = bpy.data.meshes.get(name) if name else None
+        if mesh is not None and mesh.get(self.HASH_PROP) == key[0]:
+            self._names.move_to_end(key)
+            return mesh
+        self._names.pop(key, None)
+        return None
+
+    def get_proxy(self, mesh, method, resolution):
+        """获取网格的碰撞代理，必要时创建"""
+        key = (mesh_geometry_hash(mesh), method, resolution if method == 'CLUSTER' else 0)
+        proxy = self._cached(key)
+        if proxy is not None:
+            return proxy
+
+        proxy_name = f"AT_Proxy_{mesh.name}"
+        if method == 'CLUSTER':
+            proxy = build_cluster_mesh(mesh, proxy_name, resolution)
+        else:
+            proxy = build_convex_hull_mesh(mesh, proxy_name)
+        proxy[self.HASH_PROP] = key[0]
+        self._names[key] = proxy.name
+        return proxy
+
+    def get_offset_mesh(self, mesh, strength):
+        """获取沿法线预偏移 strength 的网格，代替模拟期间逐帧求值的收缩修改器"""
+        key = (mesh_geometry_hash(mesh), 'OFFSET', round(float(strength), 6))
+        offset = self._cached(key)
+        if offset is not None:
+            return offset
+
+        offset = build_offset_mesh(mesh, f"AT_Offset_{mesh.name}", strength)
+        offset[self.HASH_PROP] = key[0]
+        self._names[key] = offset.name
+        return offset
+
+    def release(self, keep=PhysicsSettings.PROXY_CACHE_KEEP):
+        """会话结束后删除不再使用的缓存网格，只保留最近使用的 keep 个供下次模拟复用"""
+        for key in list(self._names)[:max(0, len(self._names) - keep)]:
+            proxy = bpy.data.meshes.get(self._names.pop(key))
+            if proxy is not None and proxy.users == 0:
+                bpy.data.meshes.remove(proxy)
+
+    def clear(self):
+        """删除所有缓存的代理网格"""
+        self.release(keep=0)
+
+
+# 全局代理缓存
+_proxy_cache = CollisionProxyCache()
+
+
+def get_proxy_cache():
+    """获取全局碰撞代理缓存"""
+    return _proxy_cache
+
+
+# 全局碰撞形状分类器
+_shape_classifier = CollisionShapeClassifier()
+
+
+def get_shape_classifier():
+    """获取全局 AUTO 碰撞形状分类器"""
+    return _shape_classifier
+
+
+def resolve_collision_shape(obj, atprops):
+    """获取对象实际使用的碰撞形状，AUTO 时按网格几何自动选择"""
+    if atprops.physics_collision_shape != 'AUTO':
+        return atprops.physics_collision_shape
+    if obj.type != 'MESH':
+        return 'CONVEX_HULL'
+    return _shape_classifier.classify_object(obj, atprops.physics_auto_shape_tolerance)
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bpy
+import numpy as np
+from ..config.constants import PhysicsSettings
+from .physics_utils import SpatialGrid, world_bounds, write_world_matrices
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "physics_worker.py")
+
+
+def _find(parents, index):
+    """并查集查找，带路径压缩"""
+    root = index
+    while parents[root] != root:
+        root = parents[root]
+    while parents[index] != root:
+        parents[index], index = root, parents[index]
+    return root
+
+
+def _fall_volumes(objects, padding):
+    """主动对象的下落范围：包围盒在 XY 方向扩展 padding，向下延伸到无穷远"""
+    bounds_min, bounds_max = world_bounds(objects)
+    bounds_min = bounds_min - padding
+    bounds_max = bounds_max + padding
+    bounds_min[:, 2] = -np.inf
+    return bounds_min, bounds_max
+
+
+def cluster_islands(active_objects, colliders, padding):
+    """把下落范围互不重叠的主动对象分成独立的物理岛
+
+    返回 [(主动对象列表, 碰撞体列表), ...]，按主动对象数量从多到少排列。
+    同一个碰撞体（例如地面）可以属于多个岛，被动对象不会移动，不影响岛之间的独立性。
+    """
+    if not active_objects:
+        return []
+    volume_min, volume_max = _fall_volumes(active_objects, padding)
+
+    # 按下落范围的 XY 重叠合并主动对象
+    parents = list(range(len(active_objects)))
+    grid = SpatialGrid(volume_min, volume_max)
+    for index, (lo, hi) in enumerate(zip(volume_min, volume_max)):
+        candidates = grid.query(lo, hi)
+        candidates = candidates[candidates > index]
+        if len(candidates) == 0:
+            continue
+        hit = np.all(volume_min[candidates, :2] <= hi[:2], axis=1) & np.all(volume_max[candidates, :2] >= lo[:2], axis=1)
+        for other in candidates[hit].tolist():
+            parents[_find(parents, other)] = _find(parents, index)
+
+    groups = {}
+    for index in range(len(active_objects)):
+        groups.setdefault(_find(parents, index), []).append(index)
+
+    # 每个岛只带上与其下落范围相交的碰撞体
+    collider_min, collider_max = world_bounds(colliders)
+    collider_grid = SpatialGrid(collider_min, collider_max) if colliders else None
+    islands = []
+    for members in groups.values():
+        lo = volume_min[members].min(axis=0)
+        hi = volume_max[members].max(axis=0)
+        island_colliders = []
+        if collider_grid is not None:
+            indices = collider_grid.query(lo, hi)
+            hit = np.all(collider_min[indices] <= hi, axis=1) & np.all(collider_max[indices] >= lo, axis=1)
+            island_colliders = [colliders[i] for i in indices[hit].tolist()]
+        islands.append(([active_objects[i] for i in members], island_colliders))
+    islands.sort(key=lambda island: len(island[0]), reverse=True)
+    return islands
+
+
+def write_island_job(directory, index, island, settings):
+    """把一个岛的对象写入临时 .blend，并写出工作进程的 job 文件，返回 job 路径
+
+    settings["mesh_swaps"] 中的碰撞代理/预偏移网格一并写入，工作进程加载后替换对象的网格
+    """
+    active, passive = island
+    names = {obj.name for obj in active} | {obj.name for obj in passive}
+    mesh_swaps = {name: mesh for name, mesh in settings.get("mesh_swaps", {}).items() if name in names}
+    meshes = {bpy.data.meshes[mesh] for mesh in set(mesh_swaps.values()) if mesh in bpy.data.meshes}
+    library = os.path.join(directory, f"island_{index}.blend")
+    bpy.data.libraries.write(library, set(active) | set(passive) | meshes, path_remap='ABSOLUTE')
+
+    job = dict(settings)
+    job.update({
+        "library": library,
+        "output": os.path.join(directory, f"island_{index}.json"),
+        "active": [obj.name for obj in active],
+        "passive": [obj.name for obj in passive],
+        "mesh_swaps": mesh_swaps,
+        "prebaked": [name for name in settings.get("prebaked", ()) if name in names],
+    })
+    job_path = os.path.join(directory, f"island_{index}_job.json")
+    with open(job_path, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    return job_path
+
+
+class IslandSimulation:
+    """在后台 Blender 进程中并行模拟多个物理岛
+
+    start() 提交全部任务后立即返回，调用方用 done 轮询（例如模态操作符的定时器），
+    结束后调用 finish() 把结果写回主动对象；cancel() 终止仍在运行的工作进程。
+    """
+
+    def __init__(self, islands, settings, max_workers=0):
+        self.islands = islands
+        self.settings = settings
+        workers = max_workers or os.cpu_count() or 1
+        self.workers = max(1, min(workers, len(islands)))
+        self.directory = None
+        self.futures = []
+        self._pool = None
+        self._processes = []
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix="atools_islands_")
+        try:
+            job_paths = [write_island_job(self.directory, index, island, self.settings)
+                         for index, island in enumerate(self.islands)]
+        except Exception:
+            self._cleanup()
+            raise
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.futures = [self._pool.submit(self._run_worker, job_path) for job_path in job_paths]
+
+    @property
+    def finished_count(self):
+        return sum(1 for future in self.futures if future.done())
+
+    @property
+    def done(self):
+        return self.finished_count == len(self.futures)
+
+    def _run_worker(self, job_path):
+        """在后台 Blender 进程中模拟一个岛，返回结果字典"""
+        command = [bpy.app.binary_path, "-b", "--factory-startup", "--python", WORKER_SCRIPT, "--", job_path]
+        with self._lock:
+            if self._cancelled:
+                raise RuntimeError("已取消")
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            self._processes.append(process)
+        try:
+            _stdout, stderr = process.communicate(timeout=PhysicsSettings.WORKER_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise RuntimeError("工作进程超时")
+        with open(job_path, "r", encoding="utf-8") as f:
+            output = json.load(f)["output"]
+        if process.returncode != 0 or not os.path.exists(output):
+            raise RuntimeError(stderr.strip().splitlines()[-1] if stderr.strip() else "工作进程没有输出结果")
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def finish(self):
+        """把结果写回主动对象，返回 (更新的对象数量, 每个岛的模拟帧数列表, 失败信息列表)"""
+        try:
+            updated = 0
+            frames = []
+            failures = []
+            objects = bpy.data.objects
+            for index, future in enumerate(self.futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures.append(f"岛 {index}: {str(e)}")
+                    continue
+                names = list(result["matrices"])
+                targets = [objects.get(name) for name in names]
+                pairs = [(obj, result["matrices"][name]) for obj, name in zip(targets, names) if obj is not None]
+                if pairs:
+                    # 工作进程输出行主序矩阵，write_world_matrices 需要转置矩阵
+                    matrices = np.array([matrix for _obj, matrix in pairs], dtype=np.float64).reshape(-1, 4, 4)
+                    write_world_matrices([obj for obj, _matrix in pairs], matrices.transpose(0, 2, 1))
+                    updated += len(pairs)
+                frames.append(result["frames"])
+            return updated, frames, failures
+        finally:
+            self._cleanup()
+
+    def cancel(self):
+        """终止所有工作进程并删除临时文件"""
+        with self._lock:
+            self._cancelled = True
+            for process in self._processes:
+                if process.poll() is None:
+                    process.kill()
+        self._cleanup()
+
+    def _cleanup(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
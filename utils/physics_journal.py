@@ -0,0 +1,164 @@
+import json
+import bpy
+from .physics_utils import remove_rigid_bodies, remove_shrink_modifier
+
+# 物理模拟会话日志：记录模拟期间对场景做的每一处修改，
+# 保存在场景自定义属性中，拆除时只处理记录过的对象，崩溃后可从 .blend 中恢复
+JOURNAL_PROP = "at_physics_journal"
+
+# 模拟期间会被覆盖的场景设置（相对于 scene 的属性路径），当前版本没有的属性会被跳过
+SCENE_SETTINGS = (
+    "render.fps",
+    "frame_start",
+    "frame_end",
+    "frame_current",
+    "rigidbody_world.enabled",
+    "rigidbody_world.use_split_impulse",
+    "rigidbody_world.time_scale",
+    "rigidbody_world.solver_iterations",
+    "rigidbody_world.substeps_per_frame",
+    "rigidbody_world.steps_per_second",
+    "rigidbody_world.point_cache.frame_start",
+    "rigidbody_world.point_cache.frame_end",
+)
+
+
+def _resolve(scene, path):
+    """把属性路径解析为 (拥有者, 属性名)"""
+    owner = scene
+    *parents, attr = path.split(".")
+    for name in parents:
+        owner = getattr(owner, name)
+    return owner, attr
+
+
+class PhysicsJournal:
+    """物理模拟会话日志，每次修改后立即写回场景"""
+
+    def __init__(self, scene, data=None):
+        self.scene = scene
+        # rollback 时找不到的原始网格，调用方据此报告警告
+        self.missing_meshes = []
+        self.data = data or {
+            "settings": {},
+            "rigid_bodies": [],
+            "modifiers": [],
+            "mesh_swaps": [],
+            "deselected": [],
+        }
+
+    @staticmethod
+    def exists(scene):
+        """场景中是否存在未完成的会话日志"""
+        return scene is not None and JOURNAL_PROP in scene
+
+    @classmethod
+    def load(cls, scene):
+        """从场景读取会话日志，不存在或损坏时返回 None"""
+        if not cls.exists(scene):
+            return None
+        try:
+            return cls(scene, json.loads(scene[JOURNAL_PROP]))
+        except (TypeError, ValueError) as e:
+            print(f"ATools: 物理会话日志损坏: {str(e)}")
+            return None
+
+    def save(self):
+        self.scene[JOURNAL_PROP] = json.dumps(self.data)
+
+    def clear(self):
+        if JOURNAL_PROP in self.scene:
+            del self.scene[JOURNAL_PROP]
+
+    def record_settings(self):
+        """保存当前场景设置，只记录第一次的原始值"""
+        settings = self.data["settings"]
+        for path in SCENE_SETTINGS:
+            if path not in settings:
+                owner, attr = _resolve(self.scene, path)
+                if hasattr(owner, attr):
+                    settings[path] = getattr(owner, attr)
+        self.save()
+
+    def _record_names(self, key, objects):
+        names = self.data[key]
+        known = set(names)
+        for obj in objects:
+            if obj.name not in known:
+                names.append(obj.name)
+                known.add(obj.name)
+        self.save()
+
+    def record_rigid_bodies(self, objects):
+        """记录被添加了刚体的对象"""
+        self._record_names("rigid_bodies", objects)
+
+    def record_modifiers(self, objects):
+        """记录被添加了收缩修改器的对象"""
+        self._record_names("modifiers", objects)
+
+    def record_deselected(self, objects):
+        """记录被临时取消选择的对象"""
+        self._record_names("deselected", objects)
+
+    def record_mesh_swap(self, obj, mesh):
+        """记录对象原来的网格，模拟结束后换回
+
+        换出后原网格可能没有用户，会话期间保存或自动保存时会丢失，
+        因此临时加上伪用户，换回时再清除
+        """
+        hold = mesh.library is None and not mesh.use_fake_user
+        if hold:
+            mesh.use_fake_user = True
+        self.data["mesh_swaps"].append([obj.name, mesh.name, hold])
+        self.save()
+
+    @staticmethod
+    def _objects(names):
+        objects = bpy.data.objects
+        return [obj for obj in (objects.get(name) for name in names) if obj is not None]
+
+    def restore_settings(self):
+        for path, value in self.data["settings"].items():
+            try:
+                owner, attr = _resolve(self.scene, path)
+                setattr(owner, attr, value)
+            except (AttributeError, TypeError) as e:
+                print(f"ATools: 恢复场景设置失败 {path}: {str(e)}")
+
+    def rollback(self, context):
+        """按日志撤销模拟期间的所有修改，返回处理的对象数量"""
+        self.restore_settings()
+
+        rigid_bodies = self._objects(self.data["rigid_bodies"])
+        if rigid_bodies:
+            remove_rigid_bodies(context, rigid_bodies)
+
+        # 倒序恢复，同一对象多次替换（代理网格再预偏移）时最终换回最初的网格
+        self.missing_meshes = []
+        for obj_name, mesh_name, *hold in reversed(self.data["mesh_swaps"]):
+            obj = bpy.data.objects.get(obj_name)
+            mesh = bpy.data.meshes.get(mesh_name)
+            if mesh is None:
+                self.missing_meshes.append(f"{obj_name}: {mesh_name}")
+                print(f"ATools: 警告: 找不到对象 {obj_name} 的原始网格 {mesh_name}，对象仍在使用临时碰撞网格")
+                continue
+            if obj is not None:
+                obj.data = mesh
+            if hold and hold[0]:
+                mesh.use_fake_user = False
+
+        modifiers = self._objects(self.data["modifiers"])
+        for obj in modifiers:
+            remove_shrink_modifier(obj)
+
+        deselected = self._objects(self.data["deselected"])
+        for obj in deselected:
+            try:
+                obj.select_set(True)
+            except RuntimeError:
+                # 对象不在当前视图层中
+                pass
+
+        self.clear()
+        return len(set(rigid_bodies) | set(modifiers) | set(deselected))
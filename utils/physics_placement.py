@@ -0,0 +1,170 @@
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
+from ..config.constants import PhysicsSettings
+from .physics_geometry import mesh_geometry_hash, read_mesh_coords, read_mesh_triangles
+from .physics_utils import SpatialGrid, world_bounds
+
+# 模拟前的初始穿插修正：找出互相穿插的主动对象以及主动对象与碰撞体的穿插，
+# 把主动对象分开或抬高，避免 Bullet 在开始时爆炸式地解决接触
+
+
+class _TreeCache:
+    """按求值后网格的几何哈希和世界矩阵缓存世界空间的 BVH 树，碰撞体在多次模拟之间不变时直接复用
+
+    以几何哈希为键，编辑网格后不会误用旧数据，网格删除后指针被复用也不受影响
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._geometry = {}
+        self._trees = {}
+
+    def geometry(self, obj, depsgraph):
+        """对象求值后（含修改器和形状键）的局部坐标和三角形列表，返回 (几何哈希, (坐标, 三角形))"""
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            key = mesh_geometry_hash(mesh)
+            geometry = self._geometry.get(key)
+            if geometry is None:
+                if len(self._geometry) >= self.max_size:
+                    self._geometry.clear()
+                geometry = (read_mesh_coords(mesh).astype(np.float64), read_mesh_triangles(mesh).tolist())
+                self._geometry[key] = geometry
+        finally:
+            evaluated.to_mesh_clear()
+        return key, geometry
+
+    def tree(self, obj, depsgraph):
+        """碰撞体的世界空间 BVH 树"""
+        geometry_key, (coords, triangles) = self.geometry(obj, depsgraph)
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        key = (geometry_key, matrix.tobytes())
+        tree = self._trees.get(key)
+        if tree is None:
+            if len(self._trees) >= self.max_size:
+                self._trees.clear()
+            tree = BVHTree.FromPolygons((coords @ matrix[:3, :3].T + matrix[:3, 3]).tolist(), triangles, all_triangles=True)
+            self._trees[key] = tree
+        return tree
+
+    def clear(self):
+        self._geometry.clear()
+        self._trees.clear()
+
+
+_tree_cache = _TreeCache()
+
+
+def get_tree_cache():
+    return _tree_cache
+
+
+def _aabb_overlap(min_a, max_a, min_b, max_b):
+    return bool(np.all(min_a <= max_b) and np.all(max_a >= min_b))
+
+
+def resolve_initial_overlaps(active_objects, colliders, depsgraph, max_iterations=PhysicsSettings.PLACEMENT_MAX_ITERATIONS):
+    """分开初始互相穿插的对象，按 depsgraph 求值后的网格检测
+
+    主动对象之间按 KD 树找出相邻对象，用 BVHTree.overlap 精确检测，把位置较高的一方沿
+    中心连线（不向下）推开；与碰撞体穿插的主动对象逐步抬高。
+    返回 (修正过的对象名称对列表, 仍未分开的对象名称对列表)
+    """
+    active_objects = [obj for obj in active_objects if obj.type == 'MESH']
+    colliders = [obj for obj in colliders if obj.type == 'MESH']
+    if not active_objects:
+        return [], []
+
+    cache = get_tree_cache()
+    count = len(active_objects)
+    matrices = np.array([np.array(obj.matrix_world) for obj in active_objects], dtype=np.float64).reshape(-1, 4, 4)
+    geometry = [cache.geometry(obj, depsgraph)[1] for obj in active_objects]
+    local_bounds = [(coords.min(axis=0), coords.max(axis=0)) if len(coords) else (np.zeros(3), np.zeros(3))
+                    for coords, _triangles in geometry]
+
+    collider_min, collider_max = world_bounds(colliders)
+    collider_grid = SpatialGrid(collider_min, collider_max) if colliders else None
+
+    offsets = np.zeros((count, 3))
+    world_coords = [None] * count
+    trees = [None] * count
+    steps = np.empty(count)
+
+    def rebuild(index):
+        coords, triangles = geometry[index]
+        matrix = matrices[index]
+        world = coords @ matrix[:3, :3].T + matrix[:3, 3] + offsets[index]
+        world_coords[index] = world
+        trees[index] = BVHTree.FromPolygons(world.tolist(), triangles, all_triangles=True) if triangles else None
+
+    for index in range(count):
+        rebuild(index)
+        extent = (local_bounds[index][1] - local_bounds[index][0]) * np.linalg.norm(matrices[index][:3, :3], axis=0)
+        steps[index] = max(PhysicsSettings.PLACEMENT_MIN_STEP, float(extent.min()) * PhysicsSettings.PLACEMENT_STEP_FACTOR)
+
+    fixed = set()
+    overlapping = []
+    for _iteration in range(max_iterations):
+        bounds_min = np.array([world.min(axis=0) if len(world) else np.zeros(3) for world in world_coords])
+        bounds_max = np.array([world.max(axis=0) if len(world) else np.zeros(3) for world in world_coords])
+        centers = (bounds_min + bounds_max) * 0.5
+        radii = np.linalg.norm(bounds_max - bounds_min, axis=1) * 0.5
+
+        kd = KDTree(count)
+        for index, center in enumerate(centers.tolist()):
+            kd.insert(center, index)
+        kd.balance()
+
+        moves = np.zeros((count, 3))
+        overlapping = []
+        max_radius = float(radii.max())
+        for index in range(count):
+            if trees[index] is None:
+                continue
+            # 主动对象之间
+            for _co, other, distance in kd.find_range(centers[index].tolist(), radii[index] + max_radius):
+                if other <= index or trees[other] is None or distance > radii[index] + radii[other]:
+                    continue
+                if not _aabb_overlap(bounds_min[index], bounds_max[index], bounds_min[other], bounds_max[other]):
+                    continue
+                if not trees[index].overlap(trees[other]):
+                    continue
+                upper, lower = (other, index) if centers[other][2] >= centers[index][2] else (index, other)
+                direction = centers[upper] - centers[lower]
+                direction[2] = max(direction[2], 0.0)
+                length = np.linalg.norm(direction)
+                direction = direction / length if length > 1e-9 else np.array([0.0, 0.0, 1.0])
+                moves[upper] += direction * steps[upper]
+                overlapping.append((active_objects[index].name, active_objects[other].name))
+
+            # 主动对象与碰撞体
+            if collider_grid is None:
+                continue
+            for collider_index in collider_grid.query(bounds_min[index], bounds_max[index]).tolist():
+                if not _aabb_overlap(bounds_min[index], bounds_max[index], collider_min[collider_index], collider_max[collider_index]):
+                    continue
+                collider = colliders[collider_index]
+                if trees[index].overlap(cache.tree(collider, depsgraph)):
+                    moves[index][2] += steps[index]
+                    overlapping.append((active_objects[index].name, collider.name))
+
+        if not overlapping:
+            break
+        fixed.update(overlapping)
+        moved = np.nonzero(np.any(moves != 0.0, axis=1))[0]
+        offsets[moved] += moves[moved]
+        for index in moved.tolist():
+            rebuild(index)
+
+    # 写回移动过的对象
+    for index in np.nonzero(np.any(offsets != 0.0, axis=1))[0].tolist():
+        obj = active_objects[index]
+        matrix = obj.matrix_world.copy()
+        matrix.translation = matrix.translation + Vector(offsets[index].tolist())
+        obj.matrix_world = matrix
+
+    unresolved = sorted(set(overlapping))
+    return sorted(fixed.difference(unresolved)), unresolved
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import time
+import bpy
+import numpy as np
+from ..config.config_manager import get_config, get_config_dir
+from .physics_geometry import mesh_geometry_hash
+from .physics_takes import decode_matrices, encode_matrices
+
+# 物理模拟结果缓存：按全部输入计算哈希，把最终世界矩阵保存在配置目录中，
+# 撤销或重新打开文件后再次模拟相同输入时直接应用结果
+CACHE_DIR = "physics_cache"
+INDEX_FILE = "index.json"
+DEFAULT_MAX_MB = 256
+
+
+def _update_object(digest, obj, geometry_hashes):
+    mesh = obj.data
+    key = mesh.as_pointer()
+    if key not in geometry_hashes:
+        geometry_hashes[key] = mesh_geometry_hash(mesh)
+    digest.update(obj.name.encode('utf-8'))
+    digest.update(geometry_hashes[key].encode('ascii'))
+    digest.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+
+
+def compute_input_hash(active_objects, colliders, settings):
+    """根据主动对象和碰撞体的几何、变换以及模拟设置计算缓存键"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(bpy.app.version_string.encode('ascii'))
+    digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    geometry_hashes = {}
+    digest.update(b"active")
+    for obj in sorted(active_objects, key=lambda o: o.name):
+        _update_object(digest, obj, geometry_hashes)
+    digest.update(b"colliders")
+    for obj in sorted(colliders, key=lambda o: o.name):
+        _update_object(digest, obj, geometry_hashes)
+    return digest.hexdigest()
+
+
+class PhysicsResultCache:
+    """磁盘上的模拟结果缓存，总大小超过上限时淘汰最久未使用的条目"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._index = None
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = get_config_dir(CACHE_DIR)
+        return self._directory
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(get_config('physics.result_cache_max_mb', DEFAULT_MAX_MB) * 1024 * 1024)
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            with open(self._index_path(), 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+        except OSError as e:
+            print(f"ATools: 保存模拟缓存索引失败: {str(e)}")
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self._load_index().values())
+
+    def lookup(self, key):
+        """返回 (对象名称列表, 转置矩阵数组, 元数据)，未命中返回 None"""
+        index = self._load_index()
+        if key not in index:
+            return None
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            index.pop(key, None)
+            self._save_index()
+            return None
+        index[key]["last_used"] = time.time()
+        self._save_index()
+        return entry["objects"], decode_matrices(entry["matrices"]), entry.get("meta", {})
+
+    def store(self, key, objects, matrices, meta=None):
+        """保存一次模拟结果并按 LRU 淘汰超出大小上限的条目"""
+        entry = {"objects": [obj.name for obj in objects], "matrices": encode_matrices(matrices), "meta": meta or {}}
+        path = self._entry_path(key)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+        except OSError as e:
+            print(f"ATools: 保存模拟缓存失败: {str(e)}")
+            return
+        index = self._load_index()
+        index[key] = {"size": os.path.getsize(path), "last_used": time.time()}
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        index = self._load_index()
+        total = self.total_size()
+        limit = self.max_bytes
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total <= limit:
+                break
+            total -= index.pop(key)["size"]
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """删除所有缓存条目，返回删除的数量"""
+        index = self._load_index()
+        count = len(index)
+        for key in list(index):
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+        index.clear()
+        self._save_index()
+        return count
+
+
+_result_cache = PhysicsResultCache()
+
+
+def get_result_cache():
+    """获取全局模拟结果缓存"""
+    return _result_cache
@@ -0,0 +1,166 @@
+import json
+import os
+import time
+import bpy
+import numpy as np
+from ..config.config_manager import get_config_dir
+
+# 物理模拟运行统计：逐帧耗时、活动/静止刚体数量、碰撞体数量，用于面板 ETA 和运行日志
+LOG_DIR = "physics_logs"
+# 只保留最近的若干个运行日志
+LOG_KEEP = 50
+ETA_WINDOW = 30
+
+
+def _prune_logs(directory, keep=LOG_KEEP):
+    """按修改时间删除最旧的运行日志"""
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.startswith("physics_") and name.endswith(".json")]
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:max(0, len(paths) - keep)]:
+        os.remove(path)
+
+
+class PhysicsRunStats:
+    """一次物理模拟的运行统计"""
+
+    def __init__(self, mode, object_count, collider_count, max_frames, culled_count=0, work_per_frame=None,
+                 expected_frames=None):
+        self.mode = mode
+        self.object_count = object_count
+        self.collider_count = collider_count
+        self.culled_count = culled_count
+        self.max_frames = max_frames
+        # 静止检测提前结束时预计的模拟帧数，ETA 以此为终点而不是 max_frames
+        self.expected_frames = min(expected_frames, max_frames) if expected_frames else max_frames
+        # 每帧的相对计算量，用于按上一次运行的帧耗时估算自动调参后的耗时
+        self.work_per_frame = work_per_frame
+        self.created = time.time()
+        self.setup_seconds = 0.0
+        self.sim_seconds = 0.0
+        self.frame_times = []
+        self.awake_samples = []
+        self.awake_count = object_count
+        self.frame = 0
+        self.stop_reason = None
+        self.log_path = None
+        self._start = time.perf_counter()
+        self._last_time = None
+        self._last_frame = 0
+
+    def start(self):
+        """搭建完成，开始计时模拟"""
+        now = time.perf_counter()
+        self.setup_seconds = now - self._start
+        self._last_time = now
+
+    def record(self, frame, awake_count=None):
+        """记录到达 frame 时的耗时，同一帧重复调用会被忽略，返回是否记录了新帧"""
+        if self._last_time is None or frame <= self._last_frame:
+            return False
+        now = time.perf_counter()
+        # 播放时可能跳帧，平均分摊到每一帧
+        steps = frame - self._last_frame
+        self.frame_times.extend([(now - self._last_time) / steps] * steps)
+        self.sim_seconds += now - self._last_time
+        self._last_time, self._last_frame = now, frame
+        self.frame = frame
+        if awake_count is not None and awake_count != self.awake_count:
+            self.awake_count = awake_count
+            self.awake_samples.append((frame, awake_count))
+        return True
+
+    @property
+    def sleeping_count(self):
+        return self.object_count - self.awake_count
+
+    def eta(self):
+        """按最近的平均帧耗时估算到预计结束帧的剩余秒数
+
+        超过预计帧数仍未静止时无法估算，返回 None
+        """
+        if not self.frame_times:
+            return None
+        remaining = self.expected_frames - self.frame
+        if remaining < 0 or (remaining == 0 and self.expected_frames < self.max_frames):
+            return None
+        recent = self.frame_times[-ETA_WINDOW:]
+        return sum(recent) / len(recent) * remaining
+
+    def finish(self, settled):
+        """结束统计并记录停止原因"""
+        if settled:
+            self.stop_reason = "REST"
+        elif self.frame >= self.max_frames:
+            self.stop_reason = "FRAME_LIMIT"
+        else:
+            self.stop_reason = "CANCELLED"
+
+    def summary(self):
+        times = np.asarray(self.frame_times, dtype=np.float64) * 1000.0
+        return {
+            "mode": self.mode,
+            "stop_reason": self.stop_reason,
+            "frames": self.frame,
+            "max_frames": self.max_frames,
+            "objects": self.object_count,
+            "colliders": self.collider_count,
+            "culled_colliders": self.culled_count,
+            "work_per_frame": self.work_per_frame,
+            "awake": self.awake_count,
+            "sleeping": self.sleeping_count,
+            "setup_seconds": round(self.setup_seconds, 4),
+            "sim_seconds": round(self.sim_seconds, 4),
+            "frame_ms_mean": round(float(times.mean()), 3) if len(times) else 0.0,
+            "frame_ms_p95": round(float(np.percentile(times, 95)), 3) if len(times) else 0.0,
+            "frame_ms_max": round(float(times.max()), 3) if len(times) else 0.0,
+        }
+
+    def write_log(self, settings=None):
+        """把统计写入配置目录下的 JSON 运行日志，返回文件路径"""
+        log = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+            "blend_file": bpy.data.filepath,
+            "summary": self.summary(),
+            "settings": settings or {},
+            "frame_ms": [round(t * 1000.0, 3) for t in self.frame_times],
+            "awake_samples": self.awake_samples,
+        }
+        name = time.strftime("physics_%Y%m%d_%H%M%S", time.localtime(self.created))
+        try:
+            # 配置目录不可写时同样只打印警告，不能中断会话的清理
+            directory = get_config_dir(LOG_DIR)
+            path = os.path.join(directory, f"{name}_{self.mode.lower()}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(log, f, indent=2, ensure_ascii=False)
+            self.log_path = path
+            _prune_logs(directory)
+        except OSError as e:
+            print(f"ATools: 写入物理运行日志失败: {str(e)}")
+        return self.log_path
+
+
+# 当前运行和上一次运行的统计，供面板显示
+_current_run = None
+_last_run = None
+
+
+def begin_run(stats):
+    global _current_run
+    _current_run = stats
+    return stats
+
+
+def end_run(stats):
+    global _current_run, _last_run
+    if _current_run is stats:
+        _current_run = None
+    _last_run = stats
+
+
+def get_current_run():
+    return _current_run
+
+
+def get_last_run():
+    return _last_run
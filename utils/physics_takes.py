@@ -0,0 +1,111 @@
+import base64
+import json
+import bpy
+import numpy as np
+from .physics_utils import write_world_matrices
+
+# 物理模拟多次尝试（take）：每次只保存最终姿态的 float32 矩阵数组，
+# 以 JSON + base64 存在场景自定义属性中，切换时直接写回矩阵，无需重新模拟
+TAKES_PROP = "at_physics_takes"
+# 单独保存数量，面板绘制时无需解析整个 JSON
+TAKE_COUNT_PROP = "at_physics_take_count"
+
+
+def encode_matrices(matrices):
+    """(N, 4, 4) 矩阵 -> base64 编码的 float32 字节"""
+    return base64.b64encode(np.ascontiguousarray(matrices, dtype=np.float32).tobytes()).decode('ascii')
+
+
+def decode_matrices(text):
+    return np.frombuffer(base64.b64decode(text), dtype=np.float32).reshape(-1, 4, 4)
+
+
+def jitter_matrices(matrices, seed, location_jitter, rotation_jitter):
+    """按种子随机扰动初始姿态：世界空间平移 + 绕对象原点的小角度旋转
+
+    matrices 为 read_world_matrices 返回的转置矩阵，返回同样格式
+    """
+    rng = np.random.default_rng(seed)
+    count = len(matrices)
+    rows = np.asarray(matrices, dtype=np.float64).transpose(0, 2, 1).copy()
+
+    angles = rng.uniform(-rotation_jitter, rotation_jitter, size=(count, 3))
+    cx, cy, cz = np.cos(angles).T
+    sx, sy, sz = np.sin(angles).T
+    zeros, ones = np.zeros(count), np.ones(count)
+    rx = np.stack((ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx), axis=1).reshape(-1, 3, 3)
+    ry = np.stack((cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy), axis=1).reshape(-1, 3, 3)
+    rz = np.stack((cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones), axis=1).reshape(-1, 3, 3)
+    local = rz @ ry @ rx
+
+    # 旋转左乘到带缩放的基向量上，非均匀缩放的对象不会产生切变
+    rows[:, :3, :3] = local @ rows[:, :3, :3]
+    rows[:, :3, 3] += rng.uniform(-location_jitter, location_jitter, size=(count, 3))
+    return rows.transpose(0, 2, 1)
+
+
+class PhysicsTakes:
+    """场景中保存的模拟结果集合，包含初始姿态和每次尝试的最终姿态"""
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.data = {"initial": None, "takes": []}
+        if TAKES_PROP in scene:
+            try:
+                self.data = json.loads(scene[TAKES_PROP])
+            except (TypeError, ValueError) as e:
+                print(f"ATools: 物理模拟结果数据损坏: {str(e)}")
+
+    @staticmethod
+    def exists(scene):
+        return scene is not None and TAKES_PROP in scene
+
+    @staticmethod
+    def count(scene):
+        return scene.get(TAKE_COUNT_PROP, 0) if PhysicsTakes.exists(scene) else 0
+
+    @property
+    def takes(self):
+        return self.data["takes"]
+
+    def save(self):
+        self.scene[TAKES_PROP] = json.dumps(self.data)
+        self.scene[TAKE_COUNT_PROP] = len(self.data["takes"])
+
+    def clear(self):
+        self.data = {"initial": None, "takes": []}
+        for prop in (TAKES_PROP, TAKE_COUNT_PROP):
+            if prop in self.scene:
+                del self.scene[prop]
+
+    @staticmethod
+    def _pose(objects, matrices):
+        return {"objects": [obj.name for obj in objects], "matrices": encode_matrices(matrices)}
+
+    def set_initial(self, objects, matrices):
+        """记录模拟前的姿态，可随时恢复"""
+        self.data["initial"] = self._pose(objects, matrices)
+        self.save()
+
+    def add_take(self, objects, matrices, seed, frames):
+        take = self._pose(objects, matrices)
+        take.update({"seed": int(seed), "frames": int(frames)})
+        self.data["takes"].append(take)
+        self.save()
+        return len(self.data["takes"]) - 1
+
+    @staticmethod
+    def _apply_pose(pose):
+        objects = [bpy.data.objects.get(name) for name in pose["objects"]]
+        matrices = decode_matrices(pose["matrices"])
+        found = [index for index, obj in enumerate(objects) if obj is not None]
+        write_world_matrices([objects[index] for index in found], matrices[found])
+        return len(found)
+
+    def apply_take(self, index):
+        """把第 index 次尝试的最终姿态写回对象，index 为 -1 时恢复初始姿态"""
+        if index < 0:
+            if self.data["initial"] is None:
+                return 0
+            return self._apply_pose(self.data["initial"])
+        return self._apply_pose(self.data["takes"][index])
@@ -0,0 +1,123 @@
+import math
+import numpy as np
+from ..config.constants import PhysicsSettings
+from .physics_utils import world_bounds
+
+# 根据场景尺度自动选择子步数、求解迭代次数和时间缩放：
+# 子步内的最大位移不能超过最小物体尺寸的一定比例（防止穿透），
+# 在满足这一稳定性条件的组合中选择总计算量最小的一个
+
+
+def scene_gravity(scene):
+    """刚体世界实际使用的重力加速度大小"""
+    if not scene.use_gravity:
+        return 0.0
+    weight = scene.rigidbody_world.effector_weights.gravity if scene.rigidbody_world else 1.0
+    return scene.gravity.length * weight
+
+
+def get_substeps(world, fps=PhysicsSettings.DEFAULT_FPS):
+    """刚体世界每帧的子步数，2.91 之前只有 steps_per_second"""
+    if hasattr(world, 'substeps_per_frame'):
+        return world.substeps_per_frame
+    return max(1, round(world.steps_per_second / fps))
+
+
+def set_substeps(world, substeps, fps=PhysicsSettings.DEFAULT_FPS):
+    if hasattr(world, 'substeps_per_frame'):
+        world.substeps_per_frame = substeps
+    else:
+        world.steps_per_second = substeps * fps
+
+
+def frame_work(body_count, substeps, iterations):
+    """每帧的相对计算量：子步 × 迭代次数，加上每帧固定的求值开销"""
+    return body_count * (substeps * iterations + PhysicsSettings.TUNE_FRAME_OVERHEAD)
+
+
+def measure_scene(active_objects, colliders):
+    """读取主动对象的最小/最大尺寸和下落高度"""
+    active_min, active_max = world_bounds(active_objects)
+    dimensions = active_max - active_min
+    smallest = dimensions.min(axis=1)
+    largest = dimensions.max(axis=1)
+
+    if colliders:
+        collider_min, collider_max = world_bounds(colliders)
+        # 落点取主动对象下方最低的碰撞体顶面
+        below = collider_max[:, 2][collider_max[:, 2] <= active_min[:, 2].max()]
+        floor = float(below.min()) if len(below) else float(collider_max[:, 2].min())
+    else:
+        floor = float(active_min[:, 2].min())
+    return {
+        "min_dimension": max(float(smallest.min()), PhysicsSettings.MIN_GRID_CELL_SIZE),
+        "max_dimension": max(float(largest.max()), PhysicsSettings.MIN_GRID_CELL_SIZE),
+        "fall_height": max(float(active_min[:, 2].max()) - floor, 0.0),
+        "body_count": len(active_objects),
+    }
+
+
+def tune_simulation(measurements, gravity, fps=PhysicsSettings.DEFAULT_FPS):
+    """选择计算量最小且满足稳定性条件的 (子步数, 迭代次数, 时间缩放)
+
+    返回包含 substeps / iterations / time_scale / frames / cost 的字典
+    """
+    gravity = max(gravity, 1e-3)
+    min_dimension = measurements["min_dimension"]
+    fall_height = measurements["fall_height"]
+    body_count = max(1, measurements["body_count"])
+
+    # 落地速度，加上少量余量处理反弹和堆叠时的相互碰撞
+    impact_speed = math.sqrt(2.0 * gravity * fall_height) + math.sqrt(gravity * min_dimension)
+    settle_seconds = math.sqrt(2.0 * fall_height / gravity) + PhysicsSettings.TUNE_SETTLE_SECONDS
+    max_step = min_dimension * PhysicsSettings.TUNE_STABILITY_FRACTION
+
+    # 尺寸差异越大质量比越大，接触求解需要更多迭代
+    mass_ratio = (measurements["max_dimension"] / min_dimension) ** 3
+    iterations = int(np.clip(
+        round(PhysicsSettings.DEFAULT_SOLVER_ITERATIONS * (1.0 + math.log10(max(1.0, mass_ratio)) * 0.5)),
+        PhysicsSettings.TUNE_MIN_ITERATIONS, PhysicsSettings.TUNE_MAX_ITERATIONS))
+
+    best = None
+    for time_scale in PhysicsSettings.TUNE_TIME_SCALES:
+        # 每个子步模拟的时间为 time_scale / (fps * substeps)
+        substeps = math.ceil(impact_speed * time_scale / (fps * max_step))
+        if substeps > PhysicsSettings.TUNE_MAX_SUBSTEPS:
+            continue
+        substeps = max(1, substeps)
+        frames = math.ceil(settle_seconds * fps / time_scale)
+        cost = frames * frame_work(body_count, substeps, iterations)
+        if best is None or cost < best["cost"]:
+            best = {"substeps": substeps, "iterations": iterations, "time_scale": time_scale,
+                    "frames": frames, "cost": cost}
+
+    if best is None:
+        # 物体太小或下落太高，用最小时间缩放和最大子步数
+        time_scale = min(PhysicsSettings.TUNE_TIME_SCALES)
+        frames = math.ceil(settle_seconds * fps / time_scale)
+        substeps = PhysicsSettings.TUNE_MAX_SUBSTEPS
+        best = {"substeps": substeps, "iterations": iterations, "time_scale": time_scale,
+                "frames": frames, "cost": frames * frame_work(body_count, substeps, iterations)}
+    return best
+
+
+def estimate_seconds(cost, last_run):
+    """用上一次运行的每帧耗时换算预计秒数，没有可用数据时返回 None"""
+    if last_run is None or not last_run.work_per_frame or not last_run.frame_times:
+        return None
+    seconds_per_unit = (sum(last_run.frame_times) / len(last_run.frame_times)) / last_run.work_per_frame
+    return cost * seconds_per_unit
+
+
+# 最近一次的调参结果，供面板在运行前显示
+_last_estimate = None
+
+
+def set_last_estimate(tuning):
+    global _last_estimate
+    _last_estimate = tuning
+    return tuning
+
+
+def get_last_estimate():
+    return _last_estimate
@@ -0,0 +1,279 @@
+import bpy
+import numpy as np
+from mathutils import Matrix
+from ..config.constants import PhysicsSettings
+from .physics_geometry import resolve_collision_shape
+
+
+SHRINK_MODIFIER = "AT_Physics_Shrink"
+
+
+def add_shrink_modifier(obj, strength):
+    """添加或更新收缩/膨胀修改器"""
+    mod = obj.modifiers.get(SHRINK_MODIFIER)
+    if not mod:
+        mod = obj.modifiers.new(name=SHRINK_MODIFIER, type='DISPLACE')
+    
+    mod.strength = strength
+    mod.mid_level = 0.0  # 确保从表面开始偏移
+    # 确保修改器在最上层（或合适位置），通常物理计算取最终结果，所以只要开启即可
+    # 为了确保效果，可以考虑移到最前？但通常保持默认添加顺序即可，除非有Subsurf
+    return mod
+
+
+def remove_shrink_modifier(obj):
+    """移除收缩/膨胀修改器"""
+    mod = obj.modifiers.get(SHRINK_MODIFIER)
+    if mod:
+        obj.modifiers.remove(mod)
+
+
+def shrink_strength(atprops):
+    """收缩/膨胀偏移量 = 目标边距 - 刚体安全边距"""
+    return atprops.physics_collision_margin - PhysicsSettings.SAFETY_MARGIN
+
+
+def configure_rigid_body(obj, atprops, body_type, use_shrink_modifier=True):
+    """按面板设置配置对象的刚体属性
+
+    use_shrink_modifier 为 False 时调用方已换入预偏移网格，不再添加修改器
+    """
+    rigid_body = obj.rigid_body
+    rigid_body.type = body_type
+    rigid_body.friction = atprops.physics_friction
+    rigid_body.use_margin = True
+    
+    # 使用 Displace 修改器来处理 Margin (收缩/膨胀)
+    # 为了保证物理计算稳定性（特别是Mesh形状），刚体自身保留一个微小的安全边距，
+    # 修改器偏移 = 目标边距 - 安全边距，最终碰撞面 = 目标边距
+    if use_shrink_modifier:
+        add_shrink_modifier(obj, shrink_strength(atprops))
+    rigid_body.collision_margin = PhysicsSettings.SAFETY_MARGIN
+    
+    rigid_body.restitution = atprops.physics_restitution
+    rigid_body.collision_shape = resolve_collision_shape(obj, atprops)
+
+
+def _selection_override(context, objects):
+    """构造以 objects 为选中对象的上下文覆盖"""
+    return context.temp_override(
+        selected_objects=objects,
+        selected_editable_objects=objects,
+        active_object=objects[0],
+        object=objects[0]
+    )
+
+
+def add_rigid_bodies(context, objects, body_type):
+    """一次 rigidbody.objects_add 为多个对象添加刚体，返回新添加刚体的对象"""
+    objects = [obj for obj in objects if obj.rigid_body is None]
+    if objects:
+        with _selection_override(context, objects):
+            bpy.ops.rigidbody.objects_add(type=body_type)
+    return objects
+
+
+def remove_rigid_bodies(context, objects):
+    """一次 rigidbody.objects_remove 移除多个对象的刚体"""
+    objects = [obj for obj in objects if obj.rigid_body is not None]
+    if objects:
+        with _selection_override(context, objects):
+            bpy.ops.rigidbody.objects_remove()
+    return objects
+
+
+def read_world_matrices(objects, indices=None):
+    """批量读取对象的 matrix_world，返回 (N, 4, 4) 的转置矩阵（列主序）
+
+    indices 为对象在 bpy.data.objects 中的索引，提供时使用一次 foreach_get 读取
+    """
+    if indices is None:
+        return np.array([np.array(obj.matrix_world).T for obj in objects], dtype=np.float32).reshape(-1, 4, 4)
+    all_objects = bpy.data.objects
+    buffer = np.empty(len(all_objects) * 16, dtype=np.float32)
+    all_objects.foreach_get("matrix_world", buffer)
+    return buffer.reshape(-1, 4, 4)[indices]
+
+
+def write_world_matrices(objects, matrices):
+    """把 read_world_matrices 读取的转置矩阵写回对象的 matrix_world"""
+    for obj, matrix in zip(objects, matrices.transpose(0, 2, 1).tolist()):
+        obj.matrix_world = Matrix(matrix)
+
+
+def data_object_indices(objects):
+    """获取对象在 bpy.data.objects 中的索引"""
+    lookup = {obj.session_uid: index for index, obj in enumerate(bpy.data.objects)}
+    return np.array([lookup[obj.session_uid] for obj in objects], dtype=np.int64)
+
+
+class WorldMatrixReader:
+    """反复读取同一组对象的 matrix_world，供逐帧采样使用
+
+    对象占文件中对象的比例较高时用一次 foreach_get 读取全部对象再按索引取出，否则逐个读取。
+    缓存的索引每次都用 session_uid 校验，模拟期间新增、删除或重命名对象
+    改变了 bpy.data.objects 的顺序时自动重建。
+    """
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+        self._uids = np.array([obj.session_uid for obj in self.objects], dtype=np.int32)
+        self._indices = None
+
+    def _bulk_uids(self, all_objects):
+        uids = np.empty(len(all_objects), dtype=np.int32)
+        all_objects.foreach_get("session_uid", uids)
+        return uids
+
+    def read(self):
+        """返回 (N, 4, 4) 的转置矩阵，格式与 read_world_matrices 相同"""
+        all_objects = bpy.data.objects
+        if len(all_objects) > len(self.objects) * PhysicsSettings.BULK_MATRIX_READ_RATIO:
+            return read_world_matrices(self.objects)
+        if self._indices is None or self._indices.max(initial=-1) >= len(all_objects) \
+                or not np.array_equal(self._bulk_uids(all_objects)[self._indices], self._uids):
+            self._indices = data_object_indices(self.objects)
+        return read_world_matrices(self.objects, self._indices)
+
+
+def matrix_motion(previous, current):
+    """计算两组转置矩阵之间的位移和旋转角度
+
+    返回 (linear, angular)，分别为 (N,) 的位移长度和旋转弧度
+    """
+    linear = np.linalg.norm(current[:, 3, :3] - previous[:, 3, :3], axis=1)
+
+    def rotation(matrices):
+        basis = matrices[:, :3, :3]
+        lengths = np.linalg.norm(basis, axis=2)
+        lengths[lengths == 0.0] = 1.0
+        return basis / lengths[:, :, None]
+
+    # trace(R_prev^T R_cur) 等于两个旋转矩阵逐元素乘积之和，与转置无关
+    trace = np.einsum('nij,nij->n', rotation(previous), rotation(current))
+    angular = np.arccos(np.clip((trace - 1.0) * 0.5, -1.0, 1.0))
+    return linear, angular
+
+
+class RestDetector:
+    """刚体静止检测
+
+    每隔 interval 帧采样一次主动对象的 matrix_world，按帧数换算出线速度和角速度，
+    连续多次全部低于阈值即认为模拟已经收敛。
+    """
+
+    def __init__(self, objects, linear_threshold, angular_threshold, interval,
+                 required_checks=PhysicsSettings.REST_REQUIRED_CHECKS):
+        self.objects = list(objects)
+        self.linear_threshold = linear_threshold
+        self.angular_threshold = angular_threshold
+        self.interval = max(1, int(interval))
+        self.required_checks = required_checks
+        self._reader = WorldMatrixReader(self.objects)
+        self._previous = None
+        self._previous_frame = 0
+        self._next_frame = 0
+        self._calm_checks = 0
+        self.moving_count = len(self.objects)
+
+    def update(self, frame):
+        """在当前帧检查是否静止，返回 True 表示全部对象已静止"""
+        if frame < self._next_frame or not self.objects:
+            return False
+        current = self._reader.read()
+        previous, previous_frame = self._previous, self._previous_frame
+        self._previous, self._previous_frame = current, frame
+        self._next_frame = frame + self.interval
+        if previous is None or frame <= previous_frame:
+            return False
+
+        elapsed = frame - previous_frame
+        linear, angular = matrix_motion(previous, current)
+        moving = (linear / elapsed > self.linear_threshold) | (angular / elapsed > self.angular_threshold)
+        self.moving_count = int(np.count_nonzero(moving))
+
+        if self.moving_count == 0:
+            self._calm_checks += 1
+        else:
+            self._calm_checks = 0
+        return self._calm_checks >= self.required_checks
+
+
+def world_bounds(objects):
+    """批量计算对象的世界空间轴对齐包围盒，返回 (min, max)，均为 (N, 3)"""
+    if not objects:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    corners = np.array([obj.bound_box for obj in objects], dtype=np.float64).reshape(-1, 8, 3)
+    matrices = np.array([obj.matrix_world for obj in objects], dtype=np.float64).reshape(-1, 4, 4)
+    world = np.einsum('nij,nkj->nki', matrices[:, :3, :3], corners) + matrices[:, None, :3, 3]
+    return world.min(axis=1), world.max(axis=1)
+
+
+class SpatialGrid:
+    """XY 平面上的均匀网格，按包围盒索引对象
+
+    跨越过多单元的大对象（例如地面）单独存放，每次查询都会返回。
+    """
+
+    def __init__(self, bounds_min, bounds_max, cell_size=None):
+        self.bounds_min = np.asarray(bounds_min, dtype=np.float64)
+        self.bounds_max = np.asarray(bounds_max, dtype=np.float64)
+        if cell_size is None:
+            extents = (self.bounds_max - self.bounds_min)[:, :2]
+            cell_size = float(np.median(extents.max(axis=1))) if len(extents) else 1.0
+        self.cell_size = max(cell_size, PhysicsSettings.MIN_GRID_CELL_SIZE)
+        self._cells = {}
+        self._large = []
+
+        cell_min = np.floor(self.bounds_min[:, :2] / self.cell_size).astype(np.int64)
+        cell_max = np.floor(self.bounds_max[:, :2] / self.cell_size).astype(np.int64)
+        spans = np.prod(cell_max - cell_min + 1, axis=1)
+        for index, (lo, hi, span) in enumerate(zip(cell_min.tolist(), cell_max.tolist(), spans.tolist())):
+            if span > PhysicsSettings.MAX_GRID_CELLS_PER_OBJECT:
+                self._large.append(index)
+                continue
+            for ix in range(lo[0], hi[0] + 1):
+                for iy in range(lo[1], hi[1] + 1):
+                    self._cells.setdefault((ix, iy), []).append(index)
+
+    def query(self, query_min, query_max):
+        """返回 XY 包围盒可能相交的对象索引"""
+        lo = np.floor(np.asarray(query_min[:2]) / self.cell_size).astype(np.int64)
+        hi = np.floor(np.asarray(query_max[:2]) / self.cell_size).astype(np.int64)
+        if np.prod(hi - lo + 1) > len(self._cells):
+            # 查询范围比网格还大，直接遍历已占用的单元
+            keys = [key for key in self._cells if lo[0] <= key[0] <= hi[0] and lo[1] <= key[1] <= hi[1]]
+        else:
+            keys = [(ix, iy) for ix in range(lo[0], hi[0] + 1) for iy in range(lo[1], hi[1] + 1)]
+        found = list(self._large)
+        for key in keys:
+            found.extend(self._cells.get(key, ()))
+        return np.unique(np.asarray(found, dtype=np.int64))
+
+
+def cull_passive_candidates(active_objects, candidates, padding):
+    """只保留包围盒与主动对象下落范围相交的被动碰撞体
+
+    下落范围为主动对象包围盒在 XY 方向扩展 padding、向下延伸到无穷远。
+    返回 (保留的对象列表, 跳过的数量)
+    """
+    if not candidates or not active_objects:
+        return list(candidates), 0
+
+    candidate_min, candidate_max = world_bounds(candidates)
+    active_min, active_max = world_bounds(active_objects)
+    volume_min = active_min - padding
+    volume_max = active_max + padding
+    volume_min[:, 2] = -np.inf
+
+    grid = SpatialGrid(candidate_min, candidate_max)
+    keep = np.zeros(len(candidates), dtype=bool)
+    for lo, hi in zip(volume_min, volume_max):
+        indices = grid.query(lo, hi)
+        if len(indices) == 0:
+            continue
+        hit = np.all(candidate_min[indices] <= hi, axis=1) & np.all(candidate_max[indices] >= lo, axis=1)
+        keep[indices[hit]] = True
+
+    kept = [obj for obj, flag in zip(candidates, keep.tolist()) if flag]
+    return kept, len(candidates) - len(kept)
@@ -0,0 +1,162 @@
+# ATools 物理模拟工作进程
+#
+# 独立脚本，不依赖插件本身，由主进程以后台模式启动：
+#   blender -b --factory-startup --python physics_worker.py -- job.json
+#
+# job.json 描述一个物理岛：包含对象的临时 .blend、主动/被动对象名称和模拟设置，
+# 以及主进程生成的碰撞代理/预偏移网格（mesh_swaps）。
+# 模拟结束后把主动对象的 matrix_world（行主序 16 个浮点数）写入 job["output"]。
+import json
+import sys
+import bpy
+import numpy as np
+
+
+def load_job():
+    argv = sys.argv
+    if "--" not in argv:
+        raise SystemExit("physics_worker: 缺少 job 文件参数")
+    with open(argv[argv.index("--") + 1], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def clear_scene():
+    """删除启动文件中的默认对象"""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+
+
+def load_objects(job, scene):
+    """从岛文件追加对象并换入 mesh_swaps 中的网格，返回 {原名称: 对象}"""
+    wanted = set(job["active"]) | set(job["passive"])
+    wanted_meshes = set(job["mesh_swaps"].values())
+    with bpy.data.libraries.load(job["library"], link=False) as (data_from, data_to):
+        data_to.objects = [name for name in data_from.objects if name in wanted]
+        data_to.meshes = [name for name in data_from.meshes if name in wanted_meshes]
+        requested = list(data_to.objects)
+        requested_meshes = list(data_to.meshes)
+    # 加载后 data_to 中的名称按请求顺序替换为数据块，追加时可能被重命名
+    meshes = {name: mesh for name, mesh in zip(requested_meshes, data_to.meshes) if mesh is not None}
+    loaded = {}
+    for name, obj in zip(requested, data_to.objects):
+        if obj is not None:
+            scene.collection.objects.link(obj)
+            loaded[name] = obj
+            mesh = meshes.get(job["mesh_swaps"].get(name))
+            if mesh is not None:
+                obj.data = mesh
+    return loaded
+
+
+def add_bodies(scene, objects, body_type, job):
+    if not objects:
+        return
+    prebaked = set(job["prebaked"])
+    with bpy.context.temp_override(scene=scene, view_layer=scene.view_layers[0],
+                                   selected_objects=objects, selected_editable_objects=objects,
+                                   active_object=objects[0], object=objects[0]):
+        bpy.ops.rigidbody.objects_add(type=body_type)
+    for obj in objects:
+        rigid_body = obj.rigid_body
+        rigid_body.type = body_type
+        rigid_body.friction = job["friction"]
+        rigid_body.restitution = job["restitution"]
+        rigid_body.use_margin = True
+        rigid_body.collision_margin = job["safety_margin"]
+        rigid_body.collision_shape = job["shapes"].get(obj.name, job["collision_shape"])
+        if obj.name in prebaked:
+            # 换入的预偏移网格已包含收缩量
+            continue
+        mod = obj.modifiers.new(name="AT_Physics_Shrink", type='DISPLACE')
+        mod.strength = job["collision_margin"] - job["safety_margin"]
+        mod.mid_level = 0.0
+
+
+def read_matrices(objects):
+    return np.array([np.array(obj.matrix_world) for obj in objects], dtype=np.float64).reshape(-1, 4, 4)
+
+
+def is_moving(previous, current, elapsed, rest):
+    """与插件中的 RestDetector 使用相同的判定"""
+    linear = np.linalg.norm(current[:, :3, 3] - previous[:, :3, 3], axis=1)
+
+    def rotation(matrices):
+        basis = matrices[:, :3, :3]
+        lengths = np.linalg.norm(basis, axis=1)
+        lengths[lengths == 0.0] = 1.0
+        return basis / lengths[:, None, :]
+
+    trace = np.einsum('nij,nij->n', rotation(previous), rotation(current))
+    angular = np.arccos(np.clip((trace - 1.0) * 0.5, -1.0, 1.0))
+    moving = (linear / elapsed > rest["linear"]) | (angular / elapsed > rest["angular"])
+    return bool(moving.any())
+
+
+def simulate(job):
+    scene = bpy.context.scene
+    clear_scene()
+    loaded = load_objects(job, scene)
+    active = [loaded[name] for name in job["active"] if name in loaded]
+    passive = [loaded[name] for name in job["passive"] if name in loaded]
+
+    if scene.rigidbody_world is None:
+        with bpy.context.temp_override(scene=scene):
+            bpy.ops.rigidbody.world_add()
+    world = scene.rigidbody_world
+    frames = job["frames"]
+    scene.render.fps = job["fps"]
+    scene.frame_start = 0
+    scene.frame_end = frames
+    world.enabled = True
+    world.time_scale = job["time_scale"]
+    world.use_split_impulse = job["split_impulse"]
+    world.solver_iterations = job["solver_iterations"]
+    if job.get("substeps"):
+        if hasattr(world, 'substeps_per_frame'):
+            world.substeps_per_frame = job["substeps"]
+        else:
+            world.steps_per_second = job["substeps"] * job["fps"]
+    scene.use_gravity = job["use_gravity"]
+    scene.gravity = job["gravity"]
+    world.effector_weights.gravity = job["gravity_weight"]
+    world.point_cache.frame_start = 0
+    world.point_cache.frame_end = frames
+
+    add_bodies(scene, passive, 'PASSIVE', job)
+    add_bodies(scene, active, 'ACTIVE', job)
+
+    rest = job["rest"]
+    interval = max(1, rest["interval"])
+    previous, previous_frame, calm_checks = None, 0, 0
+    frame = 0
+    for frame in range(1, frames + 1):
+        scene.frame_set(frame)
+        if not rest["enabled"] or frame % interval:
+            continue
+        current = read_matrices(active)
+        if previous is not None:
+            if is_moving(previous, current, frame - previous_frame, rest):
+                calm_checks = 0
+            else:
+                calm_checks += 1
+                if calm_checks >= rest["required"]:
+                    break
+        previous, previous_frame = current, frame
+
+    matrices = read_matrices(active)
+    return {
+        "frames": frame,
+        "matrices": {name: matrix.ravel().tolist() for name, matrix in zip(
+            [name for name in job["active"] if name in loaded], matrices)}
+    }
+
+
+def main():
+    job = load_job()
+    result = simulate(job)
+    with open(job["output"], "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main()